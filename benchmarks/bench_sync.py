@@ -0,0 +1,175 @@
+"""Benchmark the sync scripts against synthetic orgs on the fake GitHub server.
+
+For each org size, a FakeGitHub server (tests/fake_github.py) is filled with
+that many members spread over many teams, and each script's main() runs in a
+fresh interpreter pointed at it through GITHUB_API_URL:
+
+1. github_to_yaml exports the org to teams.yaml;
+2. teams.yaml is edited (about 2% of memberships added or removed, plus a
+   few users to invite) and validate_pr checks it;
+3. yaml_to_github applies it.
+
+Every run reports wall time, the requests the server saw and peak RSS.
+SYNC_WORKERS, SYNC_ENGINE, FETCH_BACKEND and the other tuning variables are
+passed through, so configurations can be compared:
+
+    python benchmarks/bench_sync.py --sizes 100 1000
+    SYNC_ENGINE=async python benchmarks/bench_sync.py --latency-ms 20
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from tests.fake_github import FakeGitHub  # noqa: E402
+
+ORG = "bench-org"
+SCRIPTS = ("github_to_yaml", "validate_pr", "yaml_to_github")
+
+# Runs one script's main() and prints its timing and peak RSS as JSON.
+CHILD = r"""
+import contextlib, importlib, io, json, resource, sys, time
+sys.path.insert(0, sys.argv[2])
+start = time.perf_counter()
+code = 0
+with contextlib.redirect_stdout(io.StringIO()):
+    try:
+        importlib.import_module(sys.argv[1]).main()
+    except SystemExit as e:
+        code = e.code or 0
+seconds = time.perf_counter() - start
+# ru_maxrss is in KiB on Linux.
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({"seconds": seconds, "peak_rss_mb": rss, "exit": code}))
+"""
+
+
+def synthetic_org(size, seed=0):
+    """Return (members, pending, outsiders, teams) for an org of ``size``."""
+    rng = random.Random(seed)
+    members = [f"member{i:05d}" for i in range(size)]
+    pending = [f"invitee{i:04d}" for i in range(max(1, size // 50))]
+    outsiders = [f"outsider{i:04d}" for i in range(max(1, size // 100))]
+    slugs = [f"team{t:04d}" for t in range(max(5, size // 25))]
+    teams = {slug: [] for slug in slugs}
+    for login in members:
+        for slug in rng.sample(slugs, rng.randint(1, 3)):
+            teams[slug].append(login)
+    return members, pending, outsiders, teams
+
+
+def edited_teams(teams, members, outsiders, seed=0):
+    """Return teams with about 2% of memberships changed and outsiders added."""
+    rng = random.Random(seed)
+    desired = {slug: list(users) for slug, users in teams.items()}
+    slugs = sorted(desired)
+    changes = max(1, sum(map(len, teams.values())) // 50)
+    for _ in range(changes // 2):
+        slug = rng.choice(slugs)
+        if desired[slug]:
+            desired[slug].remove(rng.choice(desired[slug]))
+        slug = rng.choice(slugs)
+        login = rng.choice(members)
+        if login not in desired[slug]:
+            desired[slug].append(login)
+    for login in outsiders:
+        desired[rng.choice(slugs)].append(login)
+    return {slug: sorted(users) for slug, users in desired.items()}
+
+
+def run_script(script, workdir, env):
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD, script, str(ROOT / "scripts")],
+        cwd=workdir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0 or not proc.stdout.strip():
+        raise SystemExit(f"{script} crashed:\n{proc.stderr}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    if result["exit"]:
+        print(f"warning: {script} exited with {result['exit']}:\n{proc.stderr}")
+    return result
+
+
+def bench_size(size, latency, failure_rate):
+    members, pending, outsiders, teams = synthetic_org(size)
+    fake = FakeGitHub(
+        ORG,
+        members=members,
+        pending=pending,
+        teams=teams,
+        users=outsiders,
+        latency=latency,
+        failure_rate=failure_rate,
+        rate_limit=10**9,
+    )
+    results = []
+    with fake, tempfile.TemporaryDirectory() as workdir:
+        env = {
+            **os.environ,
+            "ORG": ORG,
+            "TOKEN": "bench-token",
+            "GITHUB_API_URL": fake.url,
+            "GITHUB_GRAPHQL_URL": fake.graphql_url,
+            # The fake server has no secondary limits to stay under.
+            "RATE_LIMIT_POINTS_PER_MINUTE": str(10**9),
+        }
+        for script in SCRIPTS:
+            if script == "validate_pr":
+                desired = edited_teams(teams, members, outsiders)
+                Path(workdir, "teams.yaml").write_text(
+                    yaml.safe_dump({"teams": desired}), encoding="utf-8"
+                )
+            before = sum(fake.counts.values())
+            result = run_script(script, workdir, env)
+            result.update(
+                script=script,
+                members=size,
+                teams=len(teams),
+                requests=sum(fake.counts.values()) - before,
+            )
+            results.append(result)
+    return results
+
+
+def render_table(results):
+    header = "| members | teams | script | seconds | requests | peak RSS (MB) |"
+    lines = [header, "|---:|---:|---|---:|---:|---:|"]
+    for r in results:
+        lines.append(
+            f"| {r['members']} | {r['teams']} | {r['script']} | {r['seconds']:.2f} "
+            f"| {r['requests']} | {r['peak_rss_mb']:.1f} |"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        results.extend(bench_size(size, args.latency_ms / 1000, args.failure_rate))
+    print(render_table(results))
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark teams.yaml loading and rendering, pure Python vs yaml_io.
+
+Builds a synthetic teams.yaml with ``--entries`` team memberships (50k by
+default), then times yaml.safe_load / yaml.safe_dump against yaml_io.load /
+yaml_io.dump, which use libyaml when PyYAML was built with it, and checks
+that both render byte-identical text:
+
+    python benchmarks/bench_yaml.py --entries 50000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import yaml
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import yaml_io  # noqa: E402
+
+
+def synthetic_doc(entries, team_size=50):
+    teams = {}
+    for i in range(entries):
+        teams.setdefault(f"team-{i // team_size:05d}", []).append(f"user-{i:06d}")
+    invite_sent = [f"invitee-{i:05d}" for i in range(entries // 100)]
+    return {"teams": teams, "invite_sent": invite_sent}
+
+
+def best_of(repeat, fn, *args):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    doc = synthetic_doc(args.entries)
+
+    def safe_dump(doc):
+        return yaml.safe_dump(doc, sort_keys=True, default_flow_style=False)
+
+    dump_py, text_py = best_of(args.repeat, safe_dump, doc)
+    dump_io, text_io = best_of(args.repeat, yaml_io.dump, doc)
+    load_py, loaded_py = best_of(args.repeat, yaml.safe_load, text_py)
+    load_io, loaded_io = best_of(args.repeat, yaml_io.load, text_py)
+
+    if text_py != text_io or loaded_py != loaded_io:
+        raise SystemExit("yaml_io output differs from yaml.safe_dump/safe_load")
+
+    libyaml = "available" if yaml_io.CSafeDumper else "missing"
+    print(
+        f"{args.entries} entries, {len(text_py) / 1024:.0f} KiB of YAML, "
+        f"libyaml {libyaml}"
+    )
+    print("| step | yaml.safe_* (s) | yaml_io (s) | speedup |")
+    print("|---|---:|---:|---:|")
+    for step, slow, fast in (("load", load_py, load_io), ("dump", dump_py, dump_io)):
+        print(f"| {step} | {slow:.3f} | {fast:.3f} | {slow / fast:.1f}x |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# Asyncio engine for both sync directions (SYNC_ENGINE=async).
+#
+# Mirrors fetch_org_state / fetch_org_teams / apply_memberships from the blocking
+# scripts, but every lookup, PUT, DELETE and POST is a coroutine gated by one
+# semaphore, so a single process keeps many requests in flight. requests is
+# blocking, so each call runs on a worker thread; the thread pool is sized to
+# the semaphore so neither one starves the other. Lists are paged by
+# github_client.paginate, also on a worker thread.
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from github_client import API, REQUEST_TIMEOUT, paginate
+from tracing import async_span, traced
+import yaml_to_github
+from yaml_to_github import (
+    check_team_slugs,
+    invitation_result,
+    invite_candidates,
+    membership_changes,
+    plan_mutations,
+    report_results,
+    team_mutations,
+    team_scope,
+)
+
+
+class AsyncClient:
+    """Run calls on a requests session as coroutines, ``concurrency`` at a time."""
+
+    def __init__(self, session, concurrency):
+        self.session = session
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def request(self, method, url, **kwargs):
+        async with self.semaphore:
+            return await asyncio.to_thread(
+                self.session.request, method, url, timeout=REQUEST_TIMEOUT, **kwargs
+            )
+
+    async def paginate(self, url):
+        # The blocking pager on a worker thread, fetching pages ahead like
+        # the blocking engine; the session's pool bounds what's in flight.
+        return await asyncio.to_thread(paginate, url, self.session, self.concurrency)
+
+
+def run(coro_fn, session, concurrency, *args):
+    """Run ``coro_fn(client, *args)`` to completion and return its result."""
+
+    async def runner():
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+        return await coro_fn(AsyncClient(session, concurrency), *args)
+
+    return asyncio.run(runner())
+
+
+@traced
+async def fetch_org_membership(org, client):
+    members, invites = await asyncio.gather(
+        client.paginate(f"{API}/orgs/{org}/members"),
+        client.paginate(f"{API}/orgs/{org}/invitations"),
+    )
+    org_members = {m["login"] for m in members if "login" in m}
+    pending_invites = {i.get("login") for i in invites if i.get("login")}
+    return org_members, pending_invites
+
+
+@traced
+async def fetch_org_state(org, client):
+    (org_members, pending_invites), teams = await asyncio.gather(
+        fetch_org_membership(org, client),
+        client.paginate(f"{API}/orgs/{org}/teams"),
+    )
+    existing_slugs = {t["slug"] for t in teams if "slug" in t}
+    return org_members, pending_invites, existing_slugs
+
+
+async def fetch_team_logins(org, client, slugs):
+    lists = await asyncio.gather(
+        *(client.paginate(f"{API}/orgs/{org}/teams/{slug}/members") for slug in slugs)
+    )
+    return [{m["login"] for m in members if "login" in m} for members in lists]
+
+
+@traced
+async def fetch_org_teams(org, client):
+    teams = await client.paginate(f"{API}/orgs/{org}/teams")
+    slugs = sorted(team["slug"] for team in teams)
+    return dict(zip(slugs, await fetch_team_logins(org, client, slugs)))
+
+
+async def fetch_org(client, org):
+    """github_to_yaml entry point: members, pending invites and {slug: logins}."""
+    (org_members, pending_invites), team_members = await asyncio.gather(
+        fetch_org_membership(org, client), fetch_org_teams(org, client)
+    )
+    return org_members, pending_invites, team_members
+
+
+@traced
+async def apply_memberships(
+    org,
+    client,
+    desired,
+    org_members,
+    pending_invites,
+    existing_slugs,
+    team_members=None,
+    slugs=None,
+):
+    check_team_slugs(org, desired, existing_slugs)
+
+    if slugs is None:
+        slugs = sorted(desired)
+    want_all = set().union(*(set(users) for users in desired.values()))
+    to_invite = invite_candidates(want_all, org_members, pending_invites)
+
+    async def sync_team(slug):
+        if team_members is not None:
+            have = set(team_members.get(slug, ()))
+        else:
+            with async_span("list_team", slug=slug):
+                url = f"{API}/orgs/{org}/teams/{slug}/members"
+                members = await client.paginate(url)
+            have = {m["login"] for m in members if "login" in m}
+        return await reconcile_team(
+            org, client, slug, set(desired[slug]), have, org_members
+        )
+
+    # Invites only concern non-members and team writes only concern members,
+    # so invites, team listings and team writes all overlap.
+    invite_results, team_results = await asyncio.gather(
+        asyncio.gather(*(invite_by_login(org, login, client) for login in to_invite)),
+        asyncio.gather(*(sync_team(slug) for slug in slugs)),
+    )
+    invited = report_results(
+        invite_results + [result for results in team_results for result in results]
+    )
+
+    return {login for login, ok in zip(to_invite, invited) if ok}
+
+
+async def sync_memberships(
+    client, org, desired, state=None, previous=None, invite_sent=()
+):
+    """yaml_to_github entry point: return (org_members, pending_invites, invited).
+
+    ``state`` is an already fetched (org_members, pending_invites,
+    existing_slugs, team_members) tuple, e.g. from the GraphQL backend.
+    ``previous`` and ``invite_sent`` scope the run as in team_scope().
+    """
+    if state is None:
+        org_members, pending_invites, existing_slugs = await fetch_org_state(
+            org, client
+        )
+        team_members = None
+    else:
+        org_members, pending_invites, existing_slugs, team_members = state
+    invited_this_run = await apply_memberships(
+        org,
+        client,
+        desired,
+        org_members,
+        pending_invites,
+        existing_slugs,
+        team_members,
+        team_scope(desired, previous, invite_sent, org_members),
+    )
+    return org_members, pending_invites, invited_this_run
+
+
+@traced
+async def apply_plan(client, org, plan):
+    """SYNC_MODE=apply entry point: run a saved plan, return the invited logins."""
+    invites = plan["invites"]
+    invite_results, team_results = await asyncio.gather(
+        asyncio.gather(*(invite_by_login(org, login, client) for login in invites)),
+        asyncio.gather(
+            *(
+                send_team(client, slug, mutations)
+                for slug, mutations in plan_mutations(org, plan).items()
+            )
+        ),
+    )
+    team_results = [result for team in team_results for result in team]
+    invited = report_results(invite_results + team_results)
+    return {login for login, ok in zip(invites, invited) if ok}
+
+
+async def reconcile_team(org, client, slug, want, have, org_members):
+    to_add, to_remove = membership_changes(want, have, org_members)
+    mutations = team_mutations(org, slug, to_add, to_remove)
+    return await send_team(client, slug, mutations)
+
+
+async def send_team(client, slug, mutations):
+    with async_span("reconcile_team", slug=slug):
+        return await asyncio.gather(*(send_mutation(client, m) for m in mutations))
+
+
+async def send_mutation(client, mutation):
+    method, url, done, failed = mutation
+    try:
+        r = await client.request(method, url)
+    except requests.exceptions.RequestException as e:
+        return None, f"{failed}: {e}"
+    if r.status_code >= 400:
+        return None, f"{failed}: {r.status_code} {r.text}"
+    return True, done
+
+
+async def invite_by_login(org, login, client):
+    """Return (invited, message); failures come back as messages, not exits."""
+    cache = yaml_to_github.USER_CACHE
+    cached = cache.get(login) if cache else None
+    if cached and cached[0] and cached[1]:
+        uid = cached[1]
+    else:
+        try:
+            r = await client.request("GET", f"{API}/users/{login}")
+            if r.status_code == 404:
+                return None, f"Unknown GitHub user: {login}"
+            r.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            return None, f"Could not look up {login}: {e}"
+        uid = r.json().get("id")
+        if not uid:
+            return None, f"Could not resolve user id for {login}"
+        if cache:
+            cache.put(login, True, int(uid))
+
+    try:
+        r = await client.request(
+            "POST", f"{API}/orgs/{org}/invitations", json={"invitee_id": int(uid)}
+        )
+    except requests.exceptions.RequestException as e:
+        return None, f"Invite failed for {login}: {e}"
+    return invitation_result(login, r)
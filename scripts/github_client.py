@@ -0,0 +1,379 @@
+# Shared GitHub REST client for the sync and validation scripts.
+#
+# Every entry point builds its session here, so connection pooling, retries,
+# the ETag cache and response hooks (e.g. metrics) are configured in one place.
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import tracing
+from http_cache import DAY, MB, CachingAdapter, ETagCache
+
+# GitHub Actions sets GITHUB_API_URL, which also points at GitHub Enterprise
+# Server instances (and at local stand-ins in benchmarks).
+API = os.environ.get("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+API_VERSION = "2022-11-28"
+PER_PAGE = 100
+REQUEST_TIMEOUT = 60
+
+# Retry configuration for API calls
+RETRY_TOTAL = 3
+RETRY_BACKOFF_FACTOR = 1
+RETRY_STATUS_FORCELIST = [429, 500, 502, 503, 504]
+
+# Number of requests kept in flight by the concurrent code paths; also the
+# size of the session's connection pool.
+DEFAULT_WORKERS = 8
+
+# GitHub's secondary rate limits: at most 100 concurrent requests and 900
+# points per minute for REST, where reads cost 1 point and writes 5.
+MAX_CONCURRENT_REQUESTS = 100
+POINTS_PER_MINUTE = 900
+READ_POINTS = 1
+WRITE_POINTS = 5
+# How often a rate-limited request is retried after waiting it out.
+RATE_LIMIT_RETRIES = 3
+# Wait after a secondary-limit 403 that comes without Retry-After.
+SECONDARY_LIMIT_WAIT = 60
+
+
+def int_env(name, default):
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        parsed = int(value)
+    except ValueError:
+        raise SystemExit(f"Env var {name} must be an integer, got: {value!r}")
+    if parsed < 1:
+        raise SystemExit(f"Env var {name} must be at least 1, got: {parsed}")
+    return parsed
+
+
+def choice_env(name, choices):
+    # The first choice is the default.
+    value = os.environ.get(name) or choices[0]
+    if value not in choices:
+        raise SystemExit(
+            f"Env var {name} must be one of {', '.join(choices)}, got: {value!r}"
+        )
+    return value
+
+
+def write_changed_output(changed):
+    out = os.environ.get("GITHUB_OUTPUT")
+    if out:
+        # Lets the workflow skip later steps when teams.yaml didn't change.
+        with open(out, "a", encoding="utf-8") as f:
+            f.write(f"teams_yaml_changed={'true' if changed else 'false'}\n")
+
+
+def auth_headers(token):
+    return {
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/vnd.github+json",
+        "X-GitHub-Api-Version": API_VERSION,
+    }
+
+
+def create_session(
+    token, pool_size=DEFAULT_WORKERS, cache=None, response_hooks=()
+):
+    """Create a requests session with retry logic and exponential backoff.
+
+    The connection pool holds ``pool_size`` keep-alive connections so that
+    parallel workers sharing the session don't open a new one per request;
+    it blocks when exhausted, which caps the requests in flight.
+    With an ETagCache, GETs are revalidated with If-None-Match.
+    ``response_hooks`` are called with every response (see requests hooks),
+    as is the tracer when TRACE_PATH is set.
+    """
+    points = int_env("RATE_LIMIT_POINTS_PER_MINUTE", POINTS_PER_MINUTE)
+    session = GitHubSession(
+        RateLimitScheduler(
+            max_concurrent=min(pool_size, MAX_CONCURRENT_REQUESTS),
+            points_per_minute=points,
+        )
+    )
+    retries = Retry(
+        total=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_FORCELIST,
+        respect_retry_after_header=True
+    )
+    if cache is None:
+        adapter = HTTPAdapter(
+            max_retries=retries, pool_maxsize=pool_size, pool_block=True
+        )
+    else:
+        adapter = CachingAdapter(
+            cache, max_retries=retries, pool_maxsize=pool_size, pool_block=True
+        )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(auth_headers(token))
+    session.hooks["response"].extend(hook for hook in response_hooks if hook)
+    if tracing.TRACER:
+        session.hooks["response"].append(tracing.TRACER)
+    return session
+
+
+class RateLimitScheduler:
+    """Pace requests to stay under GitHub's primary and secondary limits.
+
+    The primary budget (``X-RateLimit-Remaining`` until ``X-RateLimit-Reset``,
+    per ``X-RateLimit-Resource``) is read from every response and decremented
+    locally as requests start, so concurrent workers don't overshoot it. When
+    it runs out, callers sleep until the reset instead of failing. Secondary
+    limits are respected with a concurrency cap and a points-per-minute token
+    bucket.
+    """
+
+    def __init__(
+        self,
+        max_concurrent=MAX_CONCURRENT_REQUESTS,
+        points_per_minute=POINTS_PER_MINUTE,
+        clock=time.time,
+        sleep=time.sleep,
+    ):
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.lock = threading.Lock()
+        self.clock = clock
+        self.sleep = sleep
+        # resource -> [remaining, reset epoch seconds]
+        self.budgets = {}
+        self.capacity = points_per_minute
+        self.points = float(points_per_minute)
+        self.refill_rate = points_per_minute / 60
+        self.refilled_at = clock()
+
+    def acquire(self, method, url, json=None):
+        self.slots.acquire()
+        resource = resource_for(url)
+        cost = request_points(method, url, json)
+        while True:
+            with self.lock:
+                wait = self.wait_time(resource, cost)
+                if wait <= 0:
+                    self.points -= cost
+                    budget = self.budgets.get(resource)
+                    if budget:
+                        budget[0] -= 1
+                    return
+            self.sleep(wait)
+
+    def release(self):
+        self.slots.release()
+
+    def wait_time(self, resource, cost):
+        # Called with the lock held.
+        now = self.clock()
+        self.points = min(
+            self.capacity, self.points + (now - self.refilled_at) * self.refill_rate
+        )
+        self.refilled_at = now
+
+        budget = self.budgets.get(resource)
+        if budget and budget[0] <= 0:
+            if now < budget[1]:
+                return budget[1] - now + 1
+            # The window has reset; the next response tells the new budget.
+            del self.budgets[resource]
+        if self.points < cost:
+            return (cost - self.points) / self.refill_rate
+        return 0
+
+    def update(self, response):
+        headers = response.headers
+        try:
+            remaining = int(headers["X-RateLimit-Remaining"])
+            reset = int(headers["X-RateLimit-Reset"])
+        except (KeyError, TypeError, ValueError):
+            return
+        resource = headers.get("X-RateLimit-Resource") or resource_for(response.url)
+        with self.lock:
+            budget = self.budgets.get(resource)
+            if budget is None or reset > budget[1]:
+                self.budgets[resource] = [remaining, reset]
+            elif reset == budget[1]:
+                # Responses arrive out of order; keep the lowest count seen.
+                budget[0] = min(budget[0], remaining)
+
+    def retry_delay(self, response):
+        """Seconds to wait before retrying a rate-limited response, or None."""
+        if response.status_code not in (403, 429):
+            return None
+        headers = response.headers
+        if headers.get("Retry-After"):
+            try:
+                return max(int(headers["Retry-After"]), 1)
+            except ValueError:
+                return SECONDARY_LIMIT_WAIT
+        if headers.get("X-RateLimit-Remaining") == "0":
+            try:
+                reset = int(headers["X-RateLimit-Reset"])
+            except (KeyError, ValueError):
+                return SECONDARY_LIMIT_WAIT
+            return max(reset - self.clock(), 0) + 1
+        if "secondary rate limit" in response.text.lower():
+            return SECONDARY_LIMIT_WAIT
+        return None
+
+
+def resource_for(url):
+    return "graphql" if urlparse(url).path.endswith("/graphql") else "core"
+
+
+def request_points(method, url, json=None):
+    """Return the secondary-limit points a request costs."""
+    if method.upper() in ("GET", "HEAD"):
+        return READ_POINTS
+    # Every GraphQL request is a POST; only mutations count as writes.
+    if resource_for(url) == "graphql":
+        query = (json or {}).get("query") or ""
+        if not query.lstrip().startswith("mutation"):
+            return READ_POINTS
+    return WRITE_POINTS
+
+
+class GitHubSession(requests.Session):
+    """Session whose requests all go through a RateLimitScheduler."""
+
+    def __init__(self, scheduler=None):
+        super().__init__()
+        self.scheduler = scheduler
+
+    def request(self, method, url, *args, **kwargs):
+        if self.scheduler is None:
+            return super().request(method, url, *args, **kwargs)
+
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            self.scheduler.acquire(method, url, kwargs.get("json"))
+            try:
+                r = super().request(method, url, *args, **kwargs)
+            finally:
+                self.scheduler.release()
+            self.scheduler.update(r)
+            delay = self.scheduler.retry_delay(r)
+            if delay is None or attempt == RATE_LIMIT_RETRIES:
+                return r
+            print(f"Rate limited on {method} {url}; waiting {delay:.0f}s")
+            self.scheduler.sleep(delay)
+
+
+def open_http_cache():
+    directory = os.environ.get("HTTP_CACHE_DIR")
+    if not directory:
+        return None
+    return ETagCache(
+        directory,
+        max_bytes=int_env("HTTP_CACHE_MAX_MB", 100) * MB,
+        max_age=int_env("HTTP_CACHE_MAX_AGE_DAYS", 7) * DAY,
+    )
+
+
+def paginate(url, session, workers=1):
+    return list(iter_paginate(url, session, workers))
+
+
+def iter_paginate(url, session, workers=1):
+    """Yield the items of a GitHub list page by page.
+
+    Callers that only keep a field or two (e.g. logins) never hold more
+    than a few pages of full objects. The first response's Link header
+    names the last page, so up to ``workers`` of the remaining pages are
+    fetched ahead concurrently; without it, keep fetching until the short
+    page.
+    """
+    r = fetch_page(url, session, 1)
+    batch = r.json()
+    yield from batch
+    if len(batch) < PER_PAGE:
+        return
+
+    last = last_page(r)
+    if last is None:
+        page = 2
+        while True:
+            batch = fetch_page(url, session, page).json()
+            yield from batch
+            if len(batch) < PER_PAGE:
+                return
+            page += 1
+
+    pages = iter(range(2, last + 1))
+    if workers <= 1:
+        for page in pages:
+            yield from fetch_page(url, session, page).json()
+        return
+
+    # A sliding window of in-flight pages keeps memory bounded while the
+    # session's blocking connection pool bounds concurrency, even when
+    # several lists are paged in parallel.
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        window = deque(
+            pool.submit(fetch_page, url, session, page)
+            for page in islice(pages, workers)
+        )
+        while window:
+            r = window.popleft().result()
+            for page in islice(pages, 1):
+                window.append(pool.submit(fetch_page, url, session, page))
+            yield from r.json()
+
+
+def fetch_page(url, session, page):
+    r = session.get(
+        url,
+        params={"per_page": PER_PAGE, "page": page},
+        timeout=REQUEST_TIMEOUT,
+    )
+    r.raise_for_status()
+    return r
+
+
+def last_page(response):
+    """Return the page number of the Link rel="last" URL, or None."""
+    last = response.links.get("last")
+    if not last:
+        return None
+    try:
+        return int(parse_qs(urlparse(last["url"]).query)["page"][0])
+    except (KeyError, ValueError):
+        return None
+
+
+@tracing.traced
+def fetch_org_teams(org, session, workers=1):
+    """Return ({slug: member logins}, {team id: slug}) for every team in the org."""
+    teams = list(iter_paginate(f"{API}/orgs/{org}/teams", session, workers))
+    team_ids = {team["id"]: team["slug"] for team in teams if "id" in team}
+    slugs = sorted(team["slug"] for team in teams)
+    return fetch_team_logins(org, session, slugs, workers), team_ids
+
+
+def fetch_team_logins(org, session, slugs, workers=1):
+    """Return {slug: member logins}, listing ``workers`` teams at a time."""
+
+    def team_logins(slug):
+        with tracing.span("list_team", slug=slug):
+            url = f"{API}/orgs/{org}/teams/{slug}/members"
+            members = iter_paginate(url, session, workers)
+            return {m["login"] for m in members if "login" in m}
+
+    if workers <= 1 or len(slugs) <= 1:
+        return {slug: team_logins(slug) for slug in slugs}
+
+    # The pool is bounded so we never hold more connections than the session's
+    # adapter keeps alive; map() preserves input order, keeping output stable.
+    with ThreadPoolExecutor(max_workers=min(workers, len(slugs))) as pool:
+        return dict(zip(slugs, pool.map(team_logins, slugs)))
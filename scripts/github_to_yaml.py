@@ -1,45 +1,169 @@
 # This script considers curreng GitHub organization settings
 # as the ground truth, and overrides team.yaml accordingly.
 
+import hashlib
+import json
 import os
 from pathlib import Path
 
-import requests
-import yaml
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-
-API = "https://api.github.com"
-API_VERSION = "2022-11-28"
-PER_PAGE = 100
-REQUEST_TIMEOUT = 60
-COMMENT = "# AUTOMATICALLY UPDATED \u2014 DO NOT EDIT THIS SECTION MANUALLY\n"
-MARKER = "invite_sent:"
-
-# Retry configuration for API calls
-RETRY_TOTAL = 3
-RETRY_BACKOFF_FACTOR = 1
-RETRY_STATUS_FORCELIST = [429, 500, 502, 503, 504]
-
-
+from github_client import (
+    API,
+    DEFAULT_WORKERS,
+    choice_env,
+    create_session,
+    fetch_org_teams,
+    int_env,
+    iter_paginate,
+    open_http_cache,
+    write_changed_output,
+)
+from org_snapshot import open_org_snapshot
+from profiling import profiled
+from request_metrics import open_request_metrics, reported
+import team_shards
+from tracing import traced
+import yaml_io
+
+# "blocking" uses a thread pool; "async" uses the asyncio engine.
+ENGINES = ("blocking", "async")
+
+# "rest" lists every team separately; "graphql" bulk-fetches the whole org.
+BACKENDS = ("rest", "graphql")
+
+
+# Per-endpoint request report (only when METRICS_PATH or a job summary is set).
+METRICS = open_request_metrics("github_to_yaml")
+
+
+@profiled
+@reported(METRICS)
 def main():
     org = require_env("ORG")
     token = require_env("TOKEN")
-    session = create_session(token)
+    workers = int_env("SYNC_WORKERS", DEFAULT_WORKERS)
+    engine = choice_env("SYNC_ENGINE", ENGINES)
+    backend = choice_env("FETCH_BACKEND", BACKENDS)
+    snapshot = open_org_snapshot()
+    hooks = [METRICS]
+    if snapshot:
+        hooks.append(snapshot.recorder)
+    session = create_session(
+        token, pool_size=workers, cache=open_http_cache(), response_hooks=hooks
+    )
 
+    # TEAMS_DIR: one file per team instead of teams.yaml.
+    teams_dir = os.environ.get("TEAMS_DIR")
     teams_path = Path("teams.yaml")
-    old_desired = load_previous_desired(teams_path)
+    if teams_dir:
+        old_shards = team_shards.load_shards(teams_dir, workers)
+        old_desired = {slug: shard.users for slug, shard in old_shards.items()}
+        _, old_text = team_shards.load_invite_sent(teams_dir)
+        old_source = team_shards.fingerprint(old_shards, old_text)
+    else:
+        old_desired = load_previous_desired(teams_path)
+        old_text = teams_path.read_text(encoding="utf-8") if teams_path.exists() else ""
+        old_source = old_text
+
+    # A pull request from a stale snapshot would revert the sync's changes.
+    state = snapshot.load(org, session, workers, verify=True) if snapshot else None
+    if state is not None:
+        org_members, pending_invites, _, team_members = state
+    elif backend == "graphql":
+        import graphql_backend
+
+        org_members, pending_invites, team_members = (
+            graphql_backend.fetch_org_snapshot(org, session)
+        )
+    elif engine == "async":
+        import async_sync
+
+        org_members, pending_invites, team_members = async_sync.run(
+            async_sync.fetch_org, session, workers, org
+        )
+    else:
+        org_members, pending_invites = fetch_org_membership(org, session, workers)
+        team_members, _ = fetch_org_teams(org, session, workers)
+
+    if snapshot and state is None:
+        snapshot.save(org, org_members, pending_invites, team_members)
+
+    # Same org state and same files as after the last export: the output would
+    # be identical, so skip rendering, writing and the PR step.
+    fingerprint_path = os.environ.get("EXPORT_FINGERPRINT_PATH")
+    state_digest = org_state_digest(org, org_members, pending_invites, team_members)
+    if fingerprint_path and read_fingerprint(fingerprint_path) == export_fingerprint(
+        state_digest, old_source
+    ):
+        print("Organization unchanged since the last export; nothing to write.")
+        write_changed_output(False)
+        return
+
+    teams_map = export_teams(team_members, old_desired, org_members, pending_invites)
+
+    if teams_dir:
+        changed_slugs = team_shards.write_shards(teams_dir, teams_map, old_shards)
+        new_text = team_shards.render_invite_sent(pending_invites)
+        if new_text != old_text:
+            team_shards.write_invite_sent(teams_dir, new_text)
+        changed = bool(changed_slugs) or new_text != old_text
+        new_shards = {
+            slug: team_shards.Shard(users, team_shards.members_digest(users))
+            for slug, users in teams_map.items()
+        }
+        new_source = team_shards.fingerprint(new_shards, new_text)
+        print(
+            f"Wrote {len(changed_slugs)} of {len(teams_map)} team files in "
+            f"{teams_dir}; invite_sent={len(pending_invites)}."
+        )
+    else:
+        new_text = render_yaml(teams_map, pending_invites)
+        changed = new_text != old_text
+        if changed:
+            teams_path.write_text(new_text, encoding="utf-8")
+        new_source = new_text
+        if changed:
+            print(
+                f"Wrote teams.yaml with {len(teams_map)} teams; "
+                f"invite_sent={len(pending_invites)}."
+            )
+        else:
+            print("No changes to teams.yaml needed.")
+
+    if fingerprint_path:
+        fingerprint = export_fingerprint(state_digest, new_source)
+        write_fingerprint(fingerprint_path, fingerprint)
+    write_changed_output(changed)
+
+
+def org_state_digest(org, org_members, pending_invites, team_members):
+    # Canonical JSON, so fetch order and set ordering don't matter.
+    state = {
+        "org": org,
+        "members": sorted(org_members),
+        "pending_invites": sorted(pending_invites),
+        "teams": {slug: sorted(users) for slug, users in team_members.items()},
+    }
+    canonical = json.dumps(state, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
 
-    org_members, pending_invites = fetch_org_membership(org, session)
 
-    teams_map = export_teams(org, session, old_desired, org_members, pending_invites)
+def export_fingerprint(state_digest, source_text):
+    """Digest of everything the export renders from: org state and files."""
+    source = hashlib.sha256(source_text.encode("utf-8")).hexdigest()
+    return f"{state_digest}:{source}"
 
-    new_text = render_yaml(teams_map, pending_invites)
-    teams_path.write_text(new_text, encoding="utf-8")
 
-    print(
-        f"Wrote teams.yaml with {len(teams_map)} teams; invite_sent={len(pending_invites)}."
-    )
+def read_fingerprint(path):
+    try:
+        return Path(path).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+
+
+def write_fingerprint(path, fingerprint):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(fingerprint + "\n", encoding="utf-8")
 
 
 def require_env(name):
@@ -49,32 +173,11 @@ def require_env(name):
     return value
 
 
-def auth_headers(token):
-    return {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github+json",
-        "X-GitHub-Api-Version": API_VERSION,
-    }
-
-
-def create_session(token):
-    """Create a requests session with retry logic and exponential backoff."""
-    session = requests.Session()
-    retries = Retry(
-        total=RETRY_TOTAL,
-        backoff_factor=RETRY_BACKOFF_FACTOR,
-        status_forcelist=RETRY_STATUS_FORCELIST,
-        respect_retry_after_header=True
-    )
-    session.mount("https://", HTTPAdapter(max_retries=retries))
-    session.headers.update(auth_headers(token))
-    return session
-
-
+@traced
 def load_previous_desired(path):
     try:
         old_text = path.read_text(encoding="utf-8")
-        old_cfg = yaml.safe_load(old_text) or {}
+        old_cfg = yaml_io.load(old_text) or {}
     except FileNotFoundError:
         old_cfg = {}
 
@@ -87,25 +190,34 @@ def normalize_users(users):
     return [u.strip() for u in (users or []) if isinstance(u, str) and u.strip()]
 
 
-def fetch_org_membership(org, session):
-    members = paginate(f"{API}/orgs/{org}/members", session)
+@traced
+def fetch_org_membership(org, session, workers=1):
+    members = iter_paginate(f"{API}/orgs/{org}/members", session, workers)
     org_members = {m["login"] for m in members if "login" in m}
 
-    invites = paginate(f"{API}/orgs/{org}/invitations", session)
+    invites = iter_paginate(f"{API}/orgs/{org}/invitations", session, workers)
     pending_invites = {i.get("login") for i in invites if i.get("login")}
 
     return org_members, pending_invites
 
 
-def export_teams(org, session, old_desired, org_members, pending_invites):
-    teams = paginate(f"{API}/orgs/{org}/teams", session)
-    teams_map = {}
+def export_teams(team_members, old_desired, org_members, pending_invites):
+    """Return the teams map for ``{slug: logins}``, whichever backend fetched it."""
+    slugs = sorted(team_members)
+    return build_teams_map(
+        slugs,
+        [team_members[slug] for slug in slugs],
+        old_desired,
+        org_members,
+        pending_invites,
+    )
 
-    for team in sorted(teams, key=lambda x: x["slug"]):
-        slug = team["slug"]
-        members = paginate(f"{API}/orgs/{org}/teams/{slug}/members", session)
-        gh_logins = {m["login"] for m in members if "login" in m}
 
+@traced
+def build_teams_map(slugs, team_logins, old_desired, org_members, pending_invites):
+    teams_map = {}
+
+    for slug, gh_logins in zip(slugs, team_logins):
         # Preserve YAML-desired users that are pending invites (so export doesn't delete them).
         preserve = {
             u
@@ -118,31 +230,10 @@ def export_teams(org, session, old_desired, org_members, pending_invites):
     return teams_map
 
 
+@traced
 def render_yaml(teams_map, invite_sent):
     doc = {"teams": teams_map, "invite_sent": sorted(list(invite_sent))}
-    new_text = yaml.safe_dump(doc, sort_keys=True, default_flow_style=False)
-    if MARKER in new_text:
-        # Inject a warning comment without changing the YAML structure.
-        new_text = new_text.replace(MARKER, COMMENT + MARKER, 1)
-    return new_text
-
-
-def paginate(url, session):
-    # GitHub REST pagination: keep fetching until the short page.
-    out, page = [], 1
-    while True:
-        r = session.get(
-            url,
-            params={"per_page": PER_PAGE, "page": page},
-            timeout=REQUEST_TIMEOUT,
-        )
-        r.raise_for_status()
-        batch = r.json()
-        out.extend(batch)
-        if len(batch) < PER_PAGE:
-            break
-        page += 1
-    return out
+    return yaml_io.dump_managed(doc)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,165 @@
+# GraphQL fetch backend (FETCH_BACKEND=graphql).
+#
+# The REST backend needs one list call per team on top of the org-wide lists.
+# Here the teams query also pulls the first page of every team's members, so
+# the whole membership graph arrives in a handful of queries; only teams with
+# more members than one page need follow-up queries.
+
+import os
+
+from github_client import API, REQUEST_TIMEOUT
+
+
+def graphql_url(api):
+    # GitHub Enterprise Server serves REST under /api/v3 but GraphQL at
+    # /api/graphql; github.com serves both from the API host.
+    if api.endswith("/api/v3"):
+        return f"{api[: -len('/v3')]}/graphql"
+    return f"{api}/graphql"
+
+
+GRAPHQL_URL = os.environ.get("GITHUB_GRAPHQL_URL") or graphql_url(API)
+PAGE_SIZE = 100
+
+PAGE_INFO = "pageInfo { hasNextPage endCursor }"
+
+MEMBERS_QUERY = f"""
+query OrgMembers($org: String!, $first: Int!, $after: String) {{
+  organization(login: $org) {{
+    membersWithRole(first: $first, after: $after) {{
+      {PAGE_INFO}
+      nodes {{ login }}
+    }}
+  }}
+}}
+"""
+
+PENDING_QUERY = f"""
+query PendingMembers($org: String!, $first: Int!, $after: String) {{
+  organization(login: $org) {{
+    pendingMembers(first: $first, after: $after) {{
+      {PAGE_INFO}
+      nodes {{ login }}
+    }}
+  }}
+}}
+"""
+
+TEAMS_QUERY = f"""
+query OrgTeams($org: String!, $first: Int!, $after: String) {{
+  organization(login: $org) {{
+    teams(first: $first, after: $after) {{
+      {PAGE_INFO}
+      nodes {{
+        slug
+        members(first: $first) {{
+          {PAGE_INFO}
+          nodes {{ login }}
+        }}
+      }}
+    }}
+  }}
+}}
+"""
+
+TEAM_MEMBERS_QUERY = f"""
+query TeamMembers($org: String!, $slug: String!, $first: Int!, $after: String) {{
+  organization(login: $org) {{
+    team(slug: $slug) {{
+      members(first: $first, after: $after) {{
+        {PAGE_INFO}
+        nodes {{ login }}
+      }}
+    }}
+  }}
+}}
+"""
+
+
+class GraphQLError(Exception):
+    """The GraphQL endpoint answered, but with errors instead of data."""
+
+
+def graphql(session, query, variables, url=GRAPHQL_URL, tolerate=()):
+    """Return the ``data`` of a query.
+
+    Errors whose ``type`` is in ``tolerate`` (e.g. NOT_FOUND for aliased
+    lookups) leave a null field behind instead of raising GraphQLError.
+    """
+    r = session.post(
+        url, json={"query": query, "variables": variables}, timeout=REQUEST_TIMEOUT
+    )
+    r.raise_for_status()
+    body = r.json()
+    errors = [e for e in body.get("errors") or () if e.get("type") not in tolerate]
+    if errors or body.get("data") is None:
+        messages = "; ".join(e.get("message", str(e)) for e in errors)
+        raise GraphQLError(messages or "GraphQL response has no data")
+    return body["data"]
+
+
+def connection_at(data, path):
+    for key in path:
+        data = data.get(key) if data else None
+    if data is None:
+        raise GraphQLError(f"Missing {'.'.join(path)} in GraphQL response")
+    return data
+
+
+def iter_connection(session, query, variables, path, url=GRAPHQL_URL, after=None):
+    """Yield the nodes of the connection at ``path``, following its cursors."""
+    while True:
+        data = graphql(
+            session, query, {**variables, "first": PAGE_SIZE, "after": after}, url
+        )
+        conn = connection_at(data, path)
+        yield from conn["nodes"]
+        if not conn["pageInfo"]["hasNextPage"]:
+            return
+        after = conn["pageInfo"]["endCursor"]
+
+
+def fetch_org_snapshot(org, session, url=GRAPHQL_URL):
+    """Return (org_members, pending_invites, team_members) for ``org``.
+
+    ``team_members`` maps each team slug to its set of member logins, the
+    same data the REST backend collects with one list call per team.
+    """
+    variables = {"org": org}
+    org_members = {
+        n["login"]
+        for n in iter_connection(
+            session, MEMBERS_QUERY, variables, ("organization", "membersWithRole"), url
+        )
+    }
+    pending_invites = {
+        n["login"]
+        for n in iter_connection(
+            session, PENDING_QUERY, variables, ("organization", "pendingMembers"), url
+        )
+        if n.get("login")
+    }
+
+    team_members = {}
+    teams = iter_connection(
+        session, TEAMS_QUERY, variables, ("organization", "teams"), url
+    )
+    for team in teams:
+        members = team["members"]
+        logins = {n["login"] for n in members["nodes"]}
+        if members["pageInfo"]["hasNextPage"]:
+            # Only large teams need their own follow-up queries.
+            logins.update(
+                n["login"]
+                for n in iter_connection(
+                    session,
+                    TEAM_MEMBERS_QUERY,
+                    {**variables, "slug": team["slug"]},
+                    ("organization", "team", "members"),
+                    url,
+                    after=members["pageInfo"]["endCursor"],
+                )
+            )
+        team_members[team["slug"]] = logins
+
+    return org_members, pending_invites, team_members
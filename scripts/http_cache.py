@@ -0,0 +1,116 @@
+# On-disk ETag cache for GitHub GET requests (HTTP_CACHE_DIR).
+#
+# GitHub answers a conditional request whose If-None-Match matches with an
+# empty 304, which doesn't count against the rate limit. CachingAdapter sits
+# under the session, so paginate() and every other caller keep seeing
+# ordinary 200 responses while unchanged pages are served from disk.
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from requests.adapters import HTTPAdapter
+
+MB = 1024 * 1024
+DAY = 24 * 60 * 60
+
+# Response headers worth replaying on a 304, which may omit them.
+KEPT_HEADERS = ("Content-Type", "Link")
+
+
+class ETagCache:
+    """Store ETag + body per request URL (query string, i.e. page, included).
+
+    Entries are one JSON file each. Eviction drops entries older than
+    ``max_age`` seconds, then the least recently used ones until the
+    directory fits in ``max_bytes``.
+    """
+
+    def __init__(self, directory, max_bytes=100 * MB, max_age=7 * DAY):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.evict()
+
+    def path(self, url):
+        return self.directory / (hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def get(self, url):
+        path = self.path(url)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+        if entry.get("url") != url:
+            return None
+        # Touch the file so size-based eviction drops cold entries first.
+        os.utime(path)
+        return entry
+
+    def put(self, url, etag, body, headers):
+        entry = {
+            "url": url,
+            "etag": etag,
+            "headers": {k: headers[k] for k in KEPT_HEADERS if k in headers},
+            "body": body.decode("utf-8"),
+        }
+        # Write-then-rename so concurrent readers never see a partial file.
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, self.path(url))
+
+    def evict(self):
+        now = time.time()
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.max_age:
+                path.unlink(missing_ok=True)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+class CachingAdapter(HTTPAdapter):
+    """HTTPAdapter that revalidates GETs against an ETagCache."""
+
+    def __init__(self, cache, **kwargs):
+        self.cache = cache
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if request.method != "GET":
+            return super().send(request, **kwargs)
+
+        entry = self.cache.get(request.url)
+        if entry:
+            request.headers["If-None-Match"] = entry["etag"]
+
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 304 and entry:
+            response.status_code = 200
+            response.reason = "OK"
+            for name, value in entry["headers"].items():
+                response.headers.setdefault(name, value)
+            response._content = entry["body"].encode("utf-8")
+            response.from_cache = True
+        elif response.status_code == 200 and response.headers.get("ETag"):
+            self.cache.put(
+                request.url, response.headers["ETag"], response.content, response.headers
+            )
+        return response
@@ -0,0 +1,168 @@
+# Serialized org snapshot shared across scripts (ORG_SNAPSHOT_PATH).
+#
+# The GitHub -> YAML export downloads the whole membership graph anyway, so it
+# saves it: org members, pending invites, every team's members, when they were
+# fetched and the ETag of each list page they came from. Later jobs load the
+# snapshot instead of downloading the org again while it is younger than
+# ORG_SNAPSHOT_MAX_AGE_MINUTES. Past that, the ETags let them revalidate it
+# with conditional requests, whose 304s don't count against the rate limit.
+# Runs whose output depends on the org being current (the sync's writes, the
+# export's pull request) always revalidate: a sync deletes its own copy after
+# writing, but not the copy other jobs restore from the cache.
+
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import requests
+
+from github_client import PER_PAGE, REQUEST_TIMEOUT, int_env
+
+SNAPSHOT_VERSION = 1
+MINUTE = 60
+
+
+class PageRecorder:
+    """Response hook remembering the ETag of every org list page fetched.
+
+    A 304 only proves the recorded pages are unchanged, not that no page was
+    added after them, so a full last page also records the URL of the page
+    after it, which revalidation expects to find empty.
+    """
+
+    def __init__(self):
+        self.etags = {}
+        self.probes = set()
+        self.lock = threading.Lock()
+
+    def __call__(self, r, *args, **kwargs):
+        etag = r.headers.get("ETag")
+        if r.request.method != "GET" or r.status_code != 200 or not etag:
+            return
+        if "/orgs/" not in r.url:
+            return
+        probe = None
+        if "next" not in r.links:
+            items = r.json()
+            if isinstance(items, list) and len(items) >= PER_PAGE:
+                probe = next_page_url(r.url)
+        with self.lock:
+            self.etags[r.url] = etag
+            if probe:
+                self.probes.add(probe)
+
+
+def next_page_url(url):
+    parts = urlparse(url)
+    query = parse_qs(parts.query)
+    query["page"] = [str(int(query.get("page", ["1"])[0]) + 1)]
+    return parts._replace(query=urlencode(query, doseq=True)).geturl()
+
+
+class OrgSnapshot:
+    """Load and save the membership graph of one org as a JSON file."""
+
+    def __init__(self, path, max_age, clock=time.time):
+        self.path = Path(path)
+        self.max_age = max_age
+        self.clock = clock
+        self.recorder = PageRecorder()
+
+    def load(self, org, session=None, workers=1, verify=False):
+        """Return (org_members, pending_invites, team_slugs, team_members).
+
+        Returns None when there is no usable snapshot for ``org``: missing,
+        from another format version, or stale and (without ``session``, or
+        with pages that changed) not revalidated. ``verify`` revalidates it
+        however young it is.
+        """
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+        if data.get("version") != SNAPSHOT_VERSION or data.get("org") != org:
+            return None
+
+        if verify or self.clock() - data["fetched_at"] > self.max_age:
+            if session is None or not data["etags"]:
+                return None
+            try:
+                fresh = revalidate(session, data["etags"], data["probes"], workers)
+            except requests.exceptions.RequestException:
+                return None
+            if not fresh:
+                return None
+            data["fetched_at"] = self.clock()
+            self.write(data)
+
+        team_members = {slug: set(users) for slug, users in data["teams"].items()}
+        return (
+            set(data["members"]),
+            set(data["pending_invites"]),
+            set(team_members),
+            team_members,
+        )
+
+    def save(self, org, org_members, pending_invites, team_members):
+        with self.recorder.lock:
+            etags = dict(self.recorder.etags)
+            probes = sorted(self.recorder.probes)
+        self.write(
+            {
+                "version": SNAPSHOT_VERSION,
+                "org": org,
+                "fetched_at": self.clock(),
+                "members": sorted(org_members),
+                "pending_invites": sorted(pending_invites),
+                "teams": {
+                    slug: sorted(users) for slug, users in sorted(team_members.items())
+                },
+                "etags": etags,
+                "probes": probes,
+            }
+        )
+
+    def discard(self):
+        # Called after writes to the org, which make the snapshot stale.
+        self.path.unlink(missing_ok=True)
+
+    def write(self, data):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+
+def revalidate(session, etags, probes, workers=1):
+    """Return True if every page still matches its ETag and no list grew."""
+
+    def unchanged(url):
+        r = session.get(
+            url, headers={"If-None-Match": etags[url]}, timeout=REQUEST_TIMEOUT
+        )
+        if r.status_code == 304:
+            return True
+        # The ETag cache turns 304s into 200s served from disk.
+        return getattr(r, "from_cache", False) and r.headers.get("ETag") == etags[url]
+
+    def empty(url):
+        r = session.get(url, timeout=REQUEST_TIMEOUT)
+        return r.status_code == 200 and r.json() == []
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        checks = [pool.submit(unchanged, url) for url in etags]
+        checks += [pool.submit(empty, url) for url in probes]
+        return all(check.result() for check in checks)
+
+
+def open_org_snapshot():
+    path = os.environ.get("ORG_SNAPSHOT_PATH")
+    if not path:
+        return None
+    return OrgSnapshot(path, int_env("ORG_SNAPSHOT_MAX_AGE_MINUTES", 30) * MINUTE)
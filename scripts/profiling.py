@@ -0,0 +1,102 @@
+# Optional cProfile run of a script's main() (PROFILE_PATH).
+#
+# Writes the raw profile to PROFILE_PATH (load it with pstats or snakeviz)
+# and a text report next to it, with the same path ending in .txt: the run's
+# own time split into YAML parsing and rendering, sync logic, network wait
+# and waiting on worker threads, then the top PROFILE_TOP functions by
+# cumulative time.
+#
+# cProfile only sees the thread that started it. Requests sent from worker
+# threads show up as the main thread waiting on those workers.
+
+import cProfile
+import functools
+import io
+import os
+import pstats
+from pathlib import Path
+
+from github_client import int_env
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# (category, substrings of "filename:function"); the first match wins.
+CATEGORIES = (
+    ("YAML parsing and rendering", ("/yaml/", "_yaml")),
+    (
+        "network wait",
+        (
+            "/socket.py",
+            "/ssl.py",
+            "/http/client.py",
+            "/urllib3/",
+            "/requests/",
+            "/selectors.py",
+            "_socket.",
+            "_ssl.",
+            "select.",
+        ),
+    ),
+    (
+        "waiting on worker threads",
+        ("_thread.lock", "/threading.py", "/concurrent/futures/"),
+    ),
+    ("sync logic and set computation", (SCRIPTS_DIR, "'set' objects")),
+)
+OTHER = "other"
+
+
+def categorize(stats):
+    """Return {category: seconds of own time} for a pstats.Stats."""
+    totals = dict.fromkeys([name for name, _ in CATEGORIES] + [OTHER], 0.0)
+    for (filename, _, function), (_, _, own, _, _) in stats.stats.items():
+        where = f"{filename.replace(os.sep, '/')}:{function}"
+        for name, needles in CATEGORIES:
+            if any(needle in where for needle in needles):
+                totals[name] += own
+                break
+        else:
+            totals[OTHER] += own
+    return totals
+
+
+def render_report(title, stats, top):
+    totals = categorize(stats)
+    total = sum(totals.values()) or 1.0
+    lines = [
+        f"Profile of {title}: {stats.total_tt:.3f}s",
+        "",
+        "Own time by category:",
+    ]
+    for name, seconds in totals.items():
+        lines.append(f"  {name:<32} {seconds:8.3f}s {seconds / total:6.1%}")
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats("cumulative").print_stats(top)
+    return "\n".join(lines) + "\n\n" + out.getvalue()
+
+
+def profiled(fn):
+    """Decorator profiling ``fn`` when PROFILE_PATH is set."""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        path = os.environ.get("PROFILE_PATH")
+        if not path:
+            return fn(*args, **kwargs)
+        top = int_env("PROFILE_TOP", 30)
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            # Also on SystemExit, so failed runs can be profiled too.
+            profile.disable()
+            path = Path(path)
+            profile.dump_stats(path)
+            title = f"{fn.__module__}.{fn.__qualname__}"
+            report = render_report(title, pstats.Stats(profile), top)
+            path.with_suffix(".txt").write_text(report, encoding="utf-8")
+            print(f"Profile written to {path} and {path.with_suffix('.txt')}")
+
+    return wrapper
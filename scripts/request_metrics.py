@@ -0,0 +1,220 @@
+# Per-endpoint request metrics, collected by a session response hook.
+#
+# Every response is attributed to its endpoint template (e.g.
+# GET /orgs/{org}/teams/{slug}/members) with its latency, size, urllib3
+# retries and whether it cost rate limit budget. When a script's main()
+# returns or exits, the totals are appended as a Markdown table to
+# GITHUB_STEP_SUMMARY, so a slow run shows where its time went, and written
+# as JSON to METRICS_PATH. Both are opt-in: with neither set no hook is
+# installed.
+
+import functools
+import json
+import math
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urlparse
+
+# Placeholder for the path segment following each collection name.
+PLACEHOLDERS = {
+    "orgs": "{org}",
+    "teams": "{slug}",
+    "users": "{username}",
+    "members": "{username}",
+    "memberships": "{username}",
+    "invitations": "{invitation_id}",
+}
+ROOTS = ("orgs", "users", "graphql")
+
+
+def endpoint_template(url):
+    """Return the templated API path of ``url``, e.g. /users/{username}."""
+    parts = urlparse(url).path.strip("/").split("/")
+    # Drop prefixes like GitHub Enterprise Server's /api/v3.
+    for i, part in enumerate(parts):
+        if part in ROOTS:
+            parts = parts[i:]
+            break
+    template = []
+    for i, part in enumerate(parts):
+        if i % 2 and parts[i - 1] in PLACEHOLDERS:
+            part = PLACEHOLDERS[parts[i - 1]]
+        template.append(part)
+    return "/" + "/".join(template)
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.bytes = 0
+        self.retries = 0
+        self.cached = 0
+        self.rate_limit_cost = 0
+
+    def as_dict(self):
+        latencies = sorted(self.latencies)
+        return {
+            "requests": len(latencies),
+            "statuses": {str(s): n for s, n in sorted(self.statuses.items())},
+            "latency_ms": {
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "max": latencies[-1] if latencies else 0.0,
+                "total": round(sum(latencies), 1),
+            },
+            "bytes": self.bytes,
+            "retries": self.retries,
+            "cached": self.cached,
+            "rate_limit_cost": self.rate_limit_cost,
+        }
+
+
+def percentile(sorted_values, p):
+    # Nearest-rank percentile of an already sorted list.
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class RequestMetrics:
+    """Response hook aggregating request metrics per endpoint template."""
+
+    def __init__(self, script):
+        self.script = script
+        self.endpoints = {}
+        # resource -> [limit, {reset: [highest, lowest remaining seen]}]
+        self.rate_limits = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, r, *args, **kwargs):
+        key = f"{r.request.method} {endpoint_template(r.url)}"
+        latency = round(r.elapsed.total_seconds() * 1000, 1)
+        size = r.headers.get("Content-Length")
+        size = int(size) if size and size.isdigit() else len(r.content or b"")
+        history = getattr(getattr(r.raw, "retries", None), "history", ())
+        cached = getattr(r, "from_cache", False)
+        # Conditional requests answered with a 304 are free.
+        costly = not cached and r.status_code != 304
+        with self.lock:
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = self.endpoints[key] = EndpointStats()
+            stats.latencies.append(latency)
+            stats.statuses[r.status_code] += 1
+            stats.bytes += size
+            stats.retries += len(history)
+            stats.cached += cached
+            # Every attempt urllib3 retried was a request GitHub counted too.
+            stats.rate_limit_cost += costly + len(history)
+            self.record_rate_limit(r.headers)
+
+    def clear(self):
+        with self.lock:
+            self.endpoints = {}
+            self.rate_limits = {}
+
+    def record_rate_limit(self, headers):
+        # Called with the lock held.
+        try:
+            limit = int(headers["X-RateLimit-Limit"])
+            remaining = int(headers["X-RateLimit-Remaining"])
+            reset = int(headers["X-RateLimit-Reset"])
+        except (KeyError, TypeError, ValueError):
+            return
+        resource = headers.get("X-RateLimit-Resource", "core")
+        budget = self.rate_limits.setdefault(resource, [limit, {}])
+        budget[0] = limit
+        window = budget[1].setdefault(reset, [remaining, remaining])
+        window[0] = max(window[0], remaining)
+        window[1] = min(window[1], remaining)
+
+    def as_dict(self):
+        with self.lock:
+            endpoints = {
+                key: stats.as_dict() for key, stats in sorted(self.endpoints.items())
+            }
+            rate_limits = {
+                resource: {
+                    "limit": limit,
+                    "remaining": windows[max(windows)][1],
+                    # The first response of each window had already been
+                    # counted. Other clients sharing the token count too.
+                    "consumed": sum(high - low + 1 for high, low in windows.values()),
+                }
+                for resource, (limit, windows) in sorted(self.rate_limits.items())
+            }
+        return {
+            "script": self.script,
+            "endpoints": endpoints,
+            "rate_limit": rate_limits,
+        }
+
+
+def render_markdown(report):
+    lines = [
+        f"### GitHub API requests: {report['script']}",
+        "",
+        "| Endpoint | Requests | p50 ms | p95 ms | Max ms | Total s | KiB "
+        "| Retries | Cached | Rate limit |",
+        "|---|---:|---:|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    for key, stats in report["endpoints"].items():
+        latency = stats["latency_ms"]
+        lines.append(
+            f"| `{key}` | {stats['requests']} | {latency['p50']:.0f} "
+            f"| {latency['p95']:.0f} | {latency['max']:.0f} "
+            f"| {latency['total'] / 1000:.1f} | {stats['bytes'] / 1024:.0f} "
+            f"| {stats['retries']} | {stats['cached']} | {stats['rate_limit_cost']} |"
+        )
+    for resource, budget in report["rate_limit"].items():
+        lines += [
+            "",
+            f"Rate limit `{resource}`: {budget['consumed']} used during the run, "
+            f"{budget['remaining']} of {budget['limit']} left.",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(metrics):
+    """Write and reset the report of ``metrics``; runs without requests have none."""
+    if metrics is None:
+        return
+    report = metrics.as_dict()
+    metrics.clear()
+    if not report["endpoints"]:
+        return
+    path = os.environ.get("METRICS_PATH")
+    if path:
+        Path(path).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    summary = os.environ.get("GITHUB_STEP_SUMMARY")
+    if summary:
+        with open(summary, "a", encoding="utf-8") as f:
+            f.write(render_markdown(report) + "\n")
+
+
+def open_request_metrics(script):
+    """Return a RequestMetrics hook, or None when there is nowhere to report."""
+    if not (os.environ.get("METRICS_PATH") or os.environ.get("GITHUB_STEP_SUMMARY")):
+        return None
+    return RequestMetrics(script)
+
+
+def reported(metrics):
+    """Decorate a script's main() to write the report of ``metrics`` on exit."""
+
+    def decorate(main):
+        @functools.wraps(main)
+        def wrapper(*args, **kwargs):
+            try:
+                return main(*args, **kwargs)
+            finally:
+                write_metrics(metrics)
+
+        return wrapper
+
+    return decorate
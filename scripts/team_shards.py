@@ -0,0 +1,105 @@
+# Sharded team configuration (TEAMS_DIR), in place of a single teams.yaml.
+#
+# <TEAMS_DIR>/<slug>.yaml holds one team's logins as a YAML list, and
+# <TEAMS_DIR>/invite_sent.yaml the machine-managed invite_sent block. Shards
+# are read in parallel, and each carries a digest of its member list, so the
+# export only renders and rewrites the teams whose members changed, and a
+# push only makes the sync reconcile the shards it touched.
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import NamedTuple
+
+import yaml
+
+import yaml_io
+
+SUFFIX = ".yaml"
+INVITE_SENT_FILE = "invite_sent.yaml"
+
+
+class Shard(NamedTuple):
+    users: list
+    digest: str
+
+
+def members_digest(users):
+    return hashlib.sha256("\n".join(users).encode("utf-8")).hexdigest()
+
+
+def load_shards(directory, workers=1):
+    """Return {slug: Shard} for every team file in ``directory``.
+
+    Files are read and parsed ``workers`` at a time. A missing directory has
+    no teams.
+    """
+    directory = Path(directory)
+    if not directory.is_dir():
+        return {}
+    paths = sorted(
+        path for path in directory.glob(f"*{SUFFIX}") if path.name != INVITE_SENT_FILE
+    )
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        shards = pool.map(load_shard, paths)
+        return {path.stem: shard for path, shard in zip(paths, shards)}
+
+
+def load_shard(path):
+    try:
+        users = yaml_io.load(path.read_text(encoding="utf-8"))
+    except yaml.YAMLError as e:
+        raise SystemExit(f"{path} is not valid YAML: {e}")
+    if users is not None and not isinstance(users, list):
+        raise SystemExit(f"{path} must contain a YAML list of logins")
+    users = [u.strip() for u in (users or []) if isinstance(u, str) and u.strip()]
+    return Shard(users, members_digest(users))
+
+
+def load_invite_sent(directory):
+    """Return (invite_sent logins, file text); ([], "") without the file."""
+    try:
+        text = (Path(directory) / INVITE_SENT_FILE).read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return [], ""
+    config = yaml_io.load(text) or {}
+    return list(config.get("invite_sent") or []), text
+
+
+def render_invite_sent(invite_sent):
+    return yaml_io.dump_managed({"invite_sent": sorted(invite_sent)})
+
+
+def write_invite_sent(directory, text):
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / INVITE_SENT_FILE).write_text(text, encoding="utf-8")
+
+
+def write_shards(directory, teams_map, old_shards):
+    """Write the teams whose members changed and delete removed teams.
+
+    Teams whose member digest matches their shard in ``old_shards`` are
+    neither rendered nor written. Returns the slugs of the files changed.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    changed = []
+    for slug, users in sorted(teams_map.items()):
+        old = old_shards.get(slug)
+        if old is not None and old.digest == members_digest(users):
+            continue
+        (directory / f"{slug}{SUFFIX}").write_text(
+            yaml_io.dump(list(users)), encoding="utf-8"
+        )
+        changed.append(slug)
+    for slug in sorted(old_shards.keys() - teams_map.keys()):
+        (directory / f"{slug}{SUFFIX}").unlink(missing_ok=True)
+        changed.append(slug)
+    return changed
+
+
+def fingerprint(shards, invite_text):
+    """Return a text standing for the whole directory, e.g. for plan digests."""
+    lines = [f"{slug} {shard.digest}\n" for slug, shard in sorted(shards.items())]
+    return "".join(lines) + invite_text
@@ -0,0 +1,149 @@
+# Optional request timeline tracing (TRACE_PATH).
+#
+# Records a span for each sync phase and each HTTP call, and writes them at
+# exit in the Chrome trace event format, which chrome://tracing and
+# https://ui.perfetto.dev open directly. Spans are laid out per thread, so
+# the overlap reached by concurrent code paths, and the serial stalls between
+# them, show up on the timeline. Without TRACE_PATH every span is a no-op.
+
+import asyncio
+import atexit
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+from request_metrics import endpoint_template
+
+
+class Tracer:
+    """Collect trace events; also a response hook adding a span per request."""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.start = clock()
+        self.pid = os.getpid()
+        self.events = []
+        self.threads = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def now(self):
+        # Trace timestamps are microseconds.
+        return (self.clock() - self.start) * 1e6
+
+    def add(self, event):
+        thread = threading.current_thread()
+        event = {"pid": self.pid, "tid": thread.ident, **event}
+        with self.lock:
+            self.threads.setdefault(thread.ident, thread.name)
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name, cat="phase", **args):
+        start = self.now()
+        try:
+            yield
+        finally:
+            self.add(
+                {
+                    "name": name,
+                    "cat": cat,
+                    "ph": "X",
+                    "ts": start,
+                    "dur": self.now() - start,
+                    "args": args,
+                }
+            )
+
+    @contextmanager
+    def async_span(self, name, cat="phase", **args):
+        # Coroutines interleave on the event loop's thread, so their spans get
+        # async begin/end events, which viewers lay out on tracks of their own.
+        event = {"name": name, "cat": cat, "id": next(self.ids)}
+        self.add({**event, "ph": "b", "ts": self.now(), "args": args})
+        try:
+            yield
+        finally:
+            self.add({**event, "ph": "e", "ts": self.now()})
+
+    def __call__(self, r, *args, **kwargs):
+        # Called once the response headers are in; ``elapsed`` dates the start.
+        end = self.now()
+        dur = r.elapsed.total_seconds() * 1e6
+        self.add(
+            {
+                "name": f"{r.request.method} {endpoint_template(r.url)}",
+                "cat": "http",
+                "ph": "X",
+                "ts": end - dur,
+                "dur": dur,
+                "args": {"url": r.url, "status": r.status_code},
+            }
+        )
+
+    def as_dict(self):
+        with self.lock:
+            names = [
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": self.pid,
+                    "tid": tid,
+                    "args": {"name": name},
+                }
+                for tid, name in self.threads.items()
+            ]
+            events = sorted(self.events, key=lambda e: e["ts"])
+        return {"traceEvents": names + events, "displayTimeUnit": "ms"}
+
+    def write(self, path):
+        Path(path).write_text(json.dumps(self.as_dict()), encoding="utf-8")
+
+
+def span(name, **args):
+    """Context manager timing a phase when tracing is on."""
+    tracer = TRACER
+    return tracer.span(name, **args) if tracer else nullcontext()
+
+
+def async_span(name, **args):
+    """Like span(), for phases run as coroutines."""
+    tracer = TRACER
+    return tracer.async_span(name, **args) if tracer else nullcontext()
+
+
+def traced(fn):
+    """Decorator recording a span named after ``fn`` for each call."""
+    if asyncio.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            with async_span(fn.__name__):
+                return await fn(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with span(fn.__name__):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def open_tracer():
+    path = os.environ.get("TRACE_PATH")
+    if not path:
+        return None
+    tracer = Tracer()
+    atexit.register(tracer.write, path)
+    return tracer
+
+
+# The process-wide tracer (only when TRACE_PATH is set).
+TRACER = open_tracer()
@@ -0,0 +1,81 @@
+# Persistent cache of GitHub user lookups (USER_CACHE_PATH).
+#
+# Maps login -> (exists, id, checked_at) so repeated PR validations and
+# invites don't ask GitHub about the same long-standing accounts again.
+# Unknown logins expire sooner, since a missing account may be created or a
+# typo fixed at any time.
+
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from github_client import int_env
+
+HOUR = 60 * 60
+
+
+class UserCache:
+    """JSON-file backed login -> (exists, id) cache with per-result TTLs."""
+
+    def __init__(self, path, ttl, negative_ttl, clock=time.time):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.dirty = False
+        try:
+            self.entries = json.loads(self.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+        if not isinstance(self.entries, dict):
+            self.entries = {}
+
+    def get(self, login):
+        """Return (exists, id) for a fresh entry, or None."""
+        with self.lock:
+            entry = self.entries.get(login.lower())
+        if not entry:
+            return None
+        exists, uid, checked_at = entry
+        ttl = self.ttl if exists else self.negative_ttl
+        if self.clock() - checked_at > ttl:
+            return None
+        return exists, uid
+
+    def put(self, login, exists, uid=None):
+        with self.lock:
+            self.entries[login.lower()] = [bool(exists), uid, self.clock()]
+            self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            now = self.clock()
+            # Drop expired entries so the file doesn't grow forever.
+            entries = {
+                login: entry
+                for login, entry in self.entries.items()
+                if now - entry[2] <= (self.ttl if entry[0] else self.negative_ttl)
+            }
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entries, f, sort_keys=True)
+            os.replace(tmp, self.path)
+            self.dirty = False
+
+
+def open_user_cache():
+    path = os.environ.get("USER_CACHE_PATH")
+    if not path:
+        return None
+    return UserCache(
+        path,
+        ttl=int_env("USER_CACHE_TTL_HOURS", 7 * 24) * HOUR,
+        negative_ttl=int_env("USER_CACHE_NEGATIVE_TTL_HOURS", 1) * HOUR,
+    )
@@ -3,42 +3,65 @@
 import os, sys, requests, yaml
 from pathlib import Path
 
+import github_client
+from github_client import (
+    API,
+    DEFAULT_WORKERS,
+    REQUEST_TIMEOUT,
+    create_session,
+    int_env,
+    open_http_cache,
+)
+from graphql_backend import GraphQLError, graphql
+from org_snapshot import open_org_snapshot
+from profiling import profiled
+from request_metrics import open_request_metrics, reported
+import team_shards
+from user_cache import open_user_cache
+import yaml_io
+
 ORG = os.environ["ORG"]
 TOKEN = os.environ["TOKEN"]
-API = "https://api.github.com"
+WORKERS = int_env("SYNC_WORKERS", DEFAULT_WORKERS)
+
+# Per-endpoint request report (only when METRICS_PATH or a job summary is set).
+METRICS = open_request_metrics("validate_pr")
+
+# One keep-alive session for every lookup instead of a connection per user.
+SESSION = create_session(
+    TOKEN,
+    pool_size=WORKERS,
+    cache=open_http_cache(),
+    response_hooks=(METRICS,),
+)
 
-H = {
-    "Authorization": f"Bearer {TOKEN}",
-    "Accept": "application/vnd.github+json",
-    "X-GitHub-Api-Version": "2022-11-28",
-}
+# Remembers earlier lookups across runs (only when USER_CACHE_PATH is set).
+USER_CACHE = open_user_cache()
+
+# Logins resolved per GraphQL query (one aliased user() field each).
+BATCH_SIZE = 100
 
 
 def paginate(url):
-    out, page = [], 1
-    while True:
-        try:
-            r = requests.get(
-                url, headers=H, params={"per_page": 100, "page": page}, timeout=60
-            )
-            r.raise_for_status()
-            batch = r.json()
-            out.extend(batch)
-            if len(batch) < 100:
-                break
-            page += 1
-        except requests.exceptions.RequestException as e:
-            print(f"ERROR: Failed to fetch data from GitHub API: {e}")
-            sys.exit(1)
-    return out
+    return list(iter_paginate(url))
+
+
+def iter_paginate(url):
+    """Yield list items page by page, so callers can keep just the logins."""
+    try:
+        yield from github_client.iter_paginate(url, SESSION, WORKERS)
+    except requests.exceptions.RequestException as e:
+        print(f"ERROR: Failed to fetch data from GitHub API: {e}")
+        sys.exit(1)
 
 
 def user_exists(login: str) -> bool:
     """Check if a GitHub user exists."""
     try:
-        r = requests.get(f"{API}/users/{login}", headers=H, timeout=60)
+        r = SESSION.get(f"{API}/users/{login}", timeout=REQUEST_TIMEOUT)
         if r.status_code == 403:
-            # Check if it's a rate limit issue
+            # The session already waited out the limit and retried; give up
+            # if it is still exhausted.
             if (
                 "X-RateLimit-Remaining" in r.headers
                 and r.headers["X-RateLimit-Remaining"] == "0"
@@ -51,11 +74,96 @@ def user_exists(login: str) -> bool:
         sys.exit(1)
 
 
+def users_exist(logins):
+    """Return {login: exists}, batching lookups through GraphQL.
+
+    Fresh USER_CACHE entries are used as is. Batches that GraphQL can't
+    answer fall back to one REST call per login.
+    """
+    found = {}
+    missing = []
+    for login in sorted(logins):
+        cached = USER_CACHE.get(login) if USER_CACHE else None
+        if cached:
+            found[login] = cached[0]
+        else:
+            missing.append(login)
+
+    for start in range(0, len(missing), BATCH_SIZE):
+        batch = missing[start : start + BATCH_SIZE]
+        try:
+            ids = batch_lookup_users(batch)
+            results = {login: (uid is not None, uid) for login, uid in ids.items()}
+        except (GraphQLError, requests.exceptions.RequestException) as e:
+            print(f"WARNING: Batched user lookup failed ({e}); checking one by one")
+            results = {login: (user_exists(login), None) for login in batch}
+        for login, (exists, uid) in results.items():
+            found[login] = exists
+            if USER_CACHE:
+                USER_CACHE.put(login, exists, uid)
+
+    if USER_CACHE:
+        USER_CACHE.save()
+    return found
+
+
+def batch_lookup_users(logins):
+    """Return {login: user id or None} from a single aliased GraphQL query."""
+    indexes = range(len(logins))
+    params = ", ".join(f"$l{i}: String!" for i in indexes)
+    fields = " ".join(f"u{i}: user(login: $l{i}) {{ databaseId }}" for i in indexes)
+    query = f"query Users({params}) {{ {fields} }}"
+    variables = {f"l{i}": login for i, login in enumerate(logins)}
+
+    # Unknown logins come back as null fields with a NOT_FOUND error each.
+    data = graphql(SESSION, query, variables, tolerate=("NOT_FOUND",))
+    return {
+        login: (data.get(f"u{i}") or {}).get("databaseId")
+        for i, login in enumerate(logins)
+    }
+
+
+def load_base_users(path):
+    """Return every login listed in the base branch's teams.yaml.
+
+    A missing or malformed base file yields no logins, so every user in the
+    PR gets validated. A directory is read as TEAMS_DIR.
+    """
+    if path.is_dir():
+        try:
+            shards = team_shards.load_shards(path)
+        except SystemExit:  # A malformed team file
+            return set()
+        return {u for shard in shards.values() for u in shard.users}
+    try:
+        cfg = yaml_io.load(path.read_text(encoding="utf-8")) or {}
+    except (FileNotFoundError, yaml.YAMLError):
+        return set()
+    teams = cfg.get("teams") if isinstance(cfg, dict) else None
+    if not isinstance(teams, dict):
+        return set()
+    return {
+        u.strip()
+        for users in teams.values()
+        for u in (users or [])
+        if isinstance(u, str) and u.strip()
+    }
+
+
+@profiled
+@reported(METRICS)
 def main():
-    # Load teams.yaml
-    teams_path = Path("teams.yaml")
-    cfg = yaml.safe_load(teams_path.read_text(encoding="utf-8")) or {}
-    desired_team_configuration = cfg.get("teams")
+    # Load teams.yaml, or the team files in TEAMS_DIR
+    teams_dir = os.environ.get("TEAMS_DIR")
+    if teams_dir:
+        shards = team_shards.load_shards(teams_dir, WORKERS)
+        desired_team_configuration = {
+            slug: shard.users for slug, shard in shards.items()
+        }
+    else:
+        teams_path = Path("teams.yaml")
+        cfg = yaml_io.load(teams_path.read_text(encoding="utf-8")) or {}
+        desired_team_configuration = cfg.get("teams")
 
     if not isinstance(desired_team_configuration, dict):
         print(
@@ -74,17 +182,32 @@ def main():
     for users in desired_users.values():
         all_users.update(users)
 
-    # Get current org members
-    members = paginate(f"{API}/orgs/{ORG}/members")
-    org_members = {m["login"] for m in members if "login" in m}
+    # Only logins the PR adds need checking when the base version is known.
+    base_path = os.environ.get("BASE_TEAMS_YAML")
+    if base_path:
+        all_users -= load_base_users(Path(base_path))
+        print(f"Validating {len(all_users)} login(s) added by this PR")
+
+    # Get current org members, from a fresh org snapshot when there is one
+    org_members = set()
+    if all_users:
+        snapshot = open_org_snapshot()
+        state = snapshot.load(ORG, SESSION, WORKERS) if snapshot else None
+        if state is not None:
+            org_members = state[0]
+        else:
+            members = iter_paginate(f"{API}/orgs/{ORG}/members")
+            org_members = {m["login"] for m in members if "login" in m}
+
+    # Check which usernames exist on GitHub
+    existing = users_exist(all_users)
 
     # Validate each username
     invalid_users = []
     non_org_users = []
 
     for username in sorted(all_users):
-        # Check if user exists on GitHub
-        if not user_exists(username):
+        if not existing[username]:
             invalid_users.append(username)
             print(f"❌ ERROR: GitHub user '{username}' does not exist")
         elif username not in org_members:
@@ -0,0 +1,295 @@
+# Keeps teams.yaml current from GitHub webhook deliveries instead of polling.
+#
+# On start the organization is exported once, as github_to_yaml does. After
+# that every signed membership, organization and team delivery is applied to
+# the in-memory state, only the teams it touches are rebuilt, and teams.yaml
+# is rewritten with github_to_yaml.render_yaml whenever its text changes.
+# The file is the one the export would write for the same organization.
+#
+# Point an organization webhook at http://<WEBHOOK_HOST>:<WEBHOOK_PORT>/ with
+# content type application/json, the secret in WEBHOOK_SECRET, and the
+# "Memberships", "Organizations" and "Teams" events.
+
+import hashlib
+import hmac
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+from github_client import (
+    DEFAULT_WORKERS,
+    create_session,
+    fetch_org_teams,
+    int_env,
+    open_http_cache,
+)
+from github_to_yaml import (
+    build_teams_map,
+    fetch_org_membership,
+    load_previous_desired,
+    render_yaml,
+)
+from request_metrics import open_request_metrics, write_metrics
+
+EVENTS = ("membership", "organization", "team")
+
+
+def main():
+    org = require_env("ORG")
+    token = require_env("TOKEN")
+    secret = require_env("WEBHOOK_SECRET")
+    if os.environ.get("TEAMS_DIR"):
+        raise SystemExit("The webhook receiver only writes teams.yaml, not TEAMS_DIR")
+    host = os.environ.get("WEBHOOK_HOST", "127.0.0.1")
+    port = int_env("WEBHOOK_PORT", 8080)
+    workers = int_env("SYNC_WORKERS", DEFAULT_WORKERS)
+    metrics = open_request_metrics("webhook_receiver")
+    session = create_session(
+        token, pool_size=workers, cache=open_http_cache(), response_hooks=(metrics,)
+    )
+
+    def fetch():
+        return fetch_org_state(org, session, workers)
+
+    receiver = Receiver(org, secret, Path("teams.yaml"), fetch)
+    server = make_server(receiver, host, port)
+    print(f"Listening for {', '.join(EVENTS)} events on http://{host}:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        write_metrics(metrics)
+
+
+def require_env(name):
+    value = os.environ.get(name)
+    if not value:
+        raise SystemExit(f"Missing required env var: {name}")
+    return value
+
+
+def fetch_org_state(org, session, workers=1):
+    """Return (org_members, pending_invites, {slug: logins}, {team id: slug})."""
+    org_members, pending_invites = fetch_org_membership(org, session, workers)
+    team_members, team_ids = fetch_org_teams(org, session, workers)
+    return org_members, pending_invites, team_members, team_ids
+
+
+def verify_signature(secret, body, signature):
+    """Check an X-Hub-Signature-256 header against the raw request body."""
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(f"sha256={digest}", signature or "")
+
+
+def slugify(name):
+    # How GitHub derives a team's slug from its name.
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+class Receiver:
+    """Organization state kept current from webhook deliveries.
+
+    ``fetch`` returns (org_members, pending_invites, team_members, team_ids)
+    from the API; it seeds the state, and is called again for a delivery
+    that can't be applied on its own (a renamed team that isn't known).
+    """
+
+    def __init__(self, org, secret, path, fetch):
+        self.org = org
+        self.secret = secret
+        self.path = path
+        self.fetch = fetch
+        self.lock = threading.Lock()
+        self.text = path.read_text(encoding="utf-8") if path.exists() else ""
+        # What teams.yaml says, for keeping pending invitees like the export.
+        self.old_desired = load_previous_desired(path)
+        self.resync()
+
+    def resync(self):
+        self.org_members, self.pending_invites, self.team_members, self.team_ids = (
+            self.fetch()
+        )
+        self.teams_map = {}
+        self.refresh(self.team_members)
+        self.write()
+
+    def handle(self, event, body, signature):
+        """Apply one delivery; return (HTTP status, message)."""
+        if not verify_signature(self.secret, body, signature):
+            return 401, "Invalid signature"
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return 400, "Invalid JSON"
+        if (payload.get("organization") or {}).get("login") != self.org:
+            return 202, "Ignored: another organization"
+        if event not in EVENTS:
+            return 202, f"Ignored: {event} event"
+
+        with self.lock:
+            try:
+                slugs = getattr(self, f"apply_{event}")(payload)
+            except (KeyError, TypeError) as e:
+                return 400, f"Unexpected {event} payload: missing {e}"
+            if slugs is None:
+                try:
+                    self.resync()
+                except requests.exceptions.RequestException as e:
+                    # Not applied; GitHub redelivers on a 5xx.
+                    return 503, f"Could not refetch the organization: {e}"
+            else:
+                self.refresh(slugs)
+                self.write()
+        return 200, "Applied"
+
+    def apply_membership(self, payload):
+        """Apply a team membership change; return the affected slugs."""
+        if payload.get("scope") != "team":
+            return []
+        login = payload["member"]["login"]
+        team = payload["team"]
+        slug = team.get("slug") or self.team_ids.get(team.get("id"))
+        if slug is None:
+            return None
+        self.remember(team, slug)
+        if payload["action"] == "added":
+            self.team_members.setdefault(slug, set()).add(login)
+        elif payload["action"] == "removed":
+            self.team_members.get(slug, set()).discard(login)
+        if team.get("deleted"):
+            self.team_members.pop(slug, None)
+        return [slug]
+
+    def apply_organization(self, payload):
+        """Apply an org membership or invitation change."""
+        action = payload["action"]
+        if action == "member_invited":
+            login = (payload.get("invitation") or {}).get("login")
+        elif action in ("member_added", "member_removed"):
+            login = payload["membership"]["user"]["login"]
+        else:
+            return []
+        if not login:  # Invited by email
+            return []
+
+        slugs = self.teams_with(login)
+        if action == "member_invited":
+            self.pending_invites.add(login)
+        elif action == "member_added":
+            self.org_members.add(login)
+            self.pending_invites.discard(login)
+        else:
+            self.org_members.discard(login)
+            self.pending_invites.discard(login)
+            # Leaving the org also leaves every team.
+            for users in self.team_members.values():
+                users.discard(login)
+        return slugs
+
+    def apply_team(self, payload):
+        """Apply a team being created, deleted or renamed."""
+        action = payload["action"]
+        team = payload["team"]
+        slug = team["slug"]
+        if action == "created":
+            self.team_members.setdefault(slug, set())
+        elif action == "deleted":
+            self.team_members.pop(slug, None)
+        elif action == "edited" and "name" in payload.get("changes", {}):
+            old = self.team_ids.get(team.get("id")) or slugify(
+                payload["changes"]["name"]["from"]
+            )
+            if old not in self.team_members:
+                return None
+            self.team_members[slug] = self.team_members.pop(old)
+            if old in self.old_desired:
+                self.old_desired[slug] = self.old_desired.pop(old)
+            self.remember(team, slug)
+            return [old, slug]
+        else:
+            return []
+        self.remember(team, slug)
+        return [slug]
+
+    def remember(self, team, slug):
+        # Renames only carry the old name, so keep each team's slug by id.
+        if team.get("id") is not None:
+            self.team_ids[team["id"]] = slug
+
+    def teams_with(self, login):
+        return [
+            slug
+            for slug, users in self.team_members.items()
+            if login in users or login in self.old_desired.get(slug, ())
+        ]
+
+    def refresh(self, slugs):
+        """Rebuild the teams_map entries of ``slugs`` like the export does."""
+        slugs = sorted(set(slugs))
+        for slug in slugs:
+            self.teams_map.pop(slug, None)
+        present = [slug for slug in slugs if slug in self.team_members]
+        self.teams_map.update(
+            build_teams_map(
+                present,
+                [self.team_members[slug] for slug in present],
+                self.old_desired,
+                self.org_members,
+                self.pending_invites,
+            )
+        )
+
+    def render(self):
+        return render_yaml(self.teams_map, self.pending_invites)
+
+    def write(self):
+        text = self.render()
+        if text == self.text:
+            return False
+        self.path.write_text(text, encoding="utf-8")
+        self.text = text
+        # The file now holds these teams, as a rerun of the export would read.
+        self.old_desired = {slug: list(u) for slug, u in self.teams_map.items()}
+        print(f"Wrote teams.yaml with {len(self.teams_map)} teams.")
+        return True
+
+
+def make_server(receiver, host="127.0.0.1", port=0):
+    """Return an HTTP server passing POSTed deliveries to ``receiver``."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length) if length else b""
+            status, message = receiver.handle(
+                self.headers.get("X-GitHub-Event", ""),
+                body,
+                self.headers.get("X-Hub-Signature-256"),
+            )
+            data = message.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            event = self.headers.get("X-GitHub-Event") if self.headers else None
+            print(f"{event or '-'}: {format % args}")
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# YAML loading and dumping for teams.yaml, on libyaml when PyYAML has it.
+#
+# The C loader builds the same Python objects as yaml.safe_load. The C
+# emitter differs from the pure-Python one in a few corner cases (how long
+# quoted scalars are folded, empty mapping keys), so documents are only
+# dumped with it when every string in them is a short, plain token such as
+# a login or a team slug; anything else goes through yaml.SafeDumper. Output
+# is byte-identical either way.
+#
+# dump_managed() also flags the machine-managed invite_sent block.
+
+import re
+
+import yaml
+
+try:
+    from yaml import CSafeDumper, CSafeLoader
+except ImportError:  # PyYAML built without libyaml
+    CSafeDumper = None
+    CSafeLoader = None
+
+Loader = CSafeLoader or yaml.SafeLoader
+
+COMMENT = "# AUTOMATICALLY UPDATED \u2014 DO NOT EDIT THIS SECTION MANUALLY\n"
+MARKER = "invite_sent:"
+
+# Strings both emitters write as the same single-line scalar. Simple keys
+# stop at 128 characters, so stay below that.
+PLAIN_TOKEN = re.compile(r"[A-Za-z0-9_.@+/-]{1,127}")
+
+
+def load(text):
+    """yaml.safe_load(), on libyaml when available."""
+    return yaml.load(text, Loader=Loader)
+
+
+def dump(doc):
+    """yaml.safe_dump(doc, sort_keys=True, default_flow_style=False)."""
+    dumper = CSafeDumper if CSafeDumper and is_plain(doc) else yaml.SafeDumper
+    return yaml.dump(doc, Dumper=dumper, sort_keys=True, default_flow_style=False)
+
+
+def dump_managed(doc):
+    """dump(), with a warning comment above the invite_sent block."""
+    text = dump(doc)
+    if MARKER in text:
+        # Inject a warning comment without changing the YAML structure.
+        text = text.replace(MARKER, COMMENT + MARKER, 1)
+    return text
+
+
+def is_plain(doc):
+    """Return True if every string in ``doc`` is a plain token."""
+    stack = [doc]
+    match = PLAIN_TOKEN.fullmatch
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            if not match(node):
+                return False
+        elif isinstance(node, dict):
+            stack.extend(node)
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+        elif not isinstance(node, (bool, int, float)) and node is not None:
+            return False
+    return True
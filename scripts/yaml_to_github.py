@@ -1,53 +1,172 @@
 # This script considers teams.yaml as the ground truth
 # and updates the GitHub organization settings accordingly.
 
+import hashlib
+import json
 import os
 import sys
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 import requests
 import yaml
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-
-API = "https://api.github.com"
-API_VERSION = "2022-11-28"
-PER_PAGE = 100
-REQUEST_TIMEOUT = 60
-COMMENT = "# AUTOMATICALLY UPDATED \u2014 DO NOT EDIT THIS SECTION MANUALLY\n"
-MARKER = "invite_sent:"
-
-# Retry configuration for API calls
-RETRY_TOTAL = 3
-RETRY_BACKOFF_FACTOR = 1
-RETRY_STATUS_FORCELIST = [429, 500, 502, 503, 504]
-
 
+from github_client import (
+    API,
+    DEFAULT_WORKERS,
+    REQUEST_TIMEOUT,
+    choice_env,
+    create_session,
+    fetch_team_logins,
+    int_env,
+    iter_paginate,
+    open_http_cache,
+    write_changed_output,
+)
+from org_snapshot import open_org_snapshot
+from profiling import profiled
+from request_metrics import open_request_metrics, reported
+import team_shards
+from tracing import span, traced
+from user_cache import open_user_cache
+import yaml_io
+
+# "blocking" runs one request at a time; "async" uses the asyncio engine.
+ENGINES = ("blocking", "async")
+
+# "rest" lists every team separately; "graphql" bulk-fetches the whole org.
+BACKENDS = ("rest", "graphql")
+
+# "plan" only reads and saves the changes to PLAN_PATH; "apply" only writes them.
+MODES = ("sync", "plan", "apply")
+
+# Login -> id lookups shared with validate_pr (only when USER_CACHE_PATH is set).
+USER_CACHE = open_user_cache()
+
+# Per-endpoint request report (only when METRICS_PATH or a job summary is set).
+METRICS = open_request_metrics("yaml_to_github")
+
+
+@profiled
+@reported(METRICS)
 def main():
     org = require_env("ORG")
     token = require_env("TOKEN")
-    session = create_session(token)
-
-    teams_path = Path("teams.yaml")
-    config, desired, old_text = load_desired_teams(teams_path)
-
-    org_members, pending_invites, existing_slugs = fetch_org_state(org, session)
-    invited_this_run = apply_memberships(
-        org,
-        session,
-        desired,
-        org_members,
-        pending_invites,
-        existing_slugs,
+    workers = int_env("SYNC_WORKERS", DEFAULT_WORKERS)
+    engine = choice_env("SYNC_ENGINE", ENGINES)
+    backend = choice_env("FETCH_BACKEND", BACKENDS)
+    session = create_session(
+        token,
+        pool_size=workers,
+        cache=open_http_cache(),
+        response_hooks=(METRICS,),
     )
+    snapshot = open_org_snapshot()
 
-    new_text = render_yaml(
-        config, desired, org_members, pending_invites, invited_this_run
-    )
-    changed = new_text != old_text
-    if changed:
-        teams_path.write_text(new_text, encoding="utf-8")
+    mode = choice_env("SYNC_MODE", MODES)
+    plan_path = Path(os.environ.get("PLAN_PATH", "teams-plan.json"))
+
+    # TEAMS_DIR: one file per team instead of teams.yaml.
+    teams_dir = os.environ.get("TEAMS_DIR")
+    teams_path = Path("teams.yaml")
+    if teams_dir:
+        config, desired, old_text = load_desired_shards(Path(teams_dir), workers)
+    else:
+        config, desired, old_text = load_desired_teams(teams_path)
+
+    # Set on pushes: only teams changed since the previous teams.yaml (and
+    # teams of invitees who have joined since) are listed and reconciled.
+    previous = load_previous_teams(os.environ.get("PREVIOUS_TEAMS_YAML"), workers)
+    invite_sent = normalize_users(config.get("invite_sent"))
+
+    if mode == "apply":
+        # Everything needed was fetched at plan time; only writes happen here.
+        max_age = int_env("PLAN_MAX_AGE_MINUTES", 1440)
+        plan = load_plan(plan_path, org, old_text, max_age)
+        org_members = set(plan["org_members"])
+        pending_invites = set(plan["pending_invites"])
+        if engine == "async":
+            import async_sync
+
+            invited_this_run = async_sync.run(
+                async_sync.apply_plan, session, workers, org, plan
+            )
+        else:
+            invited_this_run = apply_plan(org, session, plan, workers)
     else:
+        # A revalidated org snapshot, or the GraphQL backend, brings every team's
+        # members along, so the apply step doesn't list teams again. Writes need
+        # the org as it is now, so even a young snapshot is revalidated.
+        state = snapshot.load(org, session, workers, verify=True) if snapshot else None
+        if state is None and backend == "graphql":
+            import graphql_backend
+
+            org_members, pending_invites, team_members = (
+                graphql_backend.fetch_org_snapshot(org, session)
+            )
+            state = (org_members, pending_invites, set(team_members), team_members)
+
+        if mode == "plan":
+            if state is None:
+                state = fetch_plan_state(
+                    org, session, desired, previous, invite_sent, workers
+                )
+            slugs = team_scope(desired, previous, invite_sent, state[0])
+            plan = plan_memberships(org, desired, *state, slugs=slugs)
+            write_plan(plan_path, plan, old_text)
+            print(f"Plan written to {plan_path}: {plan_summary(plan)}")
+            return
+
+        if engine == "async":
+            import async_sync
+
+            org_members, pending_invites, invited_this_run = async_sync.run(
+                async_sync.sync_memberships,
+                session,
+                workers,
+                org,
+                desired,
+                state,
+                previous,
+                invite_sent,
+            )
+        else:
+            if state is None:
+                org_members, pending_invites, existing_slugs = fetch_org_state(
+                    org, session, workers
+                )
+                team_members = None
+            else:
+                org_members, pending_invites, existing_slugs, team_members = state
+            invited_this_run = apply_memberships(
+                org,
+                session,
+                desired,
+                org_members,
+                pending_invites,
+                existing_slugs,
+                team_members=team_members,
+                workers=workers,
+                slugs=team_scope(desired, previous, invite_sent, org_members),
+            )
+    if USER_CACHE:
+        USER_CACHE.save()
+    if snapshot:
+        snapshot.discard()
+
+    if teams_dir:
+        changed = update_invite_sent_shard(
+            Path(teams_dir), desired, org_members, pending_invites, invited_this_run
+        )
+    else:
+        new_text = render_yaml(
+            config, desired, org_members, pending_invites, invited_this_run
+        )
+        changed = new_text != old_text
+        if changed:
+            teams_path.write_text(new_text, encoding="utf-8")
+    if not changed:
         print("No changes to teams.yaml needed.")
 
     write_changed_output(changed)
@@ -61,31 +180,10 @@ def require_env(name):
     return value
 
 
-def auth_headers(token):
-    return {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github+json",
-        "X-GitHub-Api-Version": API_VERSION,
-    }
-
-
-def create_session(token):
-    """Create a requests session with retry logic and exponential backoff."""
-    session = requests.Session()
-    retries = Retry(
-        total=RETRY_TOTAL,
-        backoff_factor=RETRY_BACKOFF_FACTOR,
-        status_forcelist=RETRY_STATUS_FORCELIST,
-        respect_retry_after_header=True
-    )
-    session.mount("https://", HTTPAdapter(max_retries=retries))
-    session.headers.update(auth_headers(token))
-    return session
-
-
+@traced
 def load_desired_teams(path):
     old_text = path.read_text(encoding="utf-8")
-    config = yaml.safe_load(old_text) or {}
+    config = yaml_io.load(old_text) or {}
 
     # Keep the full config so other keys round-trip unchanged.
     desired = config.get("teams")
@@ -96,119 +194,378 @@ def load_desired_teams(path):
     return config, normalized, old_text
 
 
+@traced
+def load_desired_shards(directory, workers=1):
+    """Like load_desired_teams(), for the TEAMS_DIR layout.
+
+    The returned text stands for the whole directory (team digests plus the
+    invite_sent file), so plans are tied to it like to a teams.yaml.
+    """
+    shards = team_shards.load_shards(directory, workers)
+    if not shards:
+        fail(f"No team files found in {directory}")
+    invite_sent, invite_text = team_shards.load_invite_sent(directory)
+    desired = {slug: shard.users for slug, shard in shards.items()}
+    return (
+        {"invite_sent": invite_sent},
+        desired,
+        team_shards.fingerprint(shards, invite_text),
+    )
+
+
 def normalize_users(users):
     return [u.strip() for u in (users or []) if isinstance(u, str) and u.strip()]
 
 
-def fetch_org_state(org, session):
-    members = paginate(f"{API}/orgs/{org}/members", session)
+def load_previous_teams(path, workers=1):
+    """Return {slug: users} from the previous teams.yaml, or None for a full run.
+
+    An unset path, or a missing or malformed file (e.g. on the first push),
+    falls back to reconciling every team. A directory is read as TEAMS_DIR.
+    """
+    if not path:
+        return None
+    if Path(path).is_dir():
+        try:
+            shards = team_shards.load_shards(path, workers)
+        except SystemExit:  # A malformed team file
+            return None
+        return {slug: shard.users for slug, shard in shards.items()} or None
+    try:
+        config = yaml_io.load(Path(path).read_text(encoding="utf-8")) or {}
+    except (FileNotFoundError, yaml.YAMLError):
+        return None
+    teams = config.get("teams") if isinstance(config, dict) else None
+    if not isinstance(teams, dict):
+        return None
+    return {slug: normalize_users(users) for slug, users in teams.items()}
+
+
+def team_scope(desired, previous, invite_sent, org_members):
+    """Return the slugs to reconcile, sorted.
+
+    Without a previous teams.yaml that's every team. Otherwise it's the teams
+    whose member lists changed, plus the teams of invite_sent users who have
+    joined the org since and can now be added.
+    """
+    if previous is None:
+        return sorted(desired)
+    joined = set(invite_sent) & org_members
+    return sorted(
+        slug
+        for slug, users in desired.items()
+        if set(users) != set(previous.get(slug, ())) or joined & set(users)
+    )
+
+
+def fetch_plan_state(org, session, desired, previous, invite_sent, workers=1):
+    org_members, pending_invites, existing_slugs = fetch_org_state(
+        org, session, workers
+    )
+    check_team_slugs(org, desired, existing_slugs)
+    slugs = team_scope(desired, previous, invite_sent, org_members)
+    team_members = fetch_team_logins(org, session, slugs, workers)
+    return org_members, pending_invites, existing_slugs, team_members
+
+
+@traced
+def fetch_org_state(org, session, workers=1):
+    members = iter_paginate(f"{API}/orgs/{org}/members", session, workers)
     org_members = {m["login"] for m in members if "login" in m}
 
-    invites = paginate(f"{API}/orgs/{org}/invitations", session)
+    invites = iter_paginate(f"{API}/orgs/{org}/invitations", session, workers)
     pending_invites = {i.get("login") for i in invites if i.get("login")}
 
-    teams = paginate(f"{API}/orgs/{org}/teams", session)
+    teams = iter_paginate(f"{API}/orgs/{org}/teams", session, workers)
     existing_slugs = {t["slug"] for t in teams if "slug" in t}
 
     return org_members, pending_invites, existing_slugs
 
 
+@traced
 def apply_memberships(
-    org, session, desired, org_members, pending_invites, existing_slugs
+    org,
+    session,
+    desired,
+    org_members,
+    pending_invites,
+    existing_slugs,
+    team_members=None,
+    workers=1,
+    slugs=None,
 ):
-    invited_this_run = set()
+    # team_members (slug -> logins) skips listing teams when already known;
+    # slugs limits listing and reconciling to those teams.
+    check_team_slugs(org, desired, existing_slugs)
+    if slugs is None:
+        slugs = sorted(desired)
+    if team_members is None:
+        team_members = fetch_team_logins(org, session, slugs, workers)
+
+    plan = plan_memberships(
+        org,
+        desired,
+        org_members,
+        pending_invites,
+        existing_slugs,
+        team_members,
+        slugs=slugs,
+    )
+    return apply_plan(org, session, plan, workers)
 
-    for slug, users in sorted(desired.items()):
+
+def check_team_slugs(org, desired, existing_slugs):
+    for slug in sorted(desired):
         if slug not in existing_slugs:
             fail(f"Team slug '{slug}' does not exist in org '{org}'")
 
-        want = set(users)
-        invited_this_run.update(
-            invite_missing_members(org, session, want, org_members, pending_invites)
-        )
 
-        current_members = paginate(f"{API}/orgs/{org}/teams/{slug}/members", session)
-        have = {m["login"] for m in current_members if "login" in m}
-        reconcile_team(org, session, slug, want, have, org_members)
+@traced
+def plan_memberships(
+    org,
+    desired,
+    org_members,
+    pending_invites,
+    existing_slugs,
+    team_members,
+    slugs=None,
+):
+    """Return the invites and per-team changes that make the org match desired.
+
+    Only the teams in ``slugs`` (default: all) are compared. The plan is plain
+    JSON data: apply_plan() executes it without fetching anything, and
+    write_plan() saves it for a later SYNC_MODE=apply run.
+    """
+    check_team_slugs(org, desired, existing_slugs)
+
+    # Invite once per login, even when it's wanted in several teams.
+    want_all = set().union(*(set(users) for users in desired.values()))
+    teams = {}
+    for slug in sorted(desired) if slugs is None else slugs:
+        have = set(team_members.get(slug, ()))
+        to_add, to_remove = membership_changes(set(desired[slug]), have, org_members)
+        if to_add or to_remove:
+            teams[slug] = {"add": to_add, "remove": to_remove}
+
+    return {
+        "org": org,
+        "org_members": sorted(org_members),
+        "pending_invites": sorted(pending_invites),
+        "invites": invite_candidates(want_all, org_members, pending_invites),
+        "teams": teams,
+    }
+
 
+@traced
+def apply_plan(org, session, plan, workers=1):
+    """Send a plan's invites, then its team writes; return the invited logins."""
+    invited_this_run = invite_logins(org, session, plan["invites"], workers)
+    run_mutations(session, plan_mutations(org, plan), workers)
     return invited_this_run
 
 
-def invite_missing_members(org, session, want, org_members, pending_invites):
-    invited = set()
-    for login in sorted(want):
-        # Avoid duplicate invites by skipping members and pending invites.
-        if login in org_members or login in pending_invites:
-            continue
-        if invite_by_login(org, login, session):
-            invited.add(login)
-    return invited
+def plan_mutations(org, plan):
+    """Return {slug: team_mutations()} for a plan's teams, in slug order."""
+    return {
+        slug: team_mutations(org, slug, changes["add"], changes["remove"])
+        for slug, changes in sorted(plan["teams"].items())
+    }
+
 
+def plan_summary(plan):
+    adds = sum(len(changes["add"]) for changes in plan["teams"].values())
+    removes = sum(len(changes["remove"]) for changes in plan["teams"].values())
+    return (
+        f"{len(plan['invites'])} invite(s), {adds} add(s), {removes} remove(s) "
+        f"across {len(plan['teams'])} team(s)"
+    )
 
-def reconcile_team(org, session, slug, want, have, org_members):
+
+def write_plan(path, plan, teams_text):
+    # The teams.yaml digest lets apply refuse a plan made for other contents.
+    plan = {
+        **plan,
+        "teams_yaml_sha256": hashlib.sha256(teams_text.encode("utf-8")).hexdigest(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    path.write_text(json.dumps(plan, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def load_plan(path, org, teams_text, max_age_minutes):
+    try:
+        plan = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        fail(f"No plan at {path}; run with SYNC_MODE=plan first")
+    if plan.get("org") != org:
+        fail(f"Plan at {path} is for org '{plan.get('org')}', not '{org}'")
+    digest = hashlib.sha256(teams_text.encode("utf-8")).hexdigest()
+    if plan.get("teams_yaml_sha256") != digest:
+        fail(f"Plan at {path} was made for a different teams.yaml; plan again")
+    # The org keeps changing after planning; an old plan's writes may undo that.
+    try:
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(plan["created_at"])
+    except (KeyError, TypeError, ValueError):
+        age = None
+    if age is None or age > timedelta(minutes=max_age_minutes):
+        fail(f"Plan at {path} is older than {max_age_minutes} minutes; plan again")
+    return plan
+
+
+@traced
+def invite_logins(org, session, logins, workers=1):
+    """Invite ``logins`` to the org; return who was invited.
+
+    Two pipelined stages of ``workers`` threads each: user ids are looked up
+    concurrently, and each invitation is posted as soon as its id arrives.
+    """
+    if not logins:
+        return set()
+
+    workers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=workers) as lookups, ThreadPoolExecutor(
+        max_workers=workers
+    ) as posts:
+        resolving = {
+            lookups.submit(resolve_user_id, login, session): login for login in logins
+        }
+        results = {}
+        for future in as_completed(resolving):
+            login = resolving[future]
+            uid, error = future.result()
+            if error:
+                results[login] = Future()
+                results[login].set_result((None, error))
+            else:
+                results[login] = posts.submit(post_invitation, org, login, uid, session)
+        invited = report_results([results[login].result() for login in logins])
+
+    return {login for login, ok in zip(logins, invited) if ok}
+
+
+def invite_candidates(want, org_members, pending_invites):
+    # Avoid duplicate invites by skipping members and pending invites.
+    return sorted(want - org_members - pending_invites)
+
+
+def membership_changes(want, have, org_members):
     # Only org members can be added to teams.
     to_add = sorted((want & org_members) - have)
     to_remove = sorted(have - want)
+    return to_add, to_remove
 
+
+def team_mutations(org, slug, to_add, to_remove):
+    """Return (method, url, done, failed) for each write, in log order."""
+    mutations = []
     for login in to_add:
         url = f"{API}/orgs/{org}/teams/{slug}/memberships/{login}"
-        r = session.put(url, timeout=REQUEST_TIMEOUT)
-        if r.status_code >= 400:
-            fail(f"Failed adding {login} to {slug}: {r.status_code} {r.text}")
-        print(f"ADD {slug}: {login}")
-
+        mutations.append(
+            ("PUT", url, f"ADD {slug}: {login}", f"Failed adding {login} to {slug}")
+        )
     for login in to_remove:
         url = f"{API}/orgs/{org}/teams/{slug}/memberships/{login}"
-        r = session.delete(url, timeout=REQUEST_TIMEOUT)
-        if r.status_code >= 400:
-            fail(f"Failed removing {login} from {slug}: {r.status_code} {r.text}")
-        print(f"REMOVE {slug}: {login}")
+        mutations.append(
+            (
+                "DELETE",
+                url,
+                f"REMOVE {slug}: {login}",
+                f"Failed removing {login} from {slug}",
+            )
+        )
+    return mutations
 
 
+@traced
+def run_mutations(session, teams, workers=1):
+    """Send ``workers`` membership writes at a time, then report them in order.
+
+    ``teams`` maps slugs to their team_mutations(). Up to ``workers`` teams
+    queue writes on one shared pool, so small teams don't wait on big ones,
+    and each team's span lasts until its last write settles. A failed write
+    doesn't stop the others; failures are listed together and fail the run
+    once every write has settled.
+    """
+
+    def send(mutation):
+        method, url, done, failed = mutation
+        request = session.put if method == "PUT" else session.delete
+        try:
+            r = request(url, timeout=REQUEST_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            return None, f"{failed}: {e}"
+        if r.status_code >= 400:
+            return None, f"{failed}: {r.status_code} {r.text}"
+        return True, done
+
+    def reconcile(slug):
+        with span("reconcile_team", slug=slug):
+            sending = [writes.submit(send, mutation) for mutation in teams[slug]]
+            return [future.result() for future in sending]
+
+    teams = {slug: mutations for slug, mutations in teams.items() if mutations}
+    if not teams:
+        return []
+    workers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=workers) as writes, ThreadPoolExecutor(
+        max_workers=workers
+    ) as pool:
+        results = pool.map(reconcile, teams)
+        return report_results([result for team in results for result in team])
+
+
+def report_results(results):
+    """Print (ok, message) results in order; fail once if any errored.
+
+    ``ok`` is None for errors, so one failed request doesn't stop the others
+    from completing and being logged.
+    """
+    errors = []
+    for ok, message in results:
+        if ok is None:
+            errors.append(message)
+        else:
+            print(message)
+    if errors:
+        for message in errors:
+            print(message, file=sys.stderr)
+        fail(f"{len(errors)} request(s) failed")
+    return [ok for ok, _ in results]
+
+
+@traced
 def render_yaml(config, desired, org_members, pending_invites, invited_this_run):
+    config["teams"] = desired
+    config["invite_sent"] = invite_sent_status(
+        desired, org_members, pending_invites, invited_this_run
+    )
+
+    return yaml_io.dump_managed(config)
+
+
+def invite_sent_status(desired, org_members, pending_invites, invited_this_run):
     desired_all = set()
     for users in desired.values():
         desired_all.update(users)
 
     # invite_sent is a status cache: desired users with pending invites and no membership yet.
-    invite_sent = sorted(
-        ((pending_invites | invited_this_run) & desired_all) - org_members
-    )
+    return sorted(((pending_invites | invited_this_run) & desired_all) - org_members)
 
-    config["teams"] = desired
-    config["invite_sent"] = invite_sent
-
-    new_text = yaml.safe_dump(config, sort_keys=True, default_flow_style=False)
-    if MARKER in new_text:
-        # Inject a warning comment without changing the YAML structure.
-        new_text = new_text.replace(MARKER, COMMENT + MARKER, 1)
-    return new_text
-
-
-def write_changed_output(changed):
-    out = os.environ.get("GITHUB_OUTPUT")
-    if out:
-        # Let downstream workflow steps know whether teams.yaml was updated.
-        with open(out, "a", encoding="utf-8") as f:
-            f.write(f"teams_yaml_changed={'true' if changed else 'false'}\n")
-
-
-def paginate(url, session):
-    # GitHub REST pagination: keep fetching until the short page.
-    out, page = [], 1
-    while True:
-        r = session.get(
-            url,
-            params={"per_page": PER_PAGE, "page": page},
-            timeout=REQUEST_TIMEOUT,
-        )
-        r.raise_for_status()
-        batch = r.json()
-        out.extend(batch)
-        if len(batch) < PER_PAGE:
-            break
-        page += 1
-    return out
+
+def update_invite_sent_shard(
+    directory, desired, org_members, pending_invites, invited_this_run
+):
+    """Rewrite TEAMS_DIR's invite_sent file if needed; return whether it changed.
+
+    Team files are edited by people and are left as they are.
+    """
+    new_text = team_shards.render_invite_sent(
+        invite_sent_status(desired, org_members, pending_invites, invited_this_run)
+    )
+    _, old_text = team_shards.load_invite_sent(directory)
+    if new_text == old_text:
+        return False
+    team_shards.write_invite_sent(directory, new_text)
+    return True
 
 
 def fail(msg):
@@ -216,36 +573,52 @@ def fail(msg):
     raise SystemExit(2)
 
 
-def get_user_id(login, session):
-    r = session.get(f"{API}/users/{login}", timeout=REQUEST_TIMEOUT)
-    if r.status_code == 404:
-        fail(f"Unknown GitHub user: {login}")
-    r.raise_for_status()
+def resolve_user_id(login, session):
+    """Return (user id, None), or (None, error message) if the lookup fails."""
+    # Only trust cached hits: a stale "unknown user" would abort the sync.
+    cached = USER_CACHE.get(login) if USER_CACHE else None
+    if cached and cached[0] and cached[1]:
+        return int(cached[1]), None
+
+    try:
+        r = session.get(f"{API}/users/{login}", timeout=REQUEST_TIMEOUT)
+        if r.status_code == 404:
+            return None, f"Unknown GitHub user: {login}"
+        r.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        return None, f"Could not look up {login}: {e}"
     uid = r.json().get("id")
     if not uid:
-        fail(f"Could not resolve user id for {login}")
-    return int(uid)
+        return None, f"Could not resolve user id for {login}"
+    if USER_CACHE:
+        USER_CACHE.put(login, True, int(uid))
+    return int(uid), None
 
 
-def invite_by_login(org, login, session):
-    uid = get_user_id(login, session)
-    r = session.post(
-        f"{API}/orgs/{org}/invitations",
-        json={"invitee_id": uid},
-        timeout=REQUEST_TIMEOUT,
-    )
+def post_invitation(org, login, uid, session):
+    try:
+        r = session.post(
+            f"{API}/orgs/{org}/invitations",
+            json={"invitee_id": uid},
+            timeout=REQUEST_TIMEOUT,
+        )
+    except requests.exceptions.RequestException as e:
+        return None, f"Invite failed for {login}: {e}"
+    return invitation_result(login, r)
+
+
+def invitation_result(login, r):
+    """Return (invited, message) for an invitation response; ok=None on errors."""
     if r.status_code == 201:
-        print(f"INVITED: {login}")
-        return True
+        return True, f"INVITED: {login}"
     if r.status_code == 422:
         # already invited / already a member / etc.
         try:
             msg = r.json().get("message", r.text)
         except Exception:
             msg = r.text
-        print(f"INVITE SKIPPED: {login} -> {msg}")
-        return False
-    fail(f"Invite failed for {login}: {r.status_code} {r.text}")
+        return False, f"INVITE SKIPPED: {login} -> {msg}"
+    return None, f"Invite failed for {login}: {r.status_code} {r.text}"
 
 
 if __name__ == "__main__":
@@ -0,0 +1,325 @@
+"""A local stand-in for the GitHub API, served over real HTTP for tests."""
+
+import hashlib
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+MAX_PER_PAGE = 100
+
+
+class FakeGitHub:
+    """Serve an in-memory organization on 127.0.0.1.
+
+    REST: the org members, invitations, teams, team members, team
+    memberships and users endpoints, paginated with ``per_page``/``page``
+    and Link headers like GitHub's, and answering with ``X-RateLimit-*``
+    headers (403 once ``rate_limit`` requests are used up). List pages carry
+    ETags, and a matching ``If-None-Match`` gets a 304 (counted in
+    ``not_modified``). Invitations and membership writes change the
+    organization.
+
+    GraphQL: the operations sent by graphql_backend and validate_pr are
+    dispatched on their operation name and paginated with real cursors,
+    honouring the ``first``/``after`` variables.
+
+    ``latency`` seconds are added to every response, and a ``failure_rate``
+    share of requests (drawn from a ``seed``ed generator) fail with a 502.
+    """
+
+    def __init__(
+        self,
+        org,
+        members=(),
+        pending=(),
+        teams=None,
+        users=(),
+        latency=0.0,
+        failure_rate=0.0,
+        seed=0,
+        rate_limit=5000,
+    ):
+        self.org = org
+        self.members = sorted(members)
+        self.pending = sorted(pending)
+        self.teams = {slug: sorted(users) for slug, users in (teams or {}).items()}
+        # Accounts that exist on GitHub, whether in the org or not.
+        logins = sorted(set(users) | set(self.members) | set(self.pending))
+        self.user_ids = {login.lower(): i for i, login in enumerate(logins, 1)}
+        self.logins = {login.lower(): login for login in logins}
+        self.logins_by_id = dict(enumerate(logins, 1))
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.rate_limit = rate_limit
+        self.remaining = {"core": rate_limit, "graphql": rate_limit}
+        self.reset = int(time.time()) + 3600
+        self.requests = []
+        self.counts = Counter()
+        self.failures = 0
+        self.not_modified = 0
+        self.lock = threading.Lock()
+        self._server = None
+
+    def __enter__(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self.dispatch("GET")
+
+            def do_PUT(self):
+                self.dispatch("PUT")
+
+            def do_DELETE(self):
+                self.dispatch("DELETE")
+
+            def do_POST(self):
+                self.dispatch("POST")
+
+            def dispatch(self, method):
+                length = int(self.headers.get("Content-Length", 0))
+                raw = self.rfile.read(length) if length else b""
+                body = json.loads(raw) if raw else None
+                url = urlparse(self.path)
+                status, payload, headers = fake.handle(
+                    method,
+                    url.path,
+                    parse_qs(url.query),
+                    body,
+                    self.base_url(),
+                    self.headers.get("If-None-Match"),
+                )
+                data = b"" if payload is None else json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if data:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def base_url(self):
+                host, port = self.server.server_address
+                return f"http://{host}:{port}"
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        ).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def graphql_url(self):
+        return f"{self.url}/graphql"
+
+    def handle(self, method, path, query, body, base_url, if_none_match=None):
+        """Return (status, JSON payload or None, extra headers)."""
+        if self.latency:
+            time.sleep(self.latency)
+        resource = "graphql" if path == "/graphql" else "core"
+        with self.lock:
+            self.counts[f"{method} {endpoint(path)}"] += 1
+            self.remaining[resource] -= 1
+            remaining = self.remaining[resource]
+            failed = self.failure_rate and self.random.random() < self.failure_rate
+            self.failures += bool(failed)
+        headers = {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(max(remaining, 0)),
+            "X-RateLimit-Reset": str(self.reset),
+            "X-RateLimit-Used": str(self.rate_limit - max(remaining, 0)),
+            "X-RateLimit-Resource": resource,
+        }
+        if remaining < 0:
+            return 403, {"message": "API rate limit exceeded"}, headers
+        if failed:
+            return 502, {"message": "Server Error"}, headers
+
+        if resource == "graphql":
+            self.requests.append(body)
+            payload = self.graphql(body["query"], body.get("variables") or {})
+            return 200, payload, headers
+        status, payload, extra = self.rest(method, path, query, body, base_url)
+        if method == "GET" and status == 200 and isinstance(payload, list):
+            digest = hashlib.sha1(json.dumps(payload).encode()).hexdigest()
+            extra = {**extra, "ETag": f'"{digest}"'}
+            if if_none_match == extra["ETag"]:
+                with self.lock:
+                    self.not_modified += 1
+                return 304, None, {**headers, **extra}
+        return status, payload, {**headers, **extra}
+
+    def rest(self, method, path, query, body, base_url):
+        parts = path.strip("/").split("/")
+        not_found = (404, {"message": "Not Found"}, {})
+
+        if parts[:1] == ["users"] and len(parts) == 2 and method == "GET":
+            uid = self.user_ids.get(parts[1].lower())
+            if uid is None:
+                return not_found
+            return 200, {"login": self.logins[parts[1].lower()], "id": uid}, {}
+
+        if parts[:2] != ["orgs", self.org]:
+            return not_found
+        rest = parts[2:]
+
+        with self.lock:
+            if rest == ["members"] and method == "GET":
+                items, render = self.members, self.user
+            elif rest == ["invitations"] and method == "GET":
+                items, render = self.pending, self.user
+            elif rest == ["invitations"] and method == "POST":
+                return self.invite(body.get("invitee_id"))
+            elif rest == ["teams"] and method == "GET":
+                items, render = sorted(self.teams), self.team
+            elif len(rest) == 3 and rest[0] == "teams" and rest[2] == "members":
+                if rest[1] not in self.teams or method != "GET":
+                    return not_found
+                items, render = self.teams[rest[1]], self.user
+            elif len(rest) == 4 and rest[0] == "teams" and rest[2] == "memberships":
+                return self.membership(method, rest[1], rest[3])
+            else:
+                return not_found
+            status, items, headers = self.page(items, path, query, base_url)
+        return status, [render(item) for item in items], headers
+
+    def user(self, login):
+        return {"login": login, "id": self.user_ids[login.lower()]}
+
+    @staticmethod
+    def team(slug):
+        return {"slug": slug, "name": slug}
+
+    def page(self, items, path, query, base_url):
+        per_page = min(int(query.get("per_page", ["30"])[0]), MAX_PER_PAGE)
+        page = int(query.get("page", ["1"])[0])
+        last = max(1, -(-len(items) // per_page))
+        links = {"first": 1, "last": last}
+        if page > 1:
+            links["prev"] = page - 1
+        if page < last:
+            links["next"] = page + 1
+        link = ", ".join(
+            f'<{base_url}{path}?per_page={per_page}&page={n}>; rel="{rel}"'
+            for rel, n in links.items()
+        )
+        start = (page - 1) * per_page
+        return 200, items[start : start + per_page], {"Link": link}
+
+    def invite(self, invitee_id):
+        # Called with the lock held.
+        login = self.logins_by_id.get(invitee_id)
+        if login is None:
+            return 422, {"message": "Invitee not found"}, {}
+        if login in self.members or login in self.pending:
+            message = "Invitee is already a part of this organization"
+            return 422, {"message": message}, {}
+        self.pending = sorted(self.pending + [login])
+        return 201, {"login": login, "id": invitee_id}, {}
+
+    def membership(self, method, slug, login):
+        # Called with the lock held.
+        if slug not in self.teams:
+            return 404, {"message": "Not Found"}, {}
+        team = self.teams[slug]
+        if method == "PUT":
+            if login not in self.members:
+                return 422, {"message": "User is not an organization member"}, {}
+            if login not in team:
+                self.teams[slug] = sorted(team + [login])
+            return 200, {"state": "active", "role": "member"}, {}
+        if method == "DELETE":
+            if login in team:
+                team.remove(login)
+            return 204, None, {}
+        return 404, {"message": "Not Found"}, {}
+
+    def graphql(self, query, variables):
+        operation = re.search(r"query\s+(\w+)", query).group(1)
+        if operation == "Users":
+            return self.graphql_users(variables)
+        if variables.get("org") != self.org:
+            return {"data": {"organization": None}, "errors": [
+                {"type": "NOT_FOUND", "message": "Could not resolve to an Organization"}
+            ]}
+        first, after = variables["first"], variables.get("after")
+
+        with self.lock:
+            if operation == "OrgMembers":
+                conn = {"membersWithRole": self.connection(self.members, first, after)}
+            elif operation == "PendingMembers":
+                conn = {"pendingMembers": self.connection(self.pending, first, after)}
+            elif operation == "OrgTeams":
+                teams = self.connection(sorted(self.teams), first, after)
+                teams["nodes"] = [
+                    {
+                        "slug": node["login"],
+                        "members": self.connection(
+                            self.teams[node["login"]], first, None
+                        ),
+                    }
+                    for node in teams["nodes"]
+                ]
+                conn = {"teams": teams}
+            elif operation == "TeamMembers":
+                users = self.teams[variables["slug"]]
+                conn = {"team": {"members": self.connection(users, first, after)}}
+            else:
+                return {"errors": [{"message": f"Unknown operation {operation}"}]}
+        return {"data": {"organization": conn}}
+
+    def graphql_users(self, variables):
+        # Aliased lookups: u0: user(login: $l0) ... as sent by validate_pr.
+        data, errors = {}, []
+        for name, login in variables.items():
+            alias = "u" + name[1:]
+            uid = self.user_ids.get(login.lower())
+            data[alias] = {"databaseId": uid} if uid else None
+            if not uid:
+                errors.append({
+                    "type": "NOT_FOUND",
+                    "path": [alias],
+                    "message": f"Could not resolve to a User with login '{login}'.",
+                })
+        return {"data": data, "errors": errors} if errors else {"data": data}
+
+    @staticmethod
+    def connection(items, first, after):
+        start = int(after) if after else 0
+        end = start + first
+        return {
+            "pageInfo": {"hasNextPage": end < len(items), "endCursor": str(end)},
+            "nodes": [{"login": item} for item in items[start:end]],
+        }
+
+
+def endpoint(path):
+    """Collapse a request path to its endpoint, e.g. /orgs/{org}/teams/{slug}."""
+    parts = path.strip("/").split("/")
+    names = {1: "{org}", 3: "{slug}", 5: "{login}"} if parts[:1] == ["orgs"] else {
+        1: "{login}"
+    }
+    return "/" + "/".join(names.get(i, part) for i, part in enumerate(parts))
@@ -0,0 +1,238 @@
+"""Tests for the asyncio sync engine in async_sync.py."""
+
+import io
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest.mock import MagicMock
+import sys
+import os
+
+import requests
+
+# Set required environment variables before importing
+os.environ['ORG'] = 'test-org'
+os.environ['TOKEN'] = 'test-token'
+
+# Add parent directory to path to import the script
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import async_sync
+import github_to_yaml
+
+
+def response(status_code=200, payload=None):
+    r = MagicMock()
+    r.status_code = status_code
+    r.json.return_value = payload if payload is not None else []
+    r.text = ''
+    return r
+
+
+class FakeOrg:
+    """Route session requests to a small in-memory organization."""
+
+    def __init__(self, members, invites, teams):
+        self.members = members
+        self.invites = invites
+        self.teams = teams
+        self.calls = []
+
+    def session(self):
+        session = MagicMock()
+        session.request.side_effect = self.request
+        session.get.side_effect = lambda url, **kw: self.request('GET', url, **kw)
+        return session
+
+    def request(self, method, url, params=None, json=None, timeout=None):
+        self.calls.append((method, url))
+        path = url.replace(async_sync.API, '')
+        if path.endswith('/unreachable'):  # a member's PUT or a user lookup
+            raise requests.exceptions.ConnectionError('connection reset')
+        if method == 'GET' and path == '/orgs/test-org/members':
+            return response(payload=[{'login': u} for u in sorted(self.members)])
+        if method == 'GET' and path == '/orgs/test-org/invitations':
+            return response(payload=[{'login': u} for u in sorted(self.invites)])
+        if method == 'GET' and path == '/orgs/test-org/teams':
+            return response(payload=[{'slug': s} for s in self.teams])
+        if method == 'GET' and path.endswith('/members'):
+            slug = path.split('/')[4]
+            return response(payload=[{'login': u} for u in self.teams[slug]])
+        if method == 'GET' and path.startswith('/users/'):
+            if path.endswith('ghost'):
+                return response(404)
+            return response(payload={'id': 42})
+        if method == 'POST':
+            return response(201)
+        return response(200)
+
+
+class TestAsyncExport(unittest.TestCase):
+    """Test the async export path."""
+
+    def test_export_matches_blocking_render(self):
+        """Test that the async export renders the same YAML as the blocking one."""
+        org = FakeOrg(
+            members={'alice', 'bob', 'charlie'},
+            invites={'dave'},
+            teams={'developers': ['alice', 'bob'], 'admins': ['charlie']},
+        )
+        session = org.session()
+        old_desired = {'developers': ['alice', 'bob', 'dave']}
+
+        _, pending, team_members = async_sync.run(
+            async_sync.fetch_org, session, 4, 'test-org'
+        )
+        teams_map = github_to_yaml.export_teams(
+            team_members, old_desired, org.members, pending
+        )
+
+        expected = github_to_yaml.build_teams_map(
+            ['admins', 'developers'],
+            [{'charlie'}, {'alice', 'bob'}],
+            old_desired,
+            org.members,
+            org.invites,
+        )
+        self.assertEqual(teams_map, expected)
+        self.assertEqual(
+            github_to_yaml.render_yaml(teams_map, pending),
+            github_to_yaml.render_yaml(expected, org.invites),
+        )
+
+
+class TestAsyncApply(unittest.TestCase):
+    """Test the async apply path."""
+
+    def run_sync(self, org, desired):
+        session = org.session()
+        out = io.StringIO()
+        with redirect_stdout(out):
+            result = async_sync.run(
+                async_sync.sync_memberships, session, 4, 'test-org', desired
+            )
+        return result, out.getvalue().splitlines()
+
+    def test_adds_removes_and_invites(self):
+        """Test that adds, removes and invites are sent and logged in order."""
+        org = FakeOrg(
+            members={'alice', 'bob', 'charlie'},
+            invites=set(),
+            teams={'developers': ['alice', 'bob']},
+        )
+        desired = {'developers': ['alice', 'charlie', 'erin']}
+
+        (_, _, invited), lines = self.run_sync(org, desired)
+
+        self.assertEqual(invited, {'erin'})
+        self.assertEqual(
+            lines,
+            ['INVITED: erin', 'ADD developers: charlie', 'REMOVE developers: bob'],
+        )
+        self.assertIn(('POST', f'{async_sync.API}/orgs/test-org/invitations'), org.calls)
+
+    def test_user_invited_once_across_teams(self):
+        """Test that a user wanted by several teams gets a single invite."""
+        org = FakeOrg(
+            members={'alice'},
+            invites=set(),
+            teams={'developers': ['alice'], 'admins': ['alice']},
+        )
+        desired = {'developers': ['alice', 'erin'], 'admins': ['alice', 'erin']}
+
+        self.run_sync(org, desired)
+
+        posts = [c for c in org.calls if c[0] == 'POST']
+        self.assertEqual(len(posts), 1)
+
+    def test_incremental_sync_lists_changed_teams_only(self):
+        """Test that a previous teams.yaml limits which teams are listed."""
+        org = FakeOrg(
+            members={'alice', 'bob'},
+            invites=set(),
+            teams={'developers': ['alice'], 'admins': ['alice']},
+        )
+        session = org.session()
+        desired = {'developers': ['alice', 'bob'], 'admins': ['alice']}
+        previous = {'developers': ['alice'], 'admins': ['alice']}
+
+        with redirect_stdout(io.StringIO()):
+            async_sync.run(
+                async_sync.sync_memberships, session, 4, 'test-org', desired,
+                None, previous, [],
+            )
+
+        team_lists = [url for _, url in org.calls if url.endswith('/members')]
+        self.assertEqual(
+            team_lists,
+            [
+                f'{async_sync.API}/orgs/test-org/members',
+                f'{async_sync.API}/orgs/test-org/teams/developers/members',
+            ],
+        )
+
+    def test_fails_for_nonexistent_team(self):
+        """Test that unknown team slugs abort before any write."""
+        org = FakeOrg(members={'alice'}, invites=set(), teams={'developers': []})
+
+        with self.assertRaises(SystemExit):
+            self.run_sync(org, {'nonexistent-team': ['alice']})
+        self.assertFalse([c for c in org.calls if c[0] != 'GET'])
+
+    def test_unknown_user_fails_after_other_requests(self):
+        """Test that a failed request is reported once all others settle."""
+        org = FakeOrg(
+            members={'alice'}, invites=set(), teams={'developers': []}
+        )
+
+        with self.assertRaises(SystemExit):
+            self.run_sync(org, {'developers': ['alice', 'ghost']})
+        self.assertIn(
+            ('PUT', f'{async_sync.API}/orgs/test-org/teams/developers/memberships/alice'),
+            org.calls,
+        )
+
+    def test_connection_errors_are_reported_not_raised(self):
+        """Test that requests that raise are reported like failed ones."""
+        for members in ({'alice', 'unreachable'}, {'alice'}):
+            with self.subTest(members=members):
+                org = FakeOrg(members=members, invites=set(), teams={'developers': []})
+                out, err = io.StringIO(), io.StringIO()
+
+                with redirect_stdout(out), redirect_stderr(err), \
+                        self.assertRaises(SystemExit):
+                    async_sync.run(
+                        async_sync.sync_memberships, org.session(), 4, 'test-org',
+                        {'developers': ['alice', 'unreachable']},
+                    )
+
+                self.assertIn('ADD developers: alice', out.getvalue())
+                self.assertIn('connection reset', err.getvalue())
+
+    """Test running a saved plan with the async engine."""
+
+    def test_plan_applied_without_listing(self):
+        """Test that a plan only costs its user lookups and writes."""
+        org = FakeOrg(members={'alice'}, invites=set(), teams={'developers': []})
+        session = org.session()
+        plan = {
+            'invites': ['erin'],
+            'teams': {'developers': {'add': ['alice'], 'remove': ['bob']}},
+        }
+
+        out = io.StringIO()
+        with redirect_stdout(out):
+            invited = async_sync.run(async_sync.apply_plan, session, 4, 'test-org', plan)
+
+        self.assertEqual(invited, {'erin'})
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            ['INVITED: erin', 'ADD developers: alice', 'REMOVE developers: bob'],
+        )
+        self.assertEqual(
+            [c for c in org.calls if c[0] == 'GET'],
+            [('GET', f'{async_sync.API}/users/erin')],
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
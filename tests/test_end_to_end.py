@@ -0,0 +1,227 @@
+"""End-to-end runs of the sync scripts against the local stand-in server."""
+
+import io
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import yaml
+
+# Set required environment variables before importing
+os.environ['ORG'] = 'test-org'
+os.environ['TOKEN'] = 'test-token'
+
+# Add parent directory to path to import the script
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import github_client
+import github_to_yaml
+import yaml_to_github
+from tests.fake_github import FakeGitHub
+
+
+class EndToEndTestCase(unittest.TestCase):
+
+    def start(self, **kwargs):
+        fake = FakeGitHub(
+            'test-org',
+            members=['alice', 'bob', 'carol'],
+            pending=['dave'],
+            teams={'devs': ['alice', 'bob'], 'ops': ['carol']},
+            users=['erin'],
+            **kwargs,
+        )
+        fake.__enter__()
+        self.addCleanup(fake.__exit__, None, None, None)
+        for module in (github_client, github_to_yaml, yaml_to_github):
+            patcher = patch.object(module, 'API', fake.url)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return fake
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+
+    def run_main(self, module):
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            module.main()
+        return out.getvalue()
+
+
+class TestFakeGitHubRest(EndToEndTestCase):
+    """Test the REST side of the stand-in server."""
+
+    def test_link_and_rate_limit_headers(self):
+        """Test that lists are paged with Link headers and budgets counted."""
+        fake = self.start()
+        session = github_client.create_session('test-token')
+
+        r = session.get(
+            f'{fake.url}/orgs/test-org/members', params={'per_page': 2, 'page': 1}
+        )
+
+        self.assertEqual([m['login'] for m in r.json()], ['alice', 'bob'])
+        self.assertEqual(github_client.last_page(r), 2)
+        self.assertIn('next', r.links)
+        self.assertEqual(r.headers['X-RateLimit-Remaining'], '4999')
+        self.assertEqual(fake.counts['GET /orgs/{org}/members'], 1)
+
+
+class TestEndToEnd(EndToEndTestCase):
+    """Test the scripts against the stand-in server."""
+
+    def test_export_renders_org(self):
+        """Test that the export writes the org's teams and pending invites."""
+        self.start()
+
+        self.run_main(github_to_yaml)
+
+        config = yaml.safe_load(Path('teams.yaml').read_text())
+        self.assertEqual(config['teams'], {'devs': ['alice', 'bob'], 'ops': ['carol']})
+        self.assertEqual(config['invite_sent'], ['dave'])
+
+    def test_sync_converges_org_to_teams_yaml(self):
+        """Test that adds, removes and invites reach the server."""
+        fake = self.start()
+        Path('teams.yaml').write_text(
+            'teams:\n  devs: [alice, carol, erin]\n  ops: [carol]\n'
+        )
+
+        output = self.run_main(yaml_to_github)
+
+        self.assertEqual(fake.teams['devs'], ['alice', 'carol'])
+        self.assertEqual(fake.pending, ['dave', 'erin'])
+        self.assertIn('REMOVE devs: bob', output)
+        config = yaml.safe_load(Path('teams.yaml').read_text())
+        self.assertEqual(config['invite_sent'], ['erin'])
+
+    @patch('github_client.RETRY_BACKOFF_FACTOR', 0)
+    def test_sync_survives_injected_server_errors(self):
+        """Test that retried 502s don't change the outcome of a sync."""
+        fake = self.start(failure_rate=0.3, seed=1)
+        Path('teams.yaml').write_text('teams:\n  devs: [alice, carol]\n  ops: []\n')
+
+        self.run_main(yaml_to_github)
+
+        self.assertGreater(fake.failures, 0)
+        self.assertEqual(fake.teams, {'devs': ['alice', 'carol'], 'ops': []})
+
+
+class TestSnapshotRestoredFromCache(EndToEndTestCase):
+    """Test runs that restore an org snapshot older than the last sync."""
+
+    def setUp(self):
+        super().setUp()
+        env = patch.dict(os.environ, {'ORG_SNAPSHOT_PATH': 'org-snapshot.json'})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def test_sync_does_not_trust_pre_sync_snapshot(self):
+        """Test that a restored snapshot can't make a sync repeat its invite."""
+        fake = self.start()
+        self.run_main(github_to_yaml)
+        cached = Path('org-snapshot.json').read_bytes()
+        Path('teams.yaml').write_text(
+            'teams:\n  devs: [alice, bob, erin]\n  ops: [carol]\n'
+        )
+        self.run_main(yaml_to_github)
+        self.assertFalse(Path('org-snapshot.json').exists())
+
+        Path('org-snapshot.json').write_bytes(cached)
+        self.run_main(yaml_to_github)
+
+        self.assertEqual(fake.counts['POST /orgs/{org}/invitations'], 1)
+        self.assertEqual(fake.pending, ['dave', 'erin'])
+        config = yaml.safe_load(Path('teams.yaml').read_text())
+        self.assertEqual(config['invite_sent'], ['erin'])
+
+    def test_unchanged_org_revalidates_with_not_modified(self):
+        """Test that a second export revalidates the snapshot with 304s."""
+        fake = self.start()
+        self.run_main(github_to_yaml)
+        first = Path('teams.yaml').read_text()
+
+        self.run_main(github_to_yaml)
+
+        self.assertGreater(fake.not_modified, 0)
+        self.assertEqual(Path('teams.yaml').read_text(), first)
+
+
+class TestExportFingerprint(EndToEndTestCase):
+    """Test skipping exports when neither the org nor teams.yaml changed."""
+
+    def setUp(self):
+        super().setUp()
+        env = patch.dict(os.environ, {
+            'EXPORT_FINGERPRINT_PATH': '.cache/export-fingerprint',
+            'GITHUB_OUTPUT': 'github_output',
+        })
+        env.start()
+        self.addCleanup(env.stop)
+
+    def outputs(self):
+        return Path('github_output').read_text().splitlines()
+
+    def test_unchanged_export_is_skipped(self):
+        """Test that a repeated export neither renders nor writes."""
+        self.start()
+        self.run_main(github_to_yaml)
+
+        with patch.object(github_to_yaml, 'render_yaml') as render:
+            output = self.run_main(github_to_yaml)
+
+        render.assert_not_called()
+        self.assertIn('unchanged since the last export', output)
+        self.assertEqual(
+            self.outputs(), ['teams_yaml_changed=true', 'teams_yaml_changed=false']
+        )
+
+    def test_changes_invalidate_fingerprint(self):
+        """Test that org changes and hand edits both re-run the export."""
+        fake = self.start()
+        self.run_main(github_to_yaml)
+
+        fake.teams['ops'].append('bob')
+        self.run_main(github_to_yaml)
+        config = yaml.safe_load(Path('teams.yaml').read_text())
+        self.assertEqual(config['teams']['ops'], ['bob', 'carol'])
+
+        Path('teams.yaml').write_text('teams:\n  devs: [alice]\n')
+        self.run_main(github_to_yaml)
+        config = yaml.safe_load(Path('teams.yaml').read_text())
+        self.assertEqual(config['teams']['devs'], ['alice', 'bob'])
+        self.assertEqual(self.outputs(), ['teams_yaml_changed=true'] * 3)
+
+    def test_identical_render_reports_unchanged(self):
+        """Test that an export matching teams.yaml doesn't report a change."""
+        self.start()
+        self.run_main(github_to_yaml)
+        os.remove('.cache/export-fingerprint')
+
+        output = self.run_main(github_to_yaml)
+
+        self.assertIn('No changes to teams.yaml needed.', output)
+        self.assertEqual(self.outputs()[-1], 'teams_yaml_changed=false')
+
+    def test_unchanged_team_dir_is_skipped(self):
+        """Test the fingerprint with the per-team file layout."""
+        self.start()
+        with patch.dict(os.environ, {'TEAMS_DIR': 'teams'}):
+            self.run_main(github_to_yaml)
+            output = self.run_main(github_to_yaml)
+
+        self.assertIn('unchanged since the last export', output)
+        self.assertEqual(
+            self.outputs(), ['teams_yaml_changed=true', 'teams_yaml_changed=false']
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,299 @@
+"""Tests for the shared GitHub client in github_client.py."""
+
+import json
+import tracemalloc
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+# Add parent directory to path to import the script
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import github_client
+
+
+class TestPaginate(unittest.TestCase):
+    """Test Link-header driven pagination."""
+
+    URL = 'https://api.github.com/orgs/test-org/members'
+
+    def page_response(self, page, count, last=None):
+        r = MagicMock()
+        r.json.return_value = [{'login': f'p{page}u{i}'} for i in range(count)]
+        r.links = {}
+        if last is not None:
+            r.links = {'last': {'url': f'{self.URL}?per_page=100&page={last}'}}
+        return r
+
+    def test_fetches_up_to_last_page_without_extra_request(self):
+        """Test that an exact multiple of PER_PAGE needs no trailing request."""
+        per_page = github_client.PER_PAGE
+        session = MagicMock()
+
+        def get(url, params, timeout):
+            page = params['page']
+            return self.page_response(page, per_page, last=3 if page == 1 else None)
+
+        session.get.side_effect = get
+
+        result = github_client.paginate(self.URL, session, workers=4)
+
+        self.assertEqual(len(result), 3 * per_page)
+        self.assertEqual(session.get.call_count, 3)
+        # Items keep page order even though pages 2-3 were fetched concurrently
+        self.assertEqual(result[per_page]['login'], 'p2u0')
+        self.assertEqual(result[-1]['login'], f'p3u{per_page - 1}')
+
+    def test_falls_back_to_sequential_without_link(self):
+        """Test that paging continues until the short page without a Link header."""
+        per_page = github_client.PER_PAGE
+        session = MagicMock()
+        session.get.side_effect = [
+            self.page_response(1, per_page),
+            self.page_response(2, per_page),
+            self.page_response(3, 5),
+        ]
+
+        result = github_client.paginate(self.URL, session)
+
+        self.assertEqual(len(result), 2 * per_page + 5)
+        self.assertEqual(session.get.call_count, 3)
+
+
+class FakePageResponse:
+    """Minimal response that builds fresh user objects on every json() call."""
+
+    def __init__(self, text, last):
+        self.text = text
+        self.links = {'last': {'url': f'https://x/?page={last}'}}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakePagedSession:
+    """Serve ``pages`` full pages of bulky user objects."""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def get(self, url, params, timeout):
+        page = params['page']
+        users = [
+            {
+                'login': f'user{page}-{i}',
+                'id': page * 1000 + i,
+                'avatar_url': f'https://avatars.example.com/u/{page}-{i}?v=4' * 4,
+                'html_url': f'https://github.com/user{page}-{i}',
+                'type': 'User',
+                'site_admin': False,
+            }
+            for i in range(github_client.PER_PAGE)
+        ]
+        return FakePageResponse(json.dumps(users), self.pages)
+
+
+class TestStreamingPagination(unittest.TestCase):
+    """Test that iter_paginate bounds memory to a few pages."""
+
+    PAGES = 30
+
+    def peak_memory(self, collect):
+        tracemalloc.start()
+        try:
+            logins = collect(FakePagedSession(self.PAGES))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(len(logins), self.PAGES * github_client.PER_PAGE)
+        return peak
+
+    def test_streaming_peak_memory_is_lower(self):
+        """Test peak memory of streaming vs. collecting every page first."""
+        url = 'https://api.github.com/orgs/test-org/members'
+
+        def collect_list(session):
+            members = github_client.paginate(url, session, workers=1)
+            return {m['login'] for m in members}
+
+        def collect_stream(session):
+            members = github_client.iter_paginate(url, session, workers=1)
+            return {m['login'] for m in members}
+
+        list_peak = self.peak_memory(collect_list)
+        stream_peak = self.peak_memory(collect_stream)
+
+        # Only the login set grows with the org; full objects never pile up.
+        self.assertLess(stream_peak * 2, list_peak)
+
+    def test_streaming_with_lookahead_keeps_order(self):
+        """Test that concurrent look-ahead still yields items in page order."""
+        url = 'https://api.github.com/orgs/test-org/members'
+        logins = [
+            m['login']
+            for m in github_client.iter_paginate(url, FakePagedSession(5), workers=3)
+        ]
+        expected = [
+            f'user{page}-{i}'
+            for page in range(1, 6)
+            for i in range(github_client.PER_PAGE)
+        ]
+        self.assertEqual(logins, expected)
+
+
+class FakeClock:
+    """Deterministic clock whose sleep() just advances time."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def rate_limited_response(status_code, remaining, reset, text=''):
+    r = MagicMock()
+    r.status_code = status_code
+    r.url = 'https://api.github.com/users/alice'
+    r.text = text
+    r.headers = {
+        'X-RateLimit-Remaining': str(remaining),
+        'X-RateLimit-Reset': str(reset),
+        'X-RateLimit-Resource': 'core',
+    }
+    return r
+
+
+class TestRateLimitScheduler(unittest.TestCase):
+    """Test budget tracking and pacing in RateLimitScheduler."""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = github_client.RateLimitScheduler(
+            clock=self.clock, sleep=self.clock.sleep
+        )
+
+    def request(self, method='GET', url='https://api.github.com/users/alice'):
+        self.scheduler.acquire(method, url)
+        self.scheduler.release()
+
+    def test_sleeps_until_reset_when_budget_is_spent(self):
+        """Test that the last request of a window waits for the reset."""
+        reset = int(self.clock.now) + 30
+        self.scheduler.update(rate_limited_response(200, 2, reset))
+
+        self.request()
+        self.request()
+        self.assertEqual(self.clock.sleeps, [])
+
+        self.request()
+        self.assertEqual(len(self.clock.sleeps), 1)
+        self.assertGreaterEqual(self.clock.now, reset)
+
+    def test_out_of_order_responses_keep_lowest_remaining(self):
+        """Test that a stale response can't raise the live budget."""
+        reset = int(self.clock.now) + 30
+        self.scheduler.update(rate_limited_response(200, 10, reset))
+        self.scheduler.update(rate_limited_response(200, 50, reset))
+        self.assertEqual(self.scheduler.budgets['core'][0], 10)
+
+        self.scheduler.update(rate_limited_response(200, 5000, reset + 3600))
+        self.assertEqual(self.scheduler.budgets['core'][0], 5000)
+
+    def test_budgets_are_per_resource(self):
+        """Test that an exhausted core budget doesn't block GraphQL."""
+        reset = int(self.clock.now) + 30
+        self.scheduler.update(rate_limited_response(200, 0, reset))
+
+        self.request('POST', 'https://api.github.com/graphql')
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_write_points_are_paced(self):
+        """Test that writes beyond the per-minute points budget are delayed."""
+        scheduler = github_client.RateLimitScheduler(
+            points_per_minute=10, clock=self.clock, sleep=self.clock.sleep
+        )
+        for _ in range(2):
+            scheduler.acquire('PUT', 'https://api.github.com/orgs/o/teams/t/memberships/a')
+            scheduler.release()
+        self.assertEqual(self.clock.sleeps, [])
+
+        scheduler.acquire('PUT', 'https://api.github.com/orgs/o/teams/t/memberships/b')
+        scheduler.release()
+        self.assertAlmostEqual(sum(self.clock.sleeps), 30, places=3)
+
+    def test_graphql_queries_cost_read_points(self):
+        """Test that GraphQL queries are paced as reads, mutations as writes."""
+        scheduler = github_client.RateLimitScheduler(
+            points_per_minute=10, clock=self.clock, sleep=self.clock.sleep
+        )
+        url = 'https://ghe.example.com/api/graphql'
+        for _ in range(10):
+            scheduler.acquire('POST', url, {'query': '\nquery Org { viewer { login } }'})
+            scheduler.release()
+        self.assertEqual(self.clock.sleeps, [])
+
+        scheduler.acquire('POST', url, {'query': 'mutation { addStar }'})
+        scheduler.release()
+        self.assertAlmostEqual(sum(self.clock.sleeps), 30, places=3)
+
+    def test_retry_delay(self):
+        """Test which responses are retried, and after how long."""
+        reset = int(self.clock.now) + 120
+        self.assertIsNone(
+            self.scheduler.retry_delay(rate_limited_response(200, 10, reset))
+        )
+        self.assertIsNone(
+            self.scheduler.retry_delay(rate_limited_response(403, 10, reset))
+        )
+        self.assertEqual(
+            self.scheduler.retry_delay(rate_limited_response(403, 0, reset)), 121
+        )
+        secondary = rate_limited_response(
+            403, 10, reset, text='You have exceeded a secondary rate limit.'
+        )
+        self.assertEqual(
+            self.scheduler.retry_delay(secondary), github_client.SECONDARY_LIMIT_WAIT
+        )
+
+
+class TestGitHubSession(unittest.TestCase):
+    """Test that GitHubSession waits out rate limits instead of failing."""
+
+    @patch('requests.Session.request')
+    def test_retries_after_primary_limit(self, mock_request):
+        """Test that a 403 with an empty budget is retried after the reset."""
+        clock = FakeClock()
+        scheduler = github_client.RateLimitScheduler(clock=clock, sleep=clock.sleep)
+        reset = int(clock.now) + 60
+        mock_request.side_effect = [
+            rate_limited_response(403, 0, reset),
+            rate_limited_response(200, 4999, reset + 3600),
+        ]
+        session = github_client.GitHubSession(scheduler)
+
+        with patch('builtins.print'):
+            r = session.request('GET', 'https://api.github.com/users/alice')
+
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(mock_request.call_count, 2)
+        self.assertGreaterEqual(clock.now, reset)
+
+    def test_create_session_installs_scheduler(self):
+        """Test that sessions from create_session are rate-limit aware."""
+        session = github_client.create_session('test-token')
+        self.assertIsInstance(session, github_client.GitHubSession)
+        self.assertIsInstance(session.scheduler, github_client.RateLimitScheduler)
+
+
+if __name__ == '__main__':
+    unittest.main()
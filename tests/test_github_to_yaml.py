@@ -12,6 +12,7 @@ os.environ['TOKEN'] = 'test-token'
 # Add parent directory to path to import the script
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
 
+import github_client
 import github_to_yaml
 
 
@@ -23,7 +24,16 @@ class TestGithubToYamlFunctionality(unittest.TestCase):
         self.mock_session = MagicMock()
         self.org = 'test-org'
 
-    @patch('github_to_yaml.paginate')
+    def export(self, old_desired, org_members, pending_invites, workers=1):
+        # The REST path of main(): list the teams, then build the map.
+        team_members, _ = github_client.fetch_org_teams(
+            self.org, self.mock_session, workers
+        )
+        return github_to_yaml.export_teams(
+            team_members, old_desired, org_members, pending_invites
+        )
+
+    @patch('github_client.iter_paginate')
     def test_adding_org_member_to_team_export(self, mock_paginate):
         """Test that when an org member is added to a team in GitHub, it's exported to YAML."""
         # Setup: alice is in org and now in the developers team
@@ -32,7 +42,7 @@ class TestGithubToYamlFunctionality(unittest.TestCase):
         old_desired = {'developers': []}  # Previously empty team
         
         # Mock paginate to return teams and team members
-        def paginate_side_effect(url, session):
+        def paginate_side_effect(url, session, workers=1):
             if 'teams' in url and 'members' not in url:
                 # Return list of teams
                 return [{'slug': 'developers'}]
@@ -44,19 +54,13 @@ class TestGithubToYamlFunctionality(unittest.TestCase):
         mock_paginate.side_effect = paginate_side_effect
         
         # Call export_teams
-        teams_map = github_to_yaml.export_teams(
-            self.org,
-            self.mock_session,
-            old_desired,
-            org_members,
-            pending_invites
-        )
+        teams_map = self.export(old_desired, org_members, pending_invites)
         
         # Verify alice is in the exported team
         self.assertIn('developers', teams_map)
         self.assertIn('alice', teams_map['developers'])
 
-    @patch('github_to_yaml.paginate')
+    @patch('github_client.iter_paginate')
     def test_removing_member_from_team_export(self, mock_paginate):
         """Test that when a member is removed from a team in GitHub, it's removed from YAML."""
         # Setup: bob was in team but is now removed
@@ -65,7 +69,7 @@ class TestGithubToYamlFunctionality(unittest.TestCase):
         old_desired = {'developers': ['alice', 'bob']}  # Bob was previously in team
         
         # Mock paginate to return teams and team members
-        def paginate_side_effect(url, session):
+        def paginate_side_effect(url, session, workers=1):
             if 'teams' in url and 'members' not in url:
                 # Return list of teams
                 return [{'slug': 'developers'}]
@@ -77,20 +81,14 @@ class TestGithubToYamlFunctionality(unittest.TestCase):
         mock_paginate.side_effect = paginate_side_effect
         
         # Call export_teams
-        teams_map = github_to_yaml.export_teams(
-            self.org,
-            self.mock_session,
-            old_desired,
-            org_members,
-            pending_invites
-        )
+        teams_map = self.export(old_desired, org_members, pending_invites)
         
         # Verify bob is NOT in the exported team
         self.assertIn('developers', teams_map)
         self.assertIn('alice', teams_map['developers'])
         self.assertNotIn('bob', teams_map['developers'])
 
-    @patch('github_to_yaml.paginate')
+    @patch('github_client.iter_paginate')
     def test_removing_member_from_org_export(self, mock_paginate):
         """Test that when a member is removed from the org, they're removed from all teams in YAML."""
         # Setup: charlie was in org and team, but is now removed from org
@@ -99,7 +97,7 @@ class TestGithubToYamlFunctionality(unittest.TestCase):
         old_desired = {'developers': ['alice', 'bob', 'charlie']}
         
         # Mock paginate to return teams and team members
-        def paginate_side_effect(url, session):
+        def paginate_side_effect(url, session, workers=1):
             if 'teams' in url and 'members' not in url:
                 # Return list of teams
                 return [{'slug': 'developers'}]
@@ -111,13 +109,7 @@ class TestGithubToYamlFunctionality(unittest.TestCase):
         mock_paginate.side_effect = paginate_side_effect
         
         # Call export_teams
-        teams_map = github_to_yaml.export_teams(
-            self.org,
-            self.mock_session,
-            old_desired,
-            org_members,
-            pending_invites
-        )
+        teams_map = self.export(old_desired, org_members, pending_invites)
         
         # Verify charlie is NOT in the exported team
         self.assertIn('developers', teams_map)
@@ -125,7 +117,7 @@ class TestGithubToYamlFunctionality(unittest.TestCase):
         self.assertIn('bob', teams_map['developers'])
         self.assertNotIn('charlie', teams_map['developers'])
 
-    @patch('github_to_yaml.paginate')
+    @patch('github_client.iter_paginate')
     def test_preserve_pending_invites_in_export(self, mock_paginate):
         """Test that users with pending invites are preserved in YAML export."""
         # Setup: dave has a pending invite and is in old desired state
@@ -134,7 +126,7 @@ class TestGithubToYamlFunctionality(unittest.TestCase):
         old_desired = {'developers': ['alice', 'bob', 'dave']}
         
         # Mock paginate to return teams and team members
-        def paginate_side_effect(url, session):
+        def paginate_side_effect(url, session, workers=1):
             if 'teams' in url and 'members' not in url:
                 # Return list of teams
                 return [{'slug': 'developers'}]
@@ -146,13 +138,7 @@ class TestGithubToYamlFunctionality(unittest.TestCase):
         mock_paginate.side_effect = paginate_side_effect
         
         # Call export_teams
-        teams_map = github_to_yaml.export_teams(
-            self.org,
-            self.mock_session,
-            old_desired,
-            org_members,
-            pending_invites
-        )
+        teams_map = self.export(old_desired, org_members, pending_invites)
         
         # Verify dave is preserved in the export (because of pending invite)
         self.assertIn('developers', teams_map)
@@ -160,7 +146,7 @@ class TestGithubToYamlFunctionality(unittest.TestCase):
         self.assertIn('bob', teams_map['developers'])
         self.assertIn('dave', teams_map['developers'])
 
-    @patch('github_to_yaml.paginate')
+    @patch('github_client.iter_paginate')
     def test_export_multiple_teams(self, mock_paginate):
         """Test exporting multiple teams with different members."""
         org_members = {'alice', 'bob', 'charlie'}
@@ -168,7 +154,7 @@ class TestGithubToYamlFunctionality(unittest.TestCase):
         old_desired = {}
         
         # Mock paginate to return multiple teams
-        def paginate_side_effect(url, session):
+        def paginate_side_effect(url, session, workers=1):
             if 'teams' in url and 'members' not in url:
                 # Return list of teams
                 return [
@@ -184,13 +170,7 @@ class TestGithubToYamlFunctionality(unittest.TestCase):
         mock_paginate.side_effect = paginate_side_effect
         
         # Call export_teams
-        teams_map = github_to_yaml.export_teams(
-            self.org,
-            self.mock_session,
-            old_desired,
-            org_members,
-            pending_invites
-        )
+        teams_map = self.export(old_desired, org_members, pending_invites)
         
         # Verify both teams are exported correctly
         self.assertIn('developers', teams_map)
@@ -198,18 +178,46 @@ class TestGithubToYamlFunctionality(unittest.TestCase):
         self.assertEqual(set(teams_map['developers']), {'alice', 'bob'})
         self.assertEqual(set(teams_map['admins']), {'charlie'})
 
+    @patch('github_client.iter_paginate')
+    def test_parallel_export_matches_sequential(self, mock_paginate):
+        """Test that the worker-pool export renders byte-identical YAML."""
+        slugs = [f'team-{i:02d}' for i in range(20)]
+        org_members = {f'user{i}' for i in range(40)}
+        pending_invites = {'zed'}
+        old_desired = {'team-03': ['zed']}
+
+        def paginate_side_effect(url, session, workers=1):
+            if url.endswith('/teams'):
+                # Deliberately unsorted to exercise deterministic ordering
+                return [{'slug': s} for s in reversed(slugs)]
+            slug = url.split('/teams/')[1].split('/')[0]
+            n = int(slug.split('-')[1])
+            return [{'login': f'user{(n + k) % 40}'} for k in range(5)]
+
+        mock_paginate.side_effect = paginate_side_effect
+
+        sequential = self.export(old_desired, org_members, pending_invites)
+        parallel = self.export(old_desired, org_members, pending_invites, workers=8)
+
+        self.assertEqual(list(sequential), list(parallel))
+        self.assertEqual(
+            github_to_yaml.render_yaml(sequential, pending_invites),
+            github_to_yaml.render_yaml(parallel, pending_invites),
+        )
+        self.assertIn('zed', parallel['team-03'])
+
 
 class TestFetchOrgMembership(unittest.TestCase):
     """Test the fetch_org_membership function."""
 
-    @patch('github_to_yaml.paginate')
+    @patch('github_to_yaml.iter_paginate')
     def test_fetch_org_members_and_invites(self, mock_paginate):
         """Test fetching org members and pending invites."""
         org = 'test-org'
         session = MagicMock()
         
         # Mock paginate to return different data based on URL
-        def paginate_side_effect(url, session):
+        def paginate_side_effect(url, session, workers=1):
             if '/members' in url:
                 return [
                     {'login': 'alice'},
@@ -230,13 +238,13 @@ class TestFetchOrgMembership(unittest.TestCase):
         self.assertEqual(org_members, {'alice', 'bob'})
         self.assertEqual(pending_invites, {'charlie', 'dave'})
 
-    @patch('github_to_yaml.paginate')
+    @patch('github_to_yaml.iter_paginate')
     def test_fetch_with_no_pending_invites(self, mock_paginate):
         """Test fetching when there are no pending invites."""
         org = 'test-org'
         session = MagicMock()
         
-        def paginate_side_effect(url, session):
+        def paginate_side_effect(url, session, workers=1):
             if '/members' in url:
                 return [{'login': 'alice'}, {'login': 'bob'}]
             elif '/invitations' in url:
@@ -250,6 +258,18 @@ class TestFetchOrgMembership(unittest.TestCase):
         self.assertEqual(org_members, {'alice', 'bob'})
         self.assertEqual(pending_invites, set())
 
+    @patch('github_client.iter_paginate', return_value=[])
+    @patch('github_to_yaml.iter_paginate', return_value=[])
+    def test_workers_bound_page_fetches(self, mock_paginate, mock_client_paginate):
+        """Test that SYNC_WORKERS reaches the paged list fetches."""
+        session = MagicMock()
+
+        github_to_yaml.fetch_org_membership('test-org', session, 3)
+        github_to_yaml.fetch_org_teams('test-org', session, 3)
+
+        calls = mock_paginate.call_args_list + mock_client_paginate.call_args_list
+        self.assertEqual([c.args[2] for c in calls], [3, 3, 3])
+
 
 class TestRenderYaml(unittest.TestCase):
     """Test the render_yaml function."""
@@ -0,0 +1,137 @@
+"""Tests for the GraphQL fetch backend against a local stand-in server."""
+
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+import requests
+
+# Set required environment variables before importing
+os.environ['ORG'] = 'test-org'
+os.environ['TOKEN'] = 'test-token'
+
+# Add parent directory to path to import the script
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import github_client
+import github_to_yaml
+import graphql_backend
+import yaml_to_github
+from tests.fake_github import FakeGitHub
+
+
+class TestGraphqlUrl(unittest.TestCase):
+    """Test deriving the GraphQL endpoint from GITHUB_API_URL."""
+
+    def test_graphql_url(self):
+        self.assertEqual(
+            graphql_backend.graphql_url('https://api.github.com'),
+            'https://api.github.com/graphql',
+        )
+        self.assertEqual(
+            graphql_backend.graphql_url('https://ghe.example.com/api/v3'),
+            'https://ghe.example.com/api/graphql',
+        )
+
+
+class TestFetchOrgSnapshot(unittest.TestCase):
+    """Test fetch_org_snapshot against the stand-in server."""
+
+    def setUp(self):
+        self.session = requests.Session()
+        self.fake = FakeGitHub(
+            'test-org',
+            members=['alice', 'bob', 'charlie', 'dave', 'erin'],
+            pending=['frank'],
+            teams={
+                'admins': ['alice'],
+                'developers': ['alice', 'bob', 'charlie', 'dave', 'erin'],
+                'docs': [],
+            },
+        )
+        self.fake.__enter__()
+        self.addCleanup(self.fake.__exit__, None, None, None)
+
+    @patch('graphql_backend.PAGE_SIZE', 2)
+    def test_snapshot_follows_nested_cursors(self):
+        """Test that org, team and nested member pages are all collected."""
+        org_members, pending, team_members = graphql_backend.fetch_org_snapshot(
+            'test-org', self.session, url=self.fake.graphql_url
+        )
+
+        self.assertEqual(org_members, {'alice', 'bob', 'charlie', 'dave', 'erin'})
+        self.assertEqual(pending, {'frank'})
+        self.assertEqual(
+            team_members,
+            {
+                'admins': {'alice'},
+                'developers': {'alice', 'bob', 'charlie', 'dave', 'erin'},
+                'docs': set(),
+            },
+        )
+
+    def test_snapshot_uses_a_handful_of_queries(self):
+        """Test that small orgs need one query per top-level connection."""
+        graphql_backend.fetch_org_snapshot(
+            'test-org', self.session, url=self.fake.graphql_url
+        )
+        # members, pending members and teams (with their members inline)
+        self.assertEqual(len(self.fake.requests), 3)
+
+    def test_snapshot_matches_rest_export(self):
+        """Test that the snapshot renders the same YAML as the REST export."""
+        org_members, pending, team_members = graphql_backend.fetch_org_snapshot(
+            'test-org', self.session, url=self.fake.graphql_url
+        )
+        teams_map = github_to_yaml.export_teams(team_members, {}, org_members, pending)
+
+        def paginate_side_effect(url, session, workers=1):
+            if url.endswith('/members') and '/teams/' in url:
+                slug = url.split('/teams/')[1].split('/')[0]
+                return [{'login': u} for u in self.fake.teams[slug]]
+            return [{'slug': s} for s in self.fake.teams]
+
+        with patch('github_client.iter_paginate', side_effect=paginate_side_effect):
+            rest_members, _ = github_client.fetch_org_teams('test-org', MagicMock())
+        rest_map = github_to_yaml.export_teams(rest_members, {}, org_members, pending)
+
+        self.assertEqual(
+            github_to_yaml.render_yaml(teams_map, pending),
+            github_to_yaml.render_yaml(rest_map, pending),
+        )
+
+    def test_unknown_org_raises(self):
+        """Test that GraphQL errors surface as GraphQLError."""
+        with self.assertRaises(graphql_backend.GraphQLError):
+            graphql_backend.fetch_org_snapshot(
+                'other-org', self.session, url=self.fake.graphql_url
+            )
+
+
+class TestApplyWithSnapshot(unittest.TestCase):
+    """Test that apply_memberships reuses snapshot team memberships."""
+
+    @patch('github_client.iter_paginate')
+    def test_known_team_members_skip_listing(self, mock_paginate):
+        """Test that no team list call is made when memberships are known."""
+        session = MagicMock()
+        session.put.return_value.status_code = 200
+
+        yaml_to_github.apply_memberships(
+            'test-org',
+            session,
+            {'developers': ['alice', 'bob']},
+            {'alice', 'bob'},
+            set(),
+            {'developers'},
+            team_members={'developers': {'alice'}},
+        )
+
+        mock_paginate.assert_not_called()
+        session.put.assert_called_once()
+        self.assertIn('/memberships/bob', session.put.call_args[0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+"""Tests for the on-disk ETag cache in http_cache.py."""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+# Add parent directory to path to import the script
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import github_client
+from http_cache import CachingAdapter, ETagCache
+
+
+class ETagServer:
+    """Serve two pages of members with ETags, answering 304 when unchanged."""
+
+    def __init__(self):
+        self.pages = {
+            '1': [{'login': f'user{i}'} for i in range(github_client.PER_PAGE)],
+            '2': [{'login': 'last'}],
+        }
+        self.statuses = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                page = parse_qs(urlparse(self.path).query)['page'][0]
+                body = json.dumps(server.pages[page]).encode()
+                etag = f'"{page}-{hash(body)}"'
+                if self.headers.get('If-None-Match') == etag:
+                    server.statuses.append(304)
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                server.statuses.append(200)
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(
+            target=self.httpd.serve_forever, args=(0.05,), daemon=True
+        ).start()
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f'http://{host}:{port}/orgs/test-org/members'
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class TestCachingAdapter(unittest.TestCase):
+    """Test conditional requests made through paginate()."""
+
+    def setUp(self):
+        self.server = ETagServer()
+        self.addCleanup(self.server.close)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def session(self):
+        session = requests.Session()
+        session.mount('http://', CachingAdapter(ETagCache(self.tmp.name)))
+        return session
+
+    def test_unchanged_pages_are_revalidated(self):
+        """Test that a second run gets 304s and the same items."""
+        first = github_client.paginate(self.server.url, self.session())
+        second = github_client.paginate(self.server.url, self.session())
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(second), github_client.PER_PAGE + 1)
+        self.assertEqual(self.server.statuses, [200, 200, 304, 304])
+
+    def test_changed_page_is_refetched(self):
+        """Test that a changed page returns fresh data."""
+        github_client.paginate(self.server.url, self.session())
+        self.server.pages['2'] = [{'login': 'newcomer'}]
+
+        result = github_client.paginate(self.server.url, self.session())
+
+        self.assertEqual(result[-1], {'login': 'newcomer'})
+        self.assertEqual(self.server.statuses[2:], [304, 200])
+
+
+class TestETagCacheEviction(unittest.TestCase):
+    """Test size and age eviction."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_evicts_old_entries(self):
+        """Test that entries older than max_age are removed."""
+        cache = ETagCache(self.tmp.name)
+        cache.put('https://x/a', '"a"', b'[]', {})
+        old = time.time() - 3600
+        os.utime(cache.path('https://x/a'), (old, old))
+
+        cache = ETagCache(self.tmp.name, max_age=60)
+
+        self.assertIsNone(cache.get('https://x/a'))
+
+    def test_evicts_least_recently_used_over_size(self):
+        """Test that the coldest entries go first when over max_bytes."""
+        cache = ETagCache(self.tmp.name)
+        for i, name in enumerate(['cold', 'warm', 'hot']):
+            cache.put(f'https://x/{name}', f'"{name}"', b'[' + b'1,' * 500 + b'1]', {})
+            t = time.time() - 100 + i
+            os.utime(cache.path(f'https://x/{name}'), (t, t))
+        size = max(
+            os.path.getsize(cache.path(f'https://x/{name}'))
+            for name in ['cold', 'warm', 'hot']
+        )
+
+        cache = ETagCache(self.tmp.name, max_bytes=2 * size)
+
+        self.assertIsNone(cache.get('https://x/cold'))
+        self.assertIsNotNone(cache.get('https://x/warm'))
+        self.assertIsNotNone(cache.get('https://x/hot'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,254 @@
+"""Tests for the shared org snapshot in org_snapshot.py."""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+# Set required environment variables before importing
+os.environ['ORG'] = 'test-org'
+os.environ['TOKEN'] = 'test-token'
+
+# Add parent directory to path to import the script
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import github_client
+import github_to_yaml
+import validate_pr
+import yaml_to_github
+from org_snapshot import OrgSnapshot
+
+
+class MembersServer:
+    """Serve paged org members with ETags and Link headers."""
+
+    def __init__(self, count):
+        self.members = [{'login': f'user{i:03d}'} for i in range(count)]
+        self.statuses = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                page = int(parse_qs(urlparse(self.path).query)['page'][0])
+                per_page = github_client.PER_PAGE
+                items = server.members[(page - 1) * per_page : page * per_page]
+                body = json.dumps(items).encode()
+                etag = f'"{page}-{hash(body)}"'
+                last = max(1, -(-len(server.members) // per_page))
+                links = [f'<{server.url}?per_page={per_page}&page={last}>; rel="last"']
+                if page < last:
+                    links.append(
+                        f'<{server.url}?per_page={per_page}&page={page + 1}>; rel="next"'
+                    )
+                if self.headers.get('If-None-Match') == etag:
+                    server.statuses.append(304)
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                server.statuses.append(200)
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Link', ', '.join(links))
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(
+            target=self.httpd.serve_forever, args=(0.05,), daemon=True
+        ).start()
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f'http://{host}:{port}/orgs/test-org/members'
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class SnapshotTestCase(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.path = self.dir / 'org-snapshot.json'
+        self.now = [1000.0]
+
+    def open_snapshot(self):
+        return OrgSnapshot(self.path, max_age=600, clock=lambda: self.now[0])
+
+
+class TestOrgSnapshot(SnapshotTestCase):
+    """Test saving, loading and aging snapshots."""
+
+    def test_round_trip(self):
+        """Test that a saved snapshot loads back as sync state."""
+        self.open_snapshot().save(
+            'test-org', {'alice', 'bob'}, {'carol'}, {'devs': {'alice'}, 'ops': set()}
+        )
+
+        state = self.open_snapshot().load('test-org')
+
+        members, pending, slugs, team_members = state
+        self.assertEqual(members, {'alice', 'bob'})
+        self.assertEqual(pending, {'carol'})
+        self.assertEqual(slugs, {'devs', 'ops'})
+        self.assertEqual(team_members, {'devs': {'alice'}, 'ops': set()})
+
+    def test_other_org_or_stale_snapshot_is_ignored(self):
+        """Test that snapshots of other orgs, or too old, aren't used."""
+        self.open_snapshot().save('test-org', {'alice'}, set(), {})
+
+        self.assertIsNone(self.open_snapshot().load('other-org'))
+        self.now[0] += 601
+        self.assertIsNone(self.open_snapshot().load('test-org'))
+
+
+class TestSnapshotRevalidation(SnapshotTestCase):
+    """Test revalidating a stale snapshot with the recorded ETags."""
+
+    def fetch_and_save(self, server):
+        snapshot = self.open_snapshot()
+        session = requests.Session()
+        session.hooks['response'].append(snapshot.recorder)
+        members = {m['login'] for m in github_client.paginate(server.url, session)}
+        snapshot.save('test-org', members, set(), {})
+        self.now[0] += 601
+        return session
+
+    def test_unchanged_pages_extend_the_snapshot(self):
+        """Test that 304s for every page make a stale snapshot usable again."""
+        server = MembersServer(150)
+        self.addCleanup(server.close)
+        session = self.fetch_and_save(server)
+
+        state = self.open_snapshot().load('test-org', session)
+
+        self.assertEqual(len(state[0]), 150)
+        self.assertEqual(server.statuses, [200, 200, 304, 304])
+        self.assertEqual(json.loads(self.path.read_text())['fetched_at'], self.now[0])
+
+    def test_changed_page_discards_the_snapshot(self):
+        """Test that one changed page makes the snapshot unusable."""
+        server = MembersServer(150)
+        self.addCleanup(server.close)
+        session = self.fetch_and_save(server)
+        server.members[120] = {'login': 'newcomer'}
+
+        self.assertIsNone(self.open_snapshot().load('test-org', session))
+
+    def test_verify_revalidates_a_fresh_snapshot(self):
+        """Test that verify=True checks the pages even within the max age."""
+        server = MembersServer(150)
+        self.addCleanup(server.close)
+        self.fetch_and_save(server)
+        self.now[0] -= 601
+        server.members[0] = {'login': 'newcomer'}
+        session = requests.Session()
+
+        self.assertIsNotNone(self.open_snapshot().load('test-org', session))
+        self.assertIsNone(self.open_snapshot().load('test-org', session, verify=True))
+
+    def test_page_added_after_full_last_page_discards_the_snapshot(self):
+        """Test that a list growing past a full last page is noticed."""
+        server = MembersServer(github_client.PER_PAGE)
+        self.addCleanup(server.close)
+        session = self.fetch_and_save(server)
+        server.members.append({'login': 'zz-newcomer'})
+
+        self.assertIsNone(self.open_snapshot().load('test-org', session))
+
+
+class TestSnapshotSharing(SnapshotTestCase):
+    """Test that the scripts write and reuse the snapshot."""
+
+    def setUp(self):
+        super().setUp()
+        cwd = os.getcwd()
+        os.chdir(self.dir)
+        self.addCleanup(os.chdir, cwd)
+        env = patch.dict(os.environ, {'ORG_SNAPSHOT_PATH': str(self.path)})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def org_lists(self, url, session, workers=None):
+        return {
+            '/orgs/test-org/members': [{'login': 'alice'}, {'login': 'bob'}],
+            '/orgs/test-org/invitations': [{'login': 'carol'}],
+            '/orgs/test-org/teams': [{'slug': 'devs'}],
+            '/orgs/test-org/teams/devs/members': [{'login': 'alice'}],
+        }[url.replace(github_client.API, '')]
+
+    @patch('github_client.iter_paginate')
+    @patch('github_to_yaml.iter_paginate')
+    def test_export_writes_snapshot_but_revalidates_it(self, mock_paginate, mock_teams):
+        """Test that an export saves the org but refetches what it can't revalidate."""
+        mock_paginate.side_effect = mock_teams.side_effect = self.org_lists
+        with patch('sys.stdout', new_callable=io.StringIO):
+            github_to_yaml.main()
+        saved = json.loads(self.path.read_text())
+        mock_paginate.reset_mock()
+        mock_teams.reset_mock()
+
+        with patch('sys.stdout', new_callable=io.StringIO):
+            github_to_yaml.main()
+
+        self.assertEqual(saved['teams'], {'devs': ['alice']})
+        mock_paginate.assert_called()
+        mock_teams.assert_called()
+
+    @patch('github_client.iter_paginate')
+    @patch('yaml_to_github.iter_paginate')
+    def test_sync_refetches_then_discards_snapshot(self, mock_paginate, mock_teams):
+        """Test that the YAML sync doesn't write from an unrevalidated snapshot."""
+        mock_paginate.side_effect = mock_teams.side_effect = self.org_lists
+        OrgSnapshot(self.path, max_age=600).save(
+            'test-org', {'alice', 'bob'}, set(), {'devs': set()}
+        )
+        Path('teams.yaml').write_text('teams:\n  devs:\n  - alice\n  - bob\n')
+        session = MagicMock()
+        session.put.return_value.status_code = 200
+
+        with patch('yaml_to_github.create_session', return_value=session), \
+                patch('yaml_to_github.USER_CACHE', None), \
+                patch('sys.stdout', new_callable=io.StringIO) as out:
+            yaml_to_github.main()
+
+        mock_teams.assert_called()
+        self.assertEqual(out.getvalue().count('ADD devs:'), 1)
+        self.assertIn('ADD devs: bob', out.getvalue())
+        self.assertFalse(self.path.exists())
+
+    @patch('validate_pr.users_exist', return_value={'alice': True, 'dave': True})
+    @patch('validate_pr.iter_paginate')
+    def test_validation_reads_members_from_snapshot(self, mock_paginate, mock_exist):
+        """Test that PR validation takes org members from the snapshot."""
+        OrgSnapshot(self.path, max_age=600).save('test-org', {'alice'}, set(), {})
+        Path('teams.yaml').write_text('teams:\n  devs:\n  - alice\n  - dave\n')
+
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            validate_pr.main()
+
+        mock_paginate.assert_not_called()
+        self.assertIn("User 'dave' exists but is not a member", out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""Tests for the PROFILE_PATH switch in profiling.py."""
+
+import io
+import os
+import pstats
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import yaml
+
+# Set required environment variables before importing
+os.environ['ORG'] = 'test-org'
+os.environ['TOKEN'] = 'test-token'
+
+# Add parent directory to path to import the script
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import profiling
+import yaml_to_github
+from profiling import profiled
+
+
+def render_big_yaml():
+    doc = {'teams': {f'team{i}': [f'user{j}' for j in range(20)] for i in range(100)}}
+    return yaml.safe_dump(doc)
+
+
+class TestProfiled(unittest.TestCase):
+    """Test profiling decorated entry points."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name, 'run.pstats')
+
+    def run_profiled(self, fn):
+        with patch.dict(os.environ, {'PROFILE_PATH': str(self.path)}), \
+                patch('sys.stdout', new_callable=io.StringIO):
+            return profiled(fn)()
+
+    def test_unset_runs_without_profiling(self):
+        """Test that nothing is written without PROFILE_PATH."""
+        with patch.dict(os.environ, {'PROFILE_PATH': ''}):
+            self.assertIn('teams:', profiled(render_big_yaml)())
+        self.assertFalse(self.path.exists())
+
+    def test_writes_pstats_and_report(self):
+        """Test the .pstats file and the report's category breakdown."""
+        result = self.run_profiled(render_big_yaml)
+
+        self.assertIn('teams:', result)
+        stats = pstats.Stats(str(self.path))
+        totals = profiling.categorize(stats)
+        self.assertGreater(
+            totals['YAML parsing and rendering'], totals['network wait']
+        )
+        report = self.path.with_suffix('.txt').read_text()
+        self.assertIn('render_big_yaml: ', report.splitlines()[0])
+        self.assertIn('YAML parsing and rendering', report)
+        self.assertIn('Ordered by: cumulative time', report)
+
+    def test_failed_runs_are_profiled(self):
+        """Test that a run ending in SystemExit still writes its profile."""
+
+        def failing():
+            yaml_to_github.fail('boom')
+
+        with patch('sys.stderr', new_callable=io.StringIO), \
+                self.assertRaises(SystemExit):
+            self.run_profiled(failing)
+
+        self.assertTrue(self.path.exists())
+        self.assertTrue(self.path.with_suffix('.txt').exists())
+
+    def test_entry_points_are_profiled(self):
+        """Test that the scripts' main() functions carry the switch."""
+        import github_to_yaml
+        import validate_pr
+
+        for module in (yaml_to_github, github_to_yaml, validate_pr):
+            with self.subTest(module=module.__name__):
+                self.assertEqual(module.main.__module__, module.__name__)
+                self.assertTrue(hasattr(module.main, '__wrapped__'))
+
+
+if __name__ == '__main__':
+    unittest.main()
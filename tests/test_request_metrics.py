@@ -0,0 +1,187 @@
+"""Tests for the per-endpoint request metrics in request_metrics.py."""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+# Set required environment variables before importing
+os.environ['ORG'] = 'test-org'
+os.environ['TOKEN'] = 'test-token'
+
+# Add parent directory to path to import the script
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import github_client
+from request_metrics import (
+    RequestMetrics,
+    endpoint_template,
+    open_request_metrics,
+    reported,
+    write_metrics,
+)
+from tests.fake_github import FakeGitHub
+
+
+class TestEndpointTemplate(unittest.TestCase):
+    """Test collapsing request URLs to endpoint templates."""
+
+    def test_templates(self):
+        """Test that names and ids are replaced by placeholders."""
+        cases = {
+            'https://api.github.com/orgs/acme/members?page=2':
+                '/orgs/{org}/members',
+            'https://api.github.com/orgs/acme/teams/devs/members':
+                '/orgs/{org}/teams/{slug}/members',
+            'https://api.github.com/orgs/acme/teams/devs/memberships/alice':
+                '/orgs/{org}/teams/{slug}/memberships/{username}',
+            'https://api.github.com/users/alice': '/users/{username}',
+            'https://api.github.com/graphql': '/graphql',
+            'https://ghe.example.com/api/v3/orgs/acme/invitations':
+                '/orgs/{org}/invitations',
+        }
+        for url, template in cases.items():
+            with self.subTest(url=url):
+                self.assertEqual(endpoint_template(url), template)
+
+
+class TestRequestMetrics(unittest.TestCase):
+    """Test the response hook against the local stand-in server."""
+
+    def setUp(self):
+        self.fake = FakeGitHub(
+            'test-org',
+            members=[f'user{i:03d}' for i in range(150)],
+            teams={'devs': ['user001'], 'ops': []},
+        )
+        self.fake.__enter__()
+        self.addCleanup(self.fake.__exit__, None, None, None)
+        self.metrics = RequestMetrics('test')
+        self.session = github_client.create_session(
+            'test-token', response_hooks=(self.metrics,)
+        )
+
+    def test_requests_are_aggregated_per_endpoint(self):
+        """Test counts, statuses, bytes and rate limit use per endpoint."""
+        github_client.paginate(f'{self.fake.url}/orgs/test-org/members', self.session)
+        for slug in ('devs', 'ops'):
+            github_client.paginate(
+                f'{self.fake.url}/orgs/test-org/teams/{slug}/members', self.session
+            )
+        self.session.get(f'{self.fake.url}/users/nobody')
+
+        report = self.metrics.as_dict()
+
+        members = report['endpoints']['GET /orgs/{org}/members']
+        self.assertEqual(members['requests'], 2)
+        self.assertEqual(members['statuses'], {'200': 2})
+        self.assertEqual(members['rate_limit_cost'], 2)
+        self.assertGreater(members['bytes'], 0)
+        self.assertGreaterEqual(
+            members['latency_ms']['max'], members['latency_ms']['p50']
+        )
+        team = report['endpoints']['GET /orgs/{org}/teams/{slug}/members']
+        self.assertEqual(team['requests'], 2)
+        users = report['endpoints']['GET /users/{username}']
+        self.assertEqual(users['statuses'], {'404': 1})
+        self.assertEqual(
+            report['rate_limit']['core'],
+            {'limit': 5000, 'remaining': 4995, 'consumed': 5},
+        )
+
+    @patch('github_client.RETRY_BACKOFF_FACTOR', 0)
+    def test_retries_are_counted(self):
+        """Test that urllib3 retries of server errors are reported."""
+        self.fake.failure_rate = 0.5
+        session = github_client.create_session(
+            'test-token', response_hooks=(self.metrics,)
+        )
+        for _ in range(10):
+            session.get(f'{self.fake.url}/orgs/test-org/teams')
+
+        stats = self.metrics.as_dict()['endpoints']['GET /orgs/{org}/teams']
+        self.assertEqual(stats['retries'], self.fake.failures)
+        self.assertEqual(stats['rate_limit_cost'], 10 + self.fake.failures)
+
+
+class TestWriteMetrics(unittest.TestCase):
+    """Test the JSON file and the job summary written at exit."""
+
+    def test_json_and_step_summary(self):
+        """Test that both outputs are written, appending to the summary."""
+        metrics = RequestMetrics('yaml_to_github')
+        fake = FakeGitHub('test-org', users=['alice'])
+        with fake:
+            session = github_client.create_session(
+                'test-token', response_hooks=(metrics,)
+            )
+            session.get(f'{fake.url}/users/alice')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            summary = Path(tmp, 'summary.md')
+            summary.write_text('# Earlier step\n')
+            env = {
+                'METRICS_PATH': str(Path(tmp, 'metrics.json')),
+                'GITHUB_STEP_SUMMARY': str(summary),
+            }
+            with patch.dict(os.environ, env):
+                write_metrics(metrics)
+
+            report = json.loads(Path(env['METRICS_PATH']).read_text())
+            text = summary.read_text()
+
+        self.assertEqual(report['script'], 'yaml_to_github')
+        self.assertEqual(report['endpoints']['GET /users/{username}']['requests'], 1)
+        self.assertTrue(text.startswith('# Earlier step\n'))
+        self.assertIn('### GitHub API requests: yaml_to_github', text)
+        self.assertIn('| `GET /users/{username}` | 1 |', text)
+        self.assertIn(
+            'Rate limit `core`: 1 used during the run, 4999 of 5000 left.', text
+        )
+
+    def test_no_report_without_requests(self):
+        """Test that a run that made no requests writes nothing."""
+        with tempfile.TemporaryDirectory() as tmp:
+            summary = Path(tmp, 'summary.md')
+            with patch.dict(os.environ, {'GITHUB_STEP_SUMMARY': str(summary)}):
+                write_metrics(RequestMetrics('validate_pr'))
+            self.assertFalse(summary.exists())
+
+    def test_opt_in(self):
+        """Test that no hook is installed without a place to report to."""
+        env = {'METRICS_PATH': '', 'GITHUB_STEP_SUMMARY': ''}
+        with patch.dict(os.environ, env):
+            self.assertIsNone(open_request_metrics('validate_pr'))
+            write_metrics(None)
+        with patch.dict(os.environ, dict(env, METRICS_PATH='metrics.json')):
+            self.assertIsInstance(open_request_metrics('validate_pr'), RequestMetrics)
+
+    def test_reported_writes_once_per_run(self):
+        """Test that each main() run writes one report, also when it exits."""
+        metrics = RequestMetrics('yaml_to_github')
+        fake = FakeGitHub('test-org', users=['alice'])
+        session = github_client.create_session('test-token', response_hooks=(metrics,))
+
+        @reported(metrics)
+        def main():
+            session.get(f'{fake.url}/users/alice')
+            raise SystemExit(1)
+
+        with tempfile.TemporaryDirectory() as tmp, fake:
+            summary = Path(tmp, 'summary.md')
+            with patch.dict(os.environ, {'GITHUB_STEP_SUMMARY': str(summary)}):
+                for _ in range(2):
+                    with self.assertRaises(SystemExit):
+                        main()
+            text = summary.read_text()
+
+        self.assertEqual(text.count('### GitHub API requests'), 2)
+        self.assertEqual(text.count('| `GET /users/{username}` | 1 |'), 2)
+        self.assertEqual(metrics.as_dict()['endpoints'], {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+"""Tests for the sharded TEAMS_DIR layout in team_shards.py."""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+# Set required environment variables before importing
+os.environ['ORG'] = 'test-org'
+os.environ['TOKEN'] = 'test-token'
+
+# Add parent directory to path to import the script
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import github_client
+import github_to_yaml
+import team_shards
+import validate_pr
+import yaml_to_github
+from tests.fake_github import FakeGitHub
+
+
+class ShardTestCase(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        self.dir = Path('teams')
+        self.dir.mkdir()
+
+    def write(self, name, text, directory=None):
+        (directory or self.dir).joinpath(name).write_text(text)
+
+
+class TestTeamShards(ShardTestCase):
+    """Test loading and writing team files."""
+
+    def test_load_shards(self):
+        """Test parsing, normalization and skipping the invite_sent file."""
+        self.write('devs.yaml', '- alice\n- " bob "\n- 3\n')
+        self.write('empty.yaml', '')
+        self.write('invite_sent.yaml', 'invite_sent:\n- dave\n')
+        self.write('README.md', 'not a team')
+
+        shards = team_shards.load_shards(self.dir, workers=4)
+
+        self.assertEqual(sorted(shards), ['devs', 'empty'])
+        self.assertEqual(shards['devs'].users, ['alice', 'bob'])
+        self.assertEqual(
+            shards['devs'].digest, team_shards.members_digest(['alice', 'bob'])
+        )
+        self.assertEqual(shards['empty'].users, [])
+        self.assertEqual(team_shards.load_invite_sent(self.dir)[0], ['dave'])
+
+    def test_malformed_shard_fails(self):
+        """Test that a team file that isn't a list of logins stops the run."""
+        self.write('devs.yaml', 'alice: admin\n')
+
+        with self.assertRaises(SystemExit) as cm:
+            team_shards.load_shards(self.dir)
+        self.assertIn('must contain a YAML list', str(cm.exception))
+
+    def test_write_only_changed_shards(self):
+        """Test that unchanged teams keep their files untouched."""
+        self.write('devs.yaml', '# Backend developers\n- alice\n- bob\n')
+        self.write('ops.yaml', '- carol\n')
+        self.write('old.yaml', '- erin\n')
+        old = team_shards.load_shards(self.dir)
+
+        with patch('yaml_io.dump', wraps=team_shards.yaml_io.dump) as dump:
+            changed = team_shards.write_shards(
+                self.dir,
+                {'devs': ['alice', 'bob'], 'ops': ['carol', 'dave'], 'qa': []},
+                old,
+            )
+
+        self.assertEqual(changed, ['ops', 'qa', 'old'])
+        self.assertEqual(dump.call_count, 2)
+        self.assertTrue(
+            (self.dir / 'devs.yaml').read_text().startswith('# Backend developers')
+        )
+        self.assertEqual((self.dir / 'ops.yaml').read_text(), '- carol\n- dave\n')
+        self.assertEqual((self.dir / 'qa.yaml').read_text(), '[]\n')
+        self.assertFalse((self.dir / 'old.yaml').exists())
+
+
+class TestShardedScripts(ShardTestCase):
+    """Test the scripts with TEAMS_DIR against the stand-in server."""
+
+    def setUp(self):
+        super().setUp()
+        self.fake = FakeGitHub(
+            'test-org',
+            members=['alice', 'bob', 'carol'],
+            pending=['dave'],
+            teams={'devs': ['alice', 'bob'], 'ops': ['carol']},
+            users=['erin'],
+        )
+        self.fake.__enter__()
+        self.addCleanup(self.fake.__exit__, None, None, None)
+        for module in (github_client, github_to_yaml, yaml_to_github):
+            patcher = patch.object(module, 'API', self.fake.url)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        env = patch.dict(os.environ, {'TEAMS_DIR': 'teams'})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def run_main(self, module):
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            module.main()
+        return out.getvalue()
+
+    def test_export_writes_changed_shards(self):
+        """Test that the export rewrites only teams whose members changed."""
+        self.write('devs.yaml', '# kept\n- alice\n- bob\n')
+        self.write('ops.yaml', '- zoe\n')
+
+        output = self.run_main(github_to_yaml)
+
+        self.assertIn('Wrote 1 of 2 team files', output)
+        self.assertEqual(
+            (self.dir / 'devs.yaml').read_text(), '# kept\n- alice\n- bob\n'
+        )
+        self.assertEqual((self.dir / 'ops.yaml').read_text(), '- carol\n')
+        self.assertEqual(
+            (self.dir / 'invite_sent.yaml').read_text(),
+            team_shards.render_invite_sent(['dave']),
+        )
+
+    def test_sync_reconciles_only_changed_shards(self):
+        """Test that the sync lists only teams changed since the previous dir."""
+        previous = Path('previous')
+        shutil.copytree(self.dir, previous)
+        self.write('devs.yaml', '- alice\n- bob\n', previous)
+        self.write('ops.yaml', '- carol\n', previous)
+        self.write('devs.yaml', '- alice\n- erin\n')
+        self.write('ops.yaml', '- carol\n')
+
+        with patch.dict(os.environ, {'PREVIOUS_TEAMS_YAML': str(previous)}):
+            output = self.run_main(yaml_to_github)
+
+        self.assertEqual(self.fake.counts['GET /orgs/{org}/teams/{slug}/members'], 1)
+        self.assertIn('REMOVE devs: bob', output)
+        self.assertEqual(self.fake.teams['devs'], ['alice'])
+        self.assertEqual(self.fake.pending, ['dave', 'erin'])
+        self.assertEqual(
+            (self.dir / 'invite_sent.yaml').read_text(),
+            team_shards.render_invite_sent(['erin']),
+        )
+        self.assertEqual((self.dir / 'devs.yaml').read_text(), '- alice\n- erin\n')
+
+    def test_validation_base_dir(self):
+        """Test that the base branch can be given as a team directory."""
+        self.write('devs.yaml', '- alice\n- bob\n')
+        self.write('ops.yaml', '- carol\n')
+
+        self.assertEqual(
+            validate_pr.load_base_users(self.dir), {'alice', 'bob', 'carol'}
+        )
+
+    def test_malformed_base_dir_falls_back_to_empty(self):
+        """Test that a broken base or previous team file isn't fatal."""
+        self.write('devs.yaml', '- alice\n')
+        self.write('ops.yaml', 'lead: carol\n')
+
+        self.assertEqual(validate_pr.load_base_users(self.dir), set())
+        self.assertIsNone(yaml_to_github.load_previous_teams(str(self.dir)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+"""Tests for the Chrome trace output of tracing.py."""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+# Set required environment variables before importing
+os.environ['ORG'] = 'test-org'
+os.environ['TOKEN'] = 'test-token'
+
+# Add parent directory to path to import the script
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import tracing
+import yaml_to_github
+from tests.fake_github import FakeGitHub
+from tracing import Tracer
+
+
+class TestTracer(unittest.TestCase):
+    """Test span recording and the trace file."""
+
+    def test_disabled_spans_are_no_ops(self):
+        """Test that spans and traced functions work without a tracer."""
+        with patch('tracing.TRACER', None):
+            with tracing.span('phase'):
+                pass
+            self.assertEqual(tracing.traced(lambda x: x + 1)(1), 2)
+
+        with patch.dict(os.environ, {'TRACE_PATH': ''}):
+            self.assertIsNone(tracing.open_tracer())
+
+    def test_nested_spans_and_file_format(self):
+        """Test that spans nest in time and the file loads as a trace."""
+        tracer = Tracer()
+        with tracer.span('outer', slug='devs'):
+            with tracer.span('inner'):
+                pass
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp, 'trace.json')
+            tracer.write(path)
+            trace = json.loads(path.read_text())
+
+        events = {e['name']: e for e in trace['traceEvents'] if e['ph'] == 'X'}
+        outer, inner = events['outer'], events['inner']
+        self.assertEqual(outer['args'], {'slug': 'devs'})
+        self.assertLessEqual(outer['ts'], inner['ts'])
+        self.assertGreaterEqual(
+            outer['ts'] + outer['dur'], inner['ts'] + inner['dur']
+        )
+        self.assertEqual(trace['traceEvents'][0]['name'], 'thread_name')
+
+
+class TestSyncTrace(unittest.TestCase):
+    """Test the spans recorded by a sync against the stand-in server."""
+
+    def setUp(self):
+        fake = FakeGitHub(
+            'test-org',
+            members=['alice', 'bob', 'carol'],
+            teams={'devs': ['alice', 'bob'], 'ops': ['carol']},
+        )
+        fake.__enter__()
+        self.addCleanup(fake.__exit__, None, None, None)
+        self.tracer = Tracer()
+        for target, value in (
+            ('github_client.API', fake.url),
+            ('yaml_to_github.API', fake.url),
+            ('async_sync.API', fake.url),
+            ('tracing.TRACER', self.tracer),
+        ):
+            patcher = patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        Path('teams.yaml').write_text('teams:\n  devs: [alice, carol]\n  ops: []\n')
+
+    def sync(self, engine):
+        with patch.dict(os.environ, {'SYNC_ENGINE': engine}), \
+                patch('sys.stdout', new_callable=io.StringIO):
+            yaml_to_github.main()
+        return self.tracer.as_dict()['traceEvents']
+
+    def test_blocking_sync_spans(self):
+        """Test phase, per-team and HTTP spans of the blocking engine."""
+        events = self.sync('blocking')
+
+        names = [e['name'] for e in events if e['ph'] == 'X']
+        for phase in ('fetch_org_state', 'apply_memberships', 'run_mutations'):
+            self.assertIn(phase, names)
+        teams = {e['args']['slug'] for e in events if e['name'] == 'list_team'}
+        self.assertEqual(teams, {'devs', 'ops'})
+        reconciled = [e for e in events if e['name'] == 'reconcile_team']
+        self.assertEqual(sorted(e['args']['slug'] for e in reconciled), ['devs', 'ops'])
+        self.assertTrue(all(e['ph'] == 'X' for e in reconciled))
+        http = [e for e in events if e.get('cat') == 'http']
+        self.assertIn('PUT /orgs/{org}/teams/{slug}/memberships/{username}', names)
+        self.assertTrue(all(e['dur'] >= 0 for e in http))
+
+    def test_async_sync_spans(self):
+        """Test that coroutine spans come as balanced async begin/end pairs."""
+        events = self.sync('async')
+
+        begins = [e for e in events if e['ph'] == 'b']
+        ends = [e for e in events if e['ph'] == 'e']
+        self.assertEqual(
+            sorted(e['id'] for e in begins), sorted(e['id'] for e in ends)
+        )
+        reconciled = {
+            e['args']['slug'] for e in begins if e['name'] == 'reconcile_team'
+        }
+        self.assertEqual(reconciled, {'devs', 'ops'})
+        self.assertIn('apply_memberships', [e['name'] for e in begins])
+
+
+if __name__ == '__main__':
+    unittest.main()
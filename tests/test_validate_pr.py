@@ -1,6 +1,8 @@
 """Tests for validate_pr.py script."""
 
+import tempfile
 import unittest
+from pathlib import Path
 from unittest.mock import patch, MagicMock, mock_open
 import sys
 import os
@@ -13,12 +15,14 @@ os.environ['TOKEN'] = 'test-token'
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
 
 import validate_pr
+from graphql_backend import GraphQLError
+from user_cache import UserCache
 
 
 class TestUserExists(unittest.TestCase):
     """Test the user_exists function."""
 
-    @patch('validate_pr.requests.get')
+    @patch('validate_pr.SESSION.get')
     def test_user_exists_returns_true_for_valid_user(self, mock_get):
         """Test that user_exists returns True for a valid user."""
         mock_response = MagicMock()
@@ -29,7 +33,7 @@ class TestUserExists(unittest.TestCase):
         self.assertTrue(result)
         mock_get.assert_called_once()
 
-    @patch('validate_pr.requests.get')
+    @patch('validate_pr.SESSION.get')
     def test_user_exists_returns_false_for_invalid_user(self, mock_get):
         """Test that user_exists returns False for a non-existent user."""
         mock_response = MagicMock()
@@ -39,7 +43,7 @@ class TestUserExists(unittest.TestCase):
         result = validate_pr.user_exists('nonexistentuser')
         self.assertFalse(result)
 
-    @patch('validate_pr.requests.get')
+    @patch('validate_pr.SESSION.get')
     @patch('validate_pr.sys.exit')
     def test_user_exists_exits_on_rate_limit(self, mock_exit, mock_get):
         """Test that user_exists exits on rate limit."""
@@ -55,19 +59,20 @@ class TestUserExists(unittest.TestCase):
 class TestPaginate(unittest.TestCase):
     """Test the paginate function."""
 
-    @patch('validate_pr.requests.get')
+    @patch('validate_pr.SESSION.get')
     def test_paginate_single_page(self, mock_get):
         """Test pagination with a single page of results."""
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = [{'login': 'user1'}, {'login': 'user2'}]
+        mock_response.links = {}
         mock_get.return_value = mock_response
 
         result = validate_pr.paginate('https://api.github.com/orgs/test/members')
         self.assertEqual(len(result), 2)
         self.assertEqual(result[0]['login'], 'user1')
 
-    @patch('validate_pr.requests.get')
+    @patch('validate_pr.SESSION.get')
     def test_paginate_multiple_pages(self, mock_get):
         """Test pagination with multiple pages."""
         # First page (100 items)
@@ -78,10 +83,12 @@ class TestPaginate(unittest.TestCase):
         mock_response1 = MagicMock()
         mock_response1.status_code = 200
         mock_response1.json.return_value = page1
+        mock_response1.links = {}
 
         mock_response2 = MagicMock()
         mock_response2.status_code = 200
         mock_response2.json.return_value = page2
+        mock_response2.links = {}
 
         mock_get.side_effect = [mock_response1, mock_response2]
 
@@ -92,11 +99,12 @@ class TestPaginate(unittest.TestCase):
 class TestMainValidation(unittest.TestCase):
     """Test the main validation logic."""
 
+    @patch('validate_pr.batch_lookup_users', side_effect=GraphQLError('unavailable'))
     @patch('validate_pr.Path')
-    @patch('validate_pr.paginate')
+    @patch('validate_pr.iter_paginate')
     @patch('validate_pr.user_exists')
     @patch('validate_pr.sys.exit')
-    def test_main_exits_on_invalid_user(self, mock_exit, mock_user_exists, mock_paginate, mock_path):
+    def test_main_exits_on_invalid_user(self, mock_exit, mock_user_exists, mock_paginate, mock_path, mock_batch):
         """Test that main exits when an invalid user is found."""
         # Mock file reading
         mock_path.return_value.read_text.return_value = """
@@ -114,11 +122,12 @@ teams:
         validate_pr.main()
         mock_exit.assert_called_once_with(1)
 
+    @patch('validate_pr.batch_lookup_users', side_effect=GraphQLError('unavailable'))
     @patch('validate_pr.Path')
-    @patch('validate_pr.paginate')
+    @patch('validate_pr.iter_paginate')
     @patch('validate_pr.user_exists')
     @patch('validate_pr.sys.exit')
-    def test_main_succeeds_with_valid_users(self, mock_exit, mock_user_exists, mock_paginate, mock_path):
+    def test_main_succeeds_with_valid_users(self, mock_exit, mock_user_exists, mock_paginate, mock_path, mock_batch):
         """Test that main succeeds when all users are valid."""
         # Mock file reading
         mock_path.return_value.read_text.return_value = """
@@ -138,5 +147,153 @@ teams:
         mock_exit.assert_not_called()
 
 
+class TestDiffScopedValidation(unittest.TestCase):
+    """Test validating only the logins a PR adds."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.base = Path(self.tmp.name) / 'base-teams.yaml'
+        self.head = Path(self.tmp.name) / 'teams.yaml'
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        self.addCleanup(os.chdir, cwd)
+
+    def test_load_base_users(self):
+        """Test collecting logins from the base teams.yaml."""
+        self.base.write_text('teams:\n  a: [alice, " bob "]\n  b: [alice, 3]\n')
+        self.assertEqual(validate_pr.load_base_users(self.base), {'alice', 'bob'})
+
+    def test_missing_or_malformed_base_validates_everything(self):
+        """Test that an unusable base file contributes no logins."""
+        self.assertEqual(validate_pr.load_base_users(self.base), set())
+        self.base.write_text('teams: [not, a, mapping]\n')
+        self.assertEqual(validate_pr.load_base_users(self.base), set())
+
+    @patch('validate_pr.iter_paginate')
+    @patch('validate_pr.users_exist')
+    def test_only_added_logins_are_checked(self, mock_users_exist, mock_paginate):
+        """Test that existence checks only see logins new in the PR."""
+        self.base.write_text('teams:\n  devs: [alice, bob]\n')
+        self.head.write_text('teams:\n  devs: [alice, bob]\n  docs: [bob, carol]\n')
+        mock_paginate.return_value = [{'login': 'alice'}, {'login': 'bob'}]
+        mock_users_exist.side_effect = lambda logins: {u: True for u in logins}
+
+        with patch.dict(os.environ, {'BASE_TEAMS_YAML': str(self.base)}):
+            with patch('builtins.print'):
+                validate_pr.main()
+
+        mock_users_exist.assert_called_once_with({'carol'})
+
+    @patch('validate_pr.iter_paginate')
+    @patch('validate_pr.users_exist')
+    def test_no_added_logins_needs_no_requests(self, mock_users_exist, mock_paginate):
+        """Test that removing users costs no org member listing."""
+        self.base.write_text('teams:\n  devs: [alice, bob]\n')
+        self.head.write_text('teams:\n  devs: [alice]\n')
+        mock_users_exist.return_value = {}
+
+        with patch.dict(os.environ, {'BASE_TEAMS_YAML': str(self.base)}):
+            with patch('builtins.print'):
+                validate_pr.main()
+
+        mock_paginate.assert_not_called()
+
+
+class TestUserCache(unittest.TestCase):
+    """Test that validation reads and writes the user-existence cache."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / 'users.json'
+
+    def open_cache(self):
+        return UserCache(self.path, ttl=3600, negative_ttl=60)
+
+    @patch('validate_pr.user_exists')
+    @patch('validate_pr.batch_lookup_users')
+    def test_repeat_validation_needs_no_lookups(self, mock_batch, mock_user_exists):
+        """Test that an unchanged roster is answered from the cache."""
+        mock_batch.return_value = {'alice': 101, 'ghost': None}
+
+        with patch('validate_pr.USER_CACHE', self.open_cache()):
+            first = validate_pr.users_exist({'alice', 'ghost'})
+        with patch('validate_pr.USER_CACHE', self.open_cache()):
+            second = validate_pr.users_exist({'alice', 'ghost'})
+
+        self.assertEqual(first, {'alice': True, 'ghost': False})
+        self.assertEqual(second, first)
+        mock_batch.assert_called_once()
+        mock_user_exists.assert_not_called()
+
+    def test_negative_entries_expire_sooner(self):
+        """Test that unknown logins use the shorter negative TTL."""
+        now = [1000.0]
+        cache = UserCache(self.path, ttl=3600, negative_ttl=60, clock=lambda: now[0])
+        cache.put('alice', True, 101)
+        cache.put('Ghost', False)
+
+        now[0] += 120
+        self.assertEqual(cache.get('alice'), (True, 101))
+        self.assertIsNone(cache.get('ghost'))
+
+        now[0] += 3600
+        self.assertIsNone(cache.get('alice'))
+
+
+def graphql_response(data, errors=None):
+    r = MagicMock()
+    r.status_code = 200
+    r.json.return_value = {'data': data, 'errors': errors or []}
+    return r
+
+
+class TestBatchedUserChecks(unittest.TestCase):
+    """Test GraphQL-batched username existence checks."""
+
+    @patch('validate_pr.SESSION.post')
+    def test_batch_resolves_logins_in_one_query(self, mock_post):
+        """Test that existing and unknown logins come from one aliased query."""
+        mock_post.return_value = graphql_response(
+            {'u0': {'databaseId': 101}, 'u1': None},
+            [{'type': 'NOT_FOUND', 'path': ['u1'], 'message': 'Could not resolve'}],
+        )
+
+        result = validate_pr.batch_lookup_users(['alice', 'ghost'])
+
+        self.assertEqual(result, {'alice': 101, 'ghost': None})
+        mock_post.assert_called_once()
+        body = mock_post.call_args.kwargs['json']
+        self.assertIn('u1: user(login: $l1)', body['query'])
+        self.assertEqual(body['variables'], {'l0': 'alice', 'l1': 'ghost'})
+
+    @patch('validate_pr.BATCH_SIZE', 2)
+    @patch('validate_pr.batch_lookup_users')
+    def test_users_exist_chunks_logins(self, mock_batch):
+        """Test that logins are split into BATCH_SIZE chunks."""
+        mock_batch.side_effect = lambda logins: {login: 1 for login in logins}
+
+        result = validate_pr.users_exist({'a', 'b', 'c', 'd', 'e'})
+
+        self.assertEqual(mock_batch.call_count, 3)
+        self.assertEqual(set(result), {'a', 'b', 'c', 'd', 'e'})
+
+    @patch('validate_pr.user_exists')
+    @patch('validate_pr.SESSION.post')
+    def test_falls_back_to_rest_on_graphql_errors(self, mock_post, mock_user_exists):
+        """Test that unexpected GraphQL errors fall back to per-user REST."""
+        mock_post.return_value = graphql_response(
+            None, [{'type': 'FORBIDDEN', 'message': 'Resource not accessible'}]
+        )
+        mock_user_exists.side_effect = lambda login: login == 'alice'
+
+        with patch('builtins.print'):
+            result = validate_pr.users_exist({'alice', 'ghost'})
+
+        self.assertEqual(result, {'alice': True, 'ghost': False})
+        self.assertEqual(mock_user_exists.call_count, 2)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,234 @@
+"""Tests for webhook_receiver.py, replaying recorded webhook deliveries."""
+
+import hashlib
+import hmac
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import requests
+import yaml
+
+# Set required environment variables before importing
+os.environ['ORG'] = 'test-org'
+os.environ['TOKEN'] = 'test-token'
+
+# Add parent directory to path to import the script
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import github_client
+import github_to_yaml
+import webhook_receiver
+from tests.fake_github import FakeGitHub
+
+DELIVERIES = Path(__file__).parent / 'webhooks' / 'deliveries.json'
+SECRET = 'webhook-secret'
+
+
+def sign(body, secret=SECRET):
+    digest = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return f'sha256={digest}'
+
+
+class TestWebhookReceiver(unittest.TestCase):
+    """Test the receiver against the stand-in server and recorded payloads."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+
+        self.fake = FakeGitHub(
+            'test-org',
+            members=['alice', 'bob', 'carol'],
+            pending=['dave'],
+            teams={'devs': ['alice', 'bob'], 'ops': ['carol']},
+            users=['erin'],
+        )
+        self.fake.__enter__()
+        self.addCleanup(self.fake.__exit__, None, None, None)
+        for module in (github_client, github_to_yaml):
+            patcher = patch.object(module, 'API', self.fake.url)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        stdout = patch('sys.stdout', new_callable=io.StringIO)
+        self.stdout = stdout.start()
+        self.addCleanup(stdout.stop)
+
+        Path('teams.yaml').write_text(
+            'teams:\n  devs: [alice, bob, erin]\n  ops: [carol, dave]\n'
+        )
+        self.fetches = 0
+        self.receiver = webhook_receiver.Receiver(
+            'test-org', SECRET, Path('teams.yaml'), self.fetch
+        )
+
+    def fetch(self):
+        self.fetches += 1
+        session = github_client.create_session('test-token')
+        return webhook_receiver.fetch_org_state('test-org', session)
+
+    def serve(self):
+        server = webhook_receiver.make_server(self.receiver)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        host, port = server.server_address
+        return f'http://{host}:{port}/'
+
+    def post(self, url, event, payload, signature=None):
+        body = json.dumps(payload).encode()
+        return requests.post(
+            url,
+            data=body,
+            headers={
+                'X-GitHub-Event': event,
+                'X-Hub-Signature-256': signature or sign(body),
+                'Content-Type': 'application/json',
+            },
+            timeout=5,
+        )
+
+    def teams(self):
+        return yaml.safe_load(Path('teams.yaml').read_text())
+
+    def test_seed_matches_export(self):
+        """Test that startup writes what the export writes."""
+        seeded = Path('teams.yaml').read_text()
+
+        github_to_yaml.main()
+
+        self.assertEqual(Path('teams.yaml').read_text(), seeded)
+        self.assertEqual(
+            self.teams()['teams'], {'devs': ['alice', 'bob'], 'ops': ['carol', 'dave']}
+        )
+
+    def test_replay_matches_export(self):
+        """Test replaying recorded deliveries ends where a fresh export does."""
+        url = self.serve()
+        deliveries = json.loads(DELIVERIES.read_text())
+
+        statuses = [
+            self.post(url, d['event'], d['payload']).status_code for d in deliveries
+        ]
+
+        self.assertEqual(statuses, [202] + [200] * (len(deliveries) - 1))
+        self.assertEqual(self.fetches, 1)
+        config = self.teams()
+        self.assertEqual(
+            config['teams'],
+            {'devs': ['alice'], 'operations': ['dave'], 'qa': []},
+        )
+        self.assertEqual(config['invite_sent'], ['erin'])
+
+        # The same changes made on the server, then a full export.
+        self.fake.members = ['alice', 'bob', 'dave']
+        self.fake.pending = ['erin']
+        self.fake.teams = {'devs': ['alice'], 'operations': ['dave'], 'qa': []}
+        received = Path('teams.yaml').read_text()
+        github_to_yaml.main()
+
+        self.assertEqual(Path('teams.yaml').read_text(), received)
+        self.assertIn('No changes to teams.yaml needed.', self.stdout.getvalue())
+
+    def test_rejects_unsigned_deliveries(self):
+        """Test that bad or missing signatures change nothing."""
+        url = self.serve()
+        before = Path('teams.yaml').read_text()
+        payload = json.loads(DELIVERIES.read_text())[5]['payload']
+
+        bad = self.post(url, 'membership', payload, sign(b'{}'))
+        wrong_secret = self.post(
+            url, 'membership', payload, sign(json.dumps(payload).encode(), 'nope')
+        )
+        missing = requests.post(
+            url, data=b'{}', headers={'X-GitHub-Event': 'membership'}, timeout=5
+        )
+
+        self.assertEqual(
+            [bad.status_code, wrong_secret.status_code, missing.status_code],
+            [401, 401, 401],
+        )
+        self.assertEqual(Path('teams.yaml').read_text(), before)
+
+    def test_ignores_other_orgs_and_events(self):
+        """Test deliveries for another org or unhandled events."""
+        payload = json.loads(DELIVERIES.read_text())[5]['payload']
+        other = dict(payload, organization={'login': 'other-org'})
+
+        for event, body in (('membership', other), ('repository', payload)):
+            data = json.dumps(body).encode()
+            with self.subTest(event=event):
+                status, _ = self.receiver.handle(event, data, sign(data))
+                self.assertEqual(status, 202)
+        self.assertIn('bob', self.teams()['teams']['devs'])
+
+    def test_malformed_payload(self):
+        """Test that a payload missing fields is refused."""
+        data = json.dumps(
+            {'action': 'added', 'scope': 'team', 'organization': {'login': 'test-org'}}
+        ).encode()
+
+        status, message = self.receiver.handle('membership', data, sign(data))
+
+        self.assertEqual(status, 400)
+        self.assertIn('member', message)
+
+    def test_unknown_rename_resyncs(self):
+        """Test that a rename of an unknown team refetches the org."""
+        self.fake.teams['platform'] = self.fake.teams.pop('ops')
+        data = json.dumps({
+            'action': 'edited',
+            'changes': {'name': {'from': 'Ops Team'}},
+            'team': {'id': 77, 'slug': 'platform', 'name': 'Platform'},
+            'organization': {'login': 'test-org'},
+        }).encode()
+
+        status, _ = self.receiver.handle('team', data, sign(data))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(self.fetches, 2)
+        self.assertEqual(
+            self.teams()['teams'], {'devs': ['alice', 'bob'], 'platform': ['carol']}
+        )
+
+    def test_failed_resync_asks_for_redelivery(self):
+        """Test that an API error while refetching answers 503, not 500."""
+        before = Path('teams.yaml').read_text()
+
+        def fail():
+            raise requests.exceptions.ConnectionError('connection reset')
+
+        self.receiver.fetch = fail
+        data = json.dumps({
+            'action': 'edited',
+            'changes': {'name': {'from': 'Ops Team'}},
+            'team': {'id': 77, 'slug': 'platform', 'name': 'Platform'},
+            'organization': {'login': 'test-org'},
+        }).encode()
+
+        status, message = self.receiver.handle('team', data, sign(data))
+
+        self.assertEqual(status, 503)
+        self.assertIn('connection reset', message)
+        self.assertEqual(Path('teams.yaml').read_text(), before)
+
+
+class TestSlugify(unittest.TestCase):
+    """Test deriving slugs from team names."""
+
+    def test_slugify(self):
+        self.assertEqual(webhook_receiver.slugify('Ops Team'), 'ops-team')
+        self.assertEqual(webhook_receiver.slugify(' Front_End & QA! '), 'front-end-qa')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""Tests for the libyaml-backed YAML I/O in yaml_io.py."""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import yaml
+
+# Set required environment variables before importing
+os.environ['ORG'] = 'test-org'
+os.environ['TOKEN'] = 'test-token'
+
+# Add parent directory to path to import the script
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+import github_to_yaml
+import yaml_io
+import yaml_to_github
+
+
+def safe_dump(doc):
+    return yaml.safe_dump(doc, sort_keys=True, default_flow_style=False)
+
+
+ROSTER = {
+    'teams': {
+        f'team-{t}': [f'user-{t}-{i}' for i in range(5)] + ['123', 'yes', 'null']
+        for t in range(20)
+    },
+    'invite_sent': ['dave', 'erin'],
+    'settings': {'enabled': True, 'limit': 10, 'ratio': 0.5, 'owner': None},
+}
+
+# Documents the C and Python emitters would write differently.
+TRICKY = [
+    {'teams': {'': ['alice']}},
+    {'teams': {'devs': ['a long login ' * 10]}},
+    {'notes': 'line one\nline two', 'teams': {'devs': ['café']}},
+    {'teams': {'x' * 200: []}},
+]
+
+
+class TestYamlIo(unittest.TestCase):
+    """Test that yaml_io matches yaml.safe_load and yaml.safe_dump."""
+
+    def test_dump_is_byte_identical(self):
+        """Test plain rosters and documents needing the Python emitter."""
+        for doc in [ROSTER] + TRICKY:
+            with self.subTest(doc=str(doc)[:40]):
+                self.assertEqual(yaml_io.dump(doc), safe_dump(doc))
+
+    def test_plain_detection(self):
+        """Test which documents qualify for the C emitter."""
+        self.assertTrue(yaml_io.is_plain(ROSTER))
+        for doc in TRICKY:
+            with self.subTest(doc=str(doc)[:40]):
+                self.assertFalse(yaml_io.is_plain(doc))
+
+    @unittest.skipUnless(yaml_io.CSafeDumper, 'PyYAML built without libyaml')
+    def test_plain_documents_use_libyaml(self):
+        """Test that rosters are dumped and loaded with the C classes."""
+        with patch('yaml.dump', wraps=yaml.dump) as dump, \
+                patch('yaml.load', wraps=yaml.load) as load:
+            yaml_io.load(yaml_io.dump(ROSTER))
+
+        self.assertIs(dump.call_args.kwargs['Dumper'], yaml.CSafeDumper)
+        self.assertIs(load.call_args.kwargs['Loader'], yaml.CSafeLoader)
+
+    def test_load_matches_safe_load(self):
+        """Test that loading gives the same objects, including empty files."""
+        for text in [safe_dump(ROSTER)] + [safe_dump(doc) for doc in TRICKY] + ['']:
+            with self.subTest(text=text[:40]):
+                self.assertEqual(yaml_io.load(text), yaml.safe_load(text))
+
+    def test_without_libyaml(self):
+        """Test the fallback to the pure-Python classes."""
+        with patch('yaml_io.CSafeDumper', None), \
+                patch('yaml_io.Loader', yaml.SafeLoader):
+            self.assertEqual(yaml_io.dump(ROSTER), safe_dump(ROSTER))
+            self.assertEqual(yaml_io.load(safe_dump(ROSTER)), ROSTER)
+
+    def test_rendered_files_keep_the_comment(self):
+        """Test both render_yaml functions against the pure-Python output."""
+        teams = {'devs': ['alice', 'dave']}
+        expected = safe_dump({'teams': teams, 'invite_sent': ['dave']}).replace(
+            'invite_sent:', yaml_io.COMMENT + 'invite_sent:', 1
+        )
+
+        exported = github_to_yaml.render_yaml(teams, {'dave'})
+        synced = yaml_to_github.render_yaml(
+            {'teams': {}}, teams, {'alice'}, {'dave'}, set()
+        )
+
+        self.assertEqual(exported, expected)
+        self.assertEqual(synced, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
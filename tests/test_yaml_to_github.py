@@ -1,11 +1,18 @@
 """Tests for yaml_to_github.py script functionality."""
 
+import io
+import json
+import threading
+import time
 import unittest
 from unittest.mock import patch, MagicMock, mock_open
 import sys
 import os
+import tempfile
 from pathlib import Path
 
+import requests
+
 # Set required environment variables before importing
 os.environ['ORG'] = 'test-org'
 os.environ['TOKEN'] = 'test-token'
@@ -13,7 +20,9 @@ os.environ['TOKEN'] = 'test-token'
 # Add parent directory to path to import the script
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
 
+import github_client
 import yaml_to_github
+from user_cache import UserCache
 
 
 class TestYamlToGithubFunctionality(unittest.TestCase):
@@ -24,7 +33,7 @@ class TestYamlToGithubFunctionality(unittest.TestCase):
         self.mock_session = MagicMock()
         self.org = 'test-org'
 
-    @patch('yaml_to_github.paginate')
+    @patch('github_client.iter_paginate')
     def test_adding_org_member_to_team(self, mock_paginate):
         """Test adding someone to a team who is already in the org."""
         # Setup: user is in org but not in team
@@ -59,9 +68,10 @@ class TestYamlToGithubFunctionality(unittest.TestCase):
         # No invites should be sent (bob is already in org)
         self.assertEqual(len(invited), 0)
 
-    @patch('yaml_to_github.paginate')
-    @patch('yaml_to_github.invite_by_login')
-    def test_adding_non_org_member_to_team(self, mock_invite, mock_paginate):
+    @patch('github_client.iter_paginate')
+    @patch('yaml_to_github.resolve_user_id', return_value=(3, None))
+    @patch('yaml_to_github.post_invitation')
+    def test_adding_non_org_member_to_team(self, mock_invite, mock_resolve, mock_paginate):
         """Test adding someone to a team who is not in the org (sends invite)."""
         # Setup: charlie is not in org
         org_members = {'alice', 'bob'}
@@ -74,8 +84,8 @@ class TestYamlToGithubFunctionality(unittest.TestCase):
         # Desired state: charlie should be added (but needs invite first)
         desired = {'developers': ['alice', 'charlie']}
         
-        # Mock invite function to return True (invite sent)
-        mock_invite.return_value = True
+        # Mock invite function to report the invite as sent
+        mock_invite.return_value = (True, 'INVITED: charlie')
         
         # Call the function
         invited = yaml_to_github.apply_memberships(
@@ -88,7 +98,7 @@ class TestYamlToGithubFunctionality(unittest.TestCase):
         )
         
         # Verify invite was sent for charlie
-        mock_invite.assert_called_once_with(self.org, 'charlie', self.mock_session)
+        mock_invite.assert_called_once_with(self.org, 'charlie', 3, self.mock_session)
         self.assertIn('charlie', invited)
         
         # Verify charlie was NOT added to team (not in org yet)
@@ -96,7 +106,7 @@ class TestYamlToGithubFunctionality(unittest.TestCase):
         for call in self.mock_session.put.call_args_list:
             self.assertNotIn('charlie', str(call))
 
-    @patch('yaml_to_github.paginate')
+    @patch('github_client.iter_paginate')
     def test_removing_member_from_team(self, mock_paginate):
         """Test removing someone from a team."""
         # Setup: both alice and bob are in org and in team
@@ -128,8 +138,8 @@ class TestYamlToGithubFunctionality(unittest.TestCase):
         call_args = self.mock_session.delete.call_args
         self.assertIn('/memberships/bob', call_args[0][0])
 
-    @patch('yaml_to_github.paginate')
-    @patch('yaml_to_github.invite_by_login')
+    @patch('github_client.iter_paginate')
+    @patch('yaml_to_github.post_invitation')
     def test_no_duplicate_invites_for_pending_users(self, mock_invite, mock_paginate):
         """Test that users with pending invites don't get invited again."""
         # Setup: charlie has a pending invite
@@ -158,7 +168,7 @@ class TestYamlToGithubFunctionality(unittest.TestCase):
         self.assertEqual(len(invited), 0)
 
     @patch('yaml_to_github.sys.exit')
-    @patch('yaml_to_github.paginate')
+    @patch('github_client.iter_paginate')
     def test_fails_for_nonexistent_team(self, mock_paginate, mock_exit):
         """Test that script fails when trying to manage a team that doesn't exist."""
         # Setup: nonexistent team
@@ -182,7 +192,7 @@ class TestYamlToGithubFunctionality(unittest.TestCase):
 
 
 class TestReconcileTeam(unittest.TestCase):
-    """Test the reconcile_team function specifically."""
+    """Test the writes apply_memberships sends for a single team."""
 
     def setUp(self):
         """Set up test fixtures."""
@@ -190,6 +200,18 @@ class TestReconcileTeam(unittest.TestCase):
         self.org = 'test-org'
         self.slug = 'developers'
 
+    def reconcile(self, want, have, org_members):
+        with patch('sys.stdout', new_callable=io.StringIO):
+            yaml_to_github.apply_memberships(
+                self.org,
+                self.mock_session,
+                {self.slug: sorted(want)},
+                org_members,
+                set(),
+                {self.slug},
+                team_members={self.slug: have},
+            )
+
     def test_add_multiple_members(self):
         """Test adding multiple members to a team."""
         want = {'alice', 'bob', 'charlie'}
@@ -198,9 +220,7 @@ class TestReconcileTeam(unittest.TestCase):
         
         self.mock_session.put.return_value.status_code = 200
         
-        yaml_to_github.reconcile_team(
-            self.org, self.mock_session, self.slug, want, have, org_members
-        )
+        self.reconcile(want, have, org_members)
         
         # Should add all three members
         self.assertEqual(self.mock_session.put.call_count, 3)
@@ -213,9 +233,7 @@ class TestReconcileTeam(unittest.TestCase):
         
         self.mock_session.delete.return_value.status_code = 200
         
-        yaml_to_github.reconcile_team(
-            self.org, self.mock_session, self.slug, want, have, org_members
-        )
+        self.reconcile(want, have, org_members)
         
         # Should remove all three members
         self.assertEqual(self.mock_session.delete.call_count, 3)
@@ -229,9 +247,7 @@ class TestReconcileTeam(unittest.TestCase):
         self.mock_session.put.return_value.status_code = 200
         self.mock_session.delete.return_value.status_code = 200
         
-        yaml_to_github.reconcile_team(
-            self.org, self.mock_session, self.slug, want, have, org_members
-        )
+        self.reconcile(want, have, org_members)
         
         # Should add charlie
         self.assertEqual(self.mock_session.put.call_count, 1)
@@ -244,23 +260,112 @@ class TestReconcileTeam(unittest.TestCase):
         self.assertIn('bob', delete_call)
 
 
+class TestRunMutations(unittest.TestCase):
+    """Test the concurrent membership write executor."""
+
+    def setUp(self):
+        self.org = 'test-org'
+        self.in_flight = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def slow_response(self, status_code):
+        def respond(url, timeout=None):
+            with self.lock:
+                self.in_flight += 1
+                self.peak = max(self.peak, self.in_flight)
+            time.sleep(0.02)
+            with self.lock:
+                self.in_flight -= 1
+            response = MagicMock()
+            response.status_code = 404 if 'ghost' in url else status_code
+            response.text = 'Not Found'
+            return response
+        return respond
+
+    def test_writes_run_concurrently_with_ordered_log(self):
+        """Test bounded concurrency and deterministic ADD/REMOVE order."""
+        session = MagicMock()
+        session.put.side_effect = self.slow_response(200)
+        session.delete.side_effect = self.slow_response(204)
+        adds = [f'user{i:02d}' for i in range(12)]
+        mutations = yaml_to_github.team_mutations(self.org, 'devs', adds, ['old'])
+
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            yaml_to_github.run_mutations(session, {'devs': mutations}, workers=4)
+
+        expected = [f'ADD devs: {login}' for login in adds] + ['REMOVE devs: old']
+        self.assertEqual(out.getvalue().splitlines(), expected)
+        self.assertGreater(self.peak, 1)
+        self.assertLessEqual(self.peak, 4)
+
+    def test_failures_reported_after_all_writes(self):
+        """Test that one failed write doesn't stop the others."""
+        session = MagicMock()
+        session.put.side_effect = self.slow_response(200)
+        mutations = yaml_to_github.team_mutations(
+            self.org, 'devs', ['alice', 'ghost', 'zoe'], []
+        )
+
+        with patch('sys.stdout', new_callable=io.StringIO) as out, \
+                patch('sys.stderr', new_callable=io.StringIO) as err:
+            with self.assertRaises(SystemExit):
+                yaml_to_github.run_mutations(
+                    session, {'devs': mutations}, workers=3
+                )
+
+        self.assertEqual(session.put.call_count, 3)
+        self.assertEqual(out.getvalue().splitlines(), ['ADD devs: alice', 'ADD devs: zoe'])
+        self.assertIn('Failed adding ghost to devs: 404', err.getvalue())
+
+    @patch('github_client.iter_paginate')
+    def test_apply_batches_writes_across_teams(self, mock_paginate):
+        """Test that every team's writes go out in one slug-ordered batch."""
+        session = MagicMock()
+        session.put.side_effect = self.slow_response(200)
+        mock_paginate.return_value = []
+        desired = {'b-team': ['bob'], 'a-team': ['alice', 'bob']}
+
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            yaml_to_github.apply_memberships(
+                self.org, session, desired, {'alice', 'bob'}, set(),
+                {'a-team', 'b-team'}, workers=3,
+            )
+
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            ['ADD a-team: alice', 'ADD a-team: bob', 'ADD b-team: bob'],
+        )
+        self.assertLessEqual(self.peak, 3)
+
+
 class TestInviteMissingMembers(unittest.TestCase):
-    """Test the invite_missing_members function."""
+    """Test that apply_memberships invites wanted users who aren't members."""
+
+    def invite(self, session, want, org_members, pending_invites):
+        with patch('sys.stdout', new_callable=io.StringIO):
+            return yaml_to_github.apply_memberships(
+                'test-org',
+                session,
+                {'developers': sorted(want)},
+                org_members,
+                pending_invites,
+                {'developers'},
+                team_members={'developers': set(org_members)},
+            )
 
-    @patch('yaml_to_github.invite_by_login')
-    def test_invite_non_org_members(self, mock_invite):
+    @patch('yaml_to_github.resolve_user_id', return_value=(3, None))
+    @patch('yaml_to_github.post_invitation')
+    def test_invite_non_org_members(self, mock_invite, mock_resolve):
         """Test inviting users who are not in the org."""
-        org = 'test-org'
         session = MagicMock()
         want = {'alice', 'bob', 'charlie'}
         org_members = {'alice'}  # only alice is in org
         pending_invites = set()
         
-        mock_invite.return_value = True
+        mock_invite.return_value = (True, 'INVITED')
         
-        invited = yaml_to_github.invite_missing_members(
-            org, session, want, org_members, pending_invites
-        )
+        invited = self.invite(session, want, org_members, pending_invites)
         
         # Should invite bob and charlie
         self.assertEqual(len(invited), 2)
@@ -268,20 +373,18 @@ class TestInviteMissingMembers(unittest.TestCase):
         self.assertIn('charlie', invited)
         self.assertEqual(mock_invite.call_count, 2)
 
-    @patch('yaml_to_github.invite_by_login')
-    def test_skip_already_invited(self, mock_invite):
+    @patch('yaml_to_github.resolve_user_id', return_value=(3, None))
+    @patch('yaml_to_github.post_invitation')
+    def test_skip_already_invited(self, mock_invite, mock_resolve):
         """Test that users with pending invites are skipped."""
-        org = 'test-org'
         session = MagicMock()
         want = {'alice', 'bob', 'charlie'}
         org_members = {'alice'}
         pending_invites = {'bob'}  # bob already has invite
         
-        mock_invite.return_value = True
+        mock_invite.return_value = (True, 'INVITED')
         
-        invited = yaml_to_github.invite_missing_members(
-            org, session, want, org_members, pending_invites
-        )
+        invited = self.invite(session, want, org_members, pending_invites)
         
         # Should only invite charlie (bob skipped)
         self.assertEqual(len(invited), 1)
@@ -289,5 +392,292 @@ class TestInviteMissingMembers(unittest.TestCase):
         self.assertEqual(mock_invite.call_count, 1)
 
 
+class TestInvitePipeline(unittest.TestCase):
+    """Test that id lookups and invitation POSTs overlap."""
+
+    def setUp(self):
+        self.org = 'test-org'
+        self.events = []
+        self.lock = threading.Lock()
+        self.session = MagicMock()
+        self.session.get.side_effect = self.lookup
+        self.session.post.side_effect = self.invite
+
+    def record(self, event):
+        with self.lock:
+            self.events.append(event)
+
+    def lookup(self, url, timeout=None):
+        login = url.rsplit('/', 1)[1]
+        # The slow lookup finishes last, after the others were already posted.
+        time.sleep(0.2 if login == 'aaron' else 0.01)
+        self.record(f'GET {login}')
+        if login == 'unreachable':
+            raise requests.exceptions.ConnectionError('connection reset')
+        response = MagicMock()
+        if login == 'busy':
+            response.raise_for_status.side_effect = requests.exceptions.HTTPError(
+                '502 Server Error'
+            )
+        response.status_code = 404 if login == 'ghost' else 200
+        response.json.return_value = {'id': len(login)}
+        return response
+
+    def invite(self, url, json=None, timeout=None):
+        self.record(f"POST {json['invitee_id']}")
+        response = MagicMock()
+        response.status_code = 422 if json['invitee_id'] == 3 else 201
+        response.json.return_value = {'message': 'already invited'}
+        return response
+
+    @patch('yaml_to_github.USER_CACHE', None)
+    def test_posts_start_before_all_lookups_finish(self):
+        """Test the two stages overlap and keep the 201/422 results."""
+        want = {'aaron', 'bo', 'cat'}
+
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            invited = yaml_to_github.invite_logins(
+                self.org, self.session, sorted(want), workers=2
+            )
+
+        self.assertLess(self.events.index('POST 2'), self.events.index('GET aaron'))
+        self.assertEqual(invited, {'aaron', 'bo'})
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            [
+                'INVITED: aaron',
+                'INVITED: bo',
+                'INVITE SKIPPED: cat -> already invited',
+            ],
+        )
+
+    @patch('yaml_to_github.USER_CACHE', None)
+    def test_unknown_user_fails_after_other_invites(self):
+        """Test that an unknown login is reported once the rest are invited."""
+        with patch('sys.stdout', new_callable=io.StringIO), \
+                patch('sys.stderr', new_callable=io.StringIO) as err:
+            with self.assertRaises(SystemExit):
+                yaml_to_github.invite_logins(
+                    self.org, self.session, ['bo', 'ghost'], workers=2
+                )
+
+        self.assertIn('POST 2', self.events)
+        self.assertIn('Unknown GitHub user: ghost', err.getvalue())
+
+    @patch('yaml_to_github.USER_CACHE', None)
+    def test_failed_lookups_are_reported_not_raised(self):
+        """Test that lookup errors are reported once the rest are invited."""
+        with patch('sys.stdout', new_callable=io.StringIO), \
+                patch('sys.stderr', new_callable=io.StringIO) as err:
+            with self.assertRaises(SystemExit):
+                yaml_to_github.invite_logins(
+                    self.org, self.session, ['bo', 'busy', 'unreachable'], workers=2
+                )
+
+        self.assertIn('POST 2', self.events)
+        self.assertIn('Could not look up busy: 502 Server Error', err.getvalue())
+        self.assertIn('Could not look up unreachable: connection reset', err.getvalue())
+
+
+class TestPlanApply(unittest.TestCase):
+    """Test the SYNC_MODE=plan / SYNC_MODE=apply split."""
+
+    TEAMS_YAML = 'teams:\n  devs:\n  - alice\n  - carol\n  - dave\n'
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        (self.dir / 'teams.yaml').write_text(self.TEAMS_YAML, encoding='utf-8')
+        cwd = os.getcwd()
+        os.chdir(self.dir)
+        self.addCleanup(os.chdir, cwd)
+        self.session = MagicMock()
+        self.session.put.return_value.status_code = 200
+        self.session.delete.return_value.status_code = 204
+        self.session.post.return_value.status_code = 201
+        self.session.get.return_value.status_code = 200
+        self.session.get.return_value.json.return_value = {'id': 4}
+
+    def org_lists(self, url, session, workers=1):
+        return {
+            '/orgs/test-org/members': [{'login': u} for u in ('alice', 'bob', 'carol')],
+            '/orgs/test-org/invitations': [],
+            '/orgs/test-org/teams': [{'slug': 'devs'}],
+            '/orgs/test-org/teams/devs/members': [{'login': 'alice'}, {'login': 'bob'}],
+        }[url.replace(yaml_to_github.API, '')]
+
+    def patch_lists(self):
+        for target in ('yaml_to_github.iter_paginate', 'github_client.iter_paginate'):
+            patcher = patch(target, side_effect=self.org_lists)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def run_main(self, mode):
+        env = {'SYNC_MODE': mode, 'PLAN_PATH': str(self.dir / 'plan.json')}
+        with patch.dict(os.environ, env), \
+                patch('yaml_to_github.create_session', return_value=self.session), \
+                patch('yaml_to_github.USER_CACHE', None), \
+                patch('sys.stdout', new_callable=io.StringIO) as out:
+            yaml_to_github.main()
+        return out.getvalue()
+
+    def test_plan_reads_only_and_saves_changes(self):
+        """Test that planning sends no writes and records every change."""
+        self.patch_lists()
+
+        output = self.run_main('plan')
+
+        plan = json.loads((self.dir / 'plan.json').read_text())
+        self.assertEqual(plan['invites'], ['dave'])
+        self.assertEqual(plan['teams'], {'devs': {'add': ['carol'], 'remove': ['bob']}})
+        self.assertIn('1 invite(s), 1 add(s), 1 remove(s) across 1 team(s)', output)
+        self.session.put.assert_not_called()
+        self.session.delete.assert_not_called()
+        self.session.post.assert_not_called()
+        self.assertEqual((self.dir / 'teams.yaml').read_text(), self.TEAMS_YAML)
+
+    def test_apply_runs_saved_plan_without_fetching(self):
+        """Test that applying a plan only sends its writes."""
+        self.patch_lists()
+        self.run_main('plan')
+        yaml_to_github.iter_paginate.reset_mock()
+        github_client.iter_paginate.reset_mock()
+
+        output = self.run_main('apply')
+
+        yaml_to_github.iter_paginate.assert_not_called()
+        github_client.iter_paginate.assert_not_called()
+        self.assertEqual(
+            output.splitlines()[:3],
+            ['INVITED: dave', 'ADD devs: carol', 'REMOVE devs: bob'],
+        )
+        self.assertIn('invite_sent:\n- dave', (self.dir / 'teams.yaml').read_text())
+
+    def test_apply_refuses_plan_for_other_teams_yaml(self):
+        """Test that a plan is only applied to the teams.yaml it was made for."""
+        self.patch_lists()
+        self.run_main('plan')
+        (self.dir / 'teams.yaml').write_text('teams:\n  devs: []\n', encoding='utf-8')
+
+        with patch('sys.stderr', new_callable=io.StringIO) as err:
+            with self.assertRaises(SystemExit):
+                self.run_main('apply')
+
+        self.assertIn('different teams.yaml', err.getvalue())
+        self.session.put.assert_not_called()
+
+    def test_apply_refuses_old_plan(self):
+        """Test that a plan older than PLAN_MAX_AGE_MINUTES is not applied."""
+        self.patch_lists()
+        self.run_main('plan')
+        plan_path = self.dir / 'plan.json'
+        plan = json.loads(plan_path.read_text())
+        plan['created_at'] = '2020-01-01T00:00:00+00:00'
+        plan_path.write_text(json.dumps(plan))
+
+        with patch.dict(os.environ, {'PLAN_MAX_AGE_MINUTES': '60'}), \
+                patch('sys.stderr', new_callable=io.StringIO) as err:
+            with self.assertRaises(SystemExit):
+                self.run_main('apply')
+
+        self.assertIn('older than 60 minutes', err.getvalue())
+        self.session.put.assert_not_called()
+
+
+class TestIncrementalApply(unittest.TestCase):
+    """Test scoping a sync to the teams changed since the previous teams.yaml."""
+
+    def test_scope_is_changed_teams_and_joined_invitees(self):
+        """Test that unchanged teams are skipped unless an invitee joined."""
+        desired = {
+            'admins': ['alice'],
+            'devs': ['alice', 'bob'],
+            'docs': ['erin'],
+            'new': ['alice'],
+            'ops': ['dave'],
+        }
+        previous = {
+            'admins': ['alice'],
+            'devs': ['alice'],
+            'docs': ['erin'],
+            'ops': ['dave'],
+        }
+
+        slugs = yaml_to_github.team_scope(
+            desired, previous, ['erin', 'frank'], {'alice', 'bob', 'dave', 'erin'}
+        )
+
+        self.assertEqual(slugs, ['devs', 'docs', 'new'])
+
+    def test_no_previous_file_means_full_reconcile(self):
+        """Test that a missing previous teams.yaml reconciles every team."""
+        previous = yaml_to_github.load_previous_teams('/nonexistent/teams.yaml')
+
+        self.assertIsNone(previous)
+        self.assertEqual(
+            yaml_to_github.team_scope({'b': [], 'a': []}, previous, [], set()),
+            ['a', 'b'],
+        )
+
+    @patch('github_client.iter_paginate')
+    def test_only_scoped_teams_are_listed(self, mock_paginate):
+        """Test that apply_memberships lists and reconciles only scoped teams."""
+        mock_paginate.return_value = [{'login': 'alice'}]
+        session = MagicMock()
+        session.put.return_value.status_code = 200
+        desired = {'admins': ['alice'], 'devs': ['alice', 'bob']}
+
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            yaml_to_github.apply_memberships(
+                'test-org', session, desired, {'alice', 'bob'}, set(),
+                {'admins', 'devs'}, slugs=['devs'],
+            )
+
+        mock_paginate.assert_called_once_with(
+            f'{github_client.API}/orgs/test-org/teams/devs/members', session, 1
+        )
+        self.assertEqual(out.getvalue().splitlines(), ['ADD devs: bob'])
+
+
+class TestResolveUserIdCache(unittest.TestCase):
+    """Test that user id lookups go through the user cache."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = UserCache(Path(tmp.name) / 'users.json', ttl=3600, negative_ttl=60)
+        patcher = patch('yaml_to_github.USER_CACHE', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cached_id_skips_lookup(self):
+        """Test that a cached id is returned without a request."""
+        self.cache.put('alice', True, 101)
+        session = MagicMock()
+
+        self.assertEqual(yaml_to_github.resolve_user_id('alice', session), (101, None))
+        session.get.assert_not_called()
+
+    def test_lookup_result_is_cached(self):
+        """Test that a resolved id is written back to the cache."""
+        session = MagicMock()
+        session.get.return_value.status_code = 200
+        session.get.return_value.json.return_value = {'id': 202}
+
+        self.assertEqual(yaml_to_github.resolve_user_id('bob', session), (202, None))
+        self.assertEqual(self.cache.get('bob'), (True, 202))
+
+    def test_cached_unknown_user_is_rechecked(self):
+        """Test that a cached negative doesn't abort the sync by itself."""
+        self.cache.put('carol', False)
+        session = MagicMock()
+        session.get.return_value.status_code = 200
+        session.get.return_value.json.return_value = {'id': 303}
+
+        self.assertEqual(yaml_to_github.resolve_user_id('carol', session), (303, None))
+        session.get.assert_called_once()
+
+
 if __name__ == '__main__':
     unittest.main()